@@ -4,8 +4,10 @@ from typing import ClassVar
 from django.contrib import admin
 from django.contrib.auth.models import User, Group
 from .models import Category, Post, Tag
+from .signals import posts_bulk_updated
 
 from django.db import models
+from django.db.models.functions import Coalesce, Now
 from .widgets import MarkdownTextarea
 
 
@@ -121,14 +123,21 @@ class PostAdmin(admin.ModelAdmin):
 
     def publish_posts(self, request, queryset):
         """Admin action to publish multiple posts at once."""
-        updated = queryset.update(status="published")
+        post_ids = list(queryset.values_list("pk", flat=True))
+        # Keep existing dates; undated posts are published now, as save() does
+        updated = queryset.update(
+            status="published", published_date=Coalesce("published_date", Now())
+        )
+        posts_bulk_updated.send(sender=Post, post_ids=post_ids)
         self.message_user(request, f"{updated} posts have been published.")
 
     publish_posts.short_description = "Publish selected posts"
 
     def unpublish_posts(self, request, queryset):
         """Admin action to unpublish multiple posts at once."""
+        post_ids = list(queryset.values_list("pk", flat=True))
         updated = queryset.update(status="draft", published_date=None)
+        posts_bulk_updated.send(sender=Post, post_ids=post_ids)
         self.message_user(request, f"{updated} posts have been unpublished.")
 
     unpublish_posts.short_description = "Unpublish selected posts"
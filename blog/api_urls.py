@@ -1,13 +1,21 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .api_views import CategoryViewSet, PostViewSet, TagViewSet
+from .api_views import (
+    ArchiveViewSet,
+    CategoryViewSet,
+    ChangeLogViewSet,
+    PostViewSet,
+    TagViewSet,
+)
 
 # Create a router and register our viewsets with it
 router = DefaultRouter()
 router.register(r"categories", CategoryViewSet)
 router.register(r"tags", TagViewSet)
-router.register(r"posts", PostViewSet)
+router.register(r"posts", PostViewSet, basename="post")
+router.register(r"archive", ArchiveViewSet)
+router.register(r"changes", ChangeLogViewSet, basename="change")
 
 # The API URLs are determined automatically by the router
 urlpatterns = [
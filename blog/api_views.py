@@ -1,11 +1,21 @@
 from typing import ClassVar
 
+from django.conf import settings
+from django.http import StreamingHttpResponse
 from django.utils import timezone
-from rest_framework import filters, permissions, viewsets
-from rest_framework.pagination import PageNumberPagination
+from django.utils.cache import patch_vary_headers
+from django.utils.dateparse import parse_datetime
+from rest_framework import filters, mixins, permissions, renderers, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
 
-from .models import Category, Post, Tag
+from . import changelog, ndjson
+from .models import ArchiveMonth, Category, ChangeLogEntry, Post, Tag
+from .search.filters import PostSearchFilter
 from .serializers import (
+    ArchiveMonthSerializer,
     CategorySerializer,
     PostDetailSerializer,
     PostListSerializer,
@@ -21,6 +31,15 @@ class StandardResultsSetPagination(PageNumberPagination):
     max_page_size = 100
 
 
+class PostCursorPagination(CursorPagination):
+    """Keyset pagination for posts; every page costs the same at any depth."""
+
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering = ("-published_date", "-id")
+
+
 class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
     """API endpoint for viewing categories."""
 
@@ -48,19 +67,179 @@ class TagViewSet(viewsets.ReadOnlyModelViewSet):
 class PostViewSet(viewsets.ReadOnlyModelViewSet):
     """API endpoint for viewing posts."""
 
-    queryset = Post.objects.filter(
-        status="published",
-        published_date__lte=timezone.now(),
-    ).order_by("-published_date")
     permission_classes: ClassVar = [permissions.IsAuthenticatedOrReadOnly]
     pagination_class = StandardResultsSetPagination
-    filter_backends: ClassVar = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields: ClassVar = ["title", "content"]
+    filter_backends: ClassVar = [PostSearchFilter, filters.OrderingFilter]
+    search_fields: ClassVar = ["title", "content", "tags__name", "categories__name"]
     ordering_fields: ClassVar = ["published_date", "created_at", "title"]
     lookup_field = "slug"
 
+    @property
+    def paginator(self):
+        """
+        Keyset pages with ``BLOG_KEYSET_PAGINATION``, page numbers otherwise.
+
+        Chosen per request: searches always get page numbers, since a cursor
+        pagination would replace the relevance order with its own.
+        """
+        if not hasattr(self, "_paginator") and self.pagination_class is not None:
+            keyset = getattr(settings, "BLOG_KEYSET_PAGINATION", False)
+            searching = PostSearchFilter.search_param in self.request.query_params
+            if keyset and not searching:
+                self._paginator = PostCursorPagination()
+        return super().paginator
+
+    def get_queryset(self):
+        """
+        Published posts whose publication date has passed.
+
+        The cut-off is taken per request so scheduled posts appear on time.
+        Only the columns and relations of the requested fields are loaded.
+        """
+        queryset = Post.objects.filter(
+            status="published", published_date__lte=timezone.now()
+        ).order_by("-published_date", "-id")
+        return self.get_serializer().optimize_queryset(queryset)
+
+    def get_serializer(self, *args, **kwargs):
+        """Pass the ``?fields=`` and ``?expand=`` choices to the serializer."""
+        kwargs.setdefault("fields", self.requested_names("fields"))
+        kwargs.setdefault("expand", self.requested_names("expand"))
+        return super().get_serializer(*args, **kwargs)
+
+    def requested_names(self, param):
+        """The comma-separated names of a query parameter, or None if absent."""
+        value = self.request.query_params.get(param)
+        if value is None:
+            return None
+        return [name.strip() for name in value.split(",") if name.strip()]
+
     def get_serializer_class(self):
         """Return different serializers for list and detail views."""
-        if self.action == "retrieve":
+        if self.action in ("retrieve", "export"):
             return PostDetailSerializer
         return PostListSerializer
+
+    @action(
+        detail=False,
+        permission_classes=[permissions.IsAuthenticated],
+        renderer_classes=[ndjson.NDJSONRenderer, renderers.JSONRenderer],
+        filter_backends=[],
+        pagination_class=None,
+    )
+    def export(self, request):
+        """
+        Stream every published post as NDJSON, least recently updated first.
+
+        ``?updated_since=`` (ISO 8601) limits the export to posts updated at or
+        after that time, for incremental pulls; ``?fields=`` and ``?expand=``
+        work as on the list. The stream is gzipped if the client accepts it.
+        """
+        queryset = self.get_queryset().order_by("updated_at", "id")
+        updated_since = request.query_params.get("updated_since")
+        if updated_since is not None:
+            try:
+                since = parse_datetime(updated_since)
+            except ValueError:
+                since = None
+            if since is None:
+                raise ValidationError({"updated_since": ["Enter a valid ISO 8601 date and time."]})
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+            queryset = queryset.filter(updated_at__gte=since)
+
+        stream = ndjson.serialize_lines(queryset, self.get_serializer())
+        compress = ndjson.accepts_gzip(request)
+        if compress:
+            stream = ndjson.gzip_stream(stream)
+        response = StreamingHttpResponse(stream, content_type=ndjson.CONTENT_TYPE)
+        if compress:
+            response.headers["Content-Encoding"] = "gzip"
+        patch_vary_headers(response, ["Accept-Encoding"])
+        return response
+
+
+class ArchiveViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+    """API endpoint listing the months with published posts and their counts."""
+
+    queryset = ArchiveMonth.objects.all()
+    serializer_class = ArchiveMonthSerializer
+    permission_classes: ClassVar = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = None
+
+
+class ChangeLogViewSet(viewsets.GenericViewSet):
+    """
+    API endpoint listing what changed since a cursor, for delta syncs.
+
+    Each result is an ``upsert`` with the object's current data (posts with
+    the ids of their author, categories and tags) or a ``delete`` tombstone.
+    Start without ``?since=`` and pass the returned ``next`` cursor each time.
+    """
+
+    permission_classes: ClassVar = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = None
+    page_size = 100
+    max_page_size = 1000
+
+    def list(self, request):
+        since = request.query_params.get("since")
+        position = None
+        if since:
+            position = changelog.decode_cursor(since)
+            if position is None:
+                raise ValidationError({"since": ["Invalid cursor."]})
+        try:
+            limit = int(request.query_params.get("limit", self.page_size))
+        except ValueError:
+            limit = 0
+        if limit < 1:
+            # An empty page would leave the cursor, and the client, where they are
+            raise ValidationError({"limit": ["Must be a positive integer."]})
+        limit = min(limit, self.max_page_size)
+
+        entries = changelog.changes_since(position, limit + 1)
+        has_more = len(entries) > limit
+        entries = entries[:limit]
+        return Response(
+            {
+                "results": self.change_records(entries),
+                "next": changelog.encode_cursor(entries[-1]) if entries else since,
+                "has_more": has_more,
+            }
+        )
+
+    def change_records(self, entries):
+        """The records of a page of entries, turning upserts of vanished objects into tombstones."""
+        upserts = {}
+        for entry in entries:
+            if entry.action == ChangeLogEntry.Action.UPSERT:
+                upserts.setdefault(entry.kind, []).append(entry.object_id)
+
+        data = {}
+        if ChangeLogEntry.Kind.POST in upserts:
+            posts = PostDetailSerializer(expand=[]).optimize_queryset(
+                Post.objects.filter(
+                    pk__in=upserts[ChangeLogEntry.Kind.POST],
+                    status="published",
+                    published_date__lte=timezone.now(),
+                )
+            )
+            for item in PostDetailSerializer(posts, many=True, expand=[]).data:
+                data[ChangeLogEntry.Kind.POST, item["id"]] = item
+        for kind, model, serializer_class in (
+            (ChangeLogEntry.Kind.CATEGORY, Category, CategorySerializer),
+            (ChangeLogEntry.Kind.TAG, Tag, TagSerializer),
+        ):
+            if kind in upserts:
+                for item in serializer_class(model.objects.filter(pk__in=upserts[kind]), many=True).data:
+                    data[kind, item["id"]] = item
+
+        records = []
+        for entry in entries:
+            record = {"type": entry.kind, "id": entry.object_id, "action": ChangeLogEntry.Action.DELETE}
+            if (entry.kind, entry.object_id) in data:
+                record["action"] = ChangeLogEntry.Action.UPSERT
+                record["data"] = data[entry.kind, entry.object_id]
+            records.append(record)
+        return records
@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.core import checks
 
 
 class BlogConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'blog'
+
+    def ready(self):
+        from . import page_cache, signals  # noqa: F401
+
+        checks.register(page_cache.check_shared_cache, checks.Tags.caches)
@@ -0,0 +1,83 @@
+"""
+Materialized year/month archive of published posts.
+
+``ArchiveMonth`` rows hold the number of published posts per month. They
+are refreshed for the affected months whenever a post is saved or deleted
+(see ``blog.signals``) and rebuilt wholesale after bulk updates.
+"""
+
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import ArchiveMonth, Post
+
+
+def month_of(status, published_date):
+    """The (year, month) a post is archived under, or None if it is not."""
+    if status != "published" or published_date is None:
+        return None
+    local = timezone.localtime(published_date)
+    return local.year, local.month
+
+
+def refresh_months(months):
+    """Recount the published posts of the given (year, month) pairs."""
+    months = {month for month in months if month is not None}
+    if not months:
+        return
+
+    with transaction.atomic():
+        for year, month in months:
+            count = Post.objects.filter(
+                status="published",
+                published_date__year=year,
+                published_date__month=month,
+            ).count()
+            if count:
+                ArchiveMonth.objects.update_or_create(
+                    year=year, month=month, defaults={"post_count": count}
+                )
+            else:
+                ArchiveMonth.objects.filter(year=year, month=month).delete()
+
+
+def rebuild():
+    """Recount every month from scratch with a single grouped query."""
+    counts = (
+        Post.objects.filter(status="published", published_date__isnull=False)
+        .annotate(archive_month=TruncMonth("published_date"))
+        .values("archive_month")
+        .annotate(post_count=Count("id"))
+    )
+    with transaction.atomic():
+        ArchiveMonth.objects.all().delete()
+        ArchiveMonth.objects.bulk_create(
+            ArchiveMonth(
+                year=row["archive_month"].year,
+                month=row["archive_month"].month,
+                post_count=row["post_count"],
+            )
+            for row in counts
+        )
+
+
+def archive_dates():
+    """
+    The archive tree for the sidebar, newest first.
+
+    Each entry is ``{"year", "post_count", "months"}`` where ``months`` is a
+    list of ``{"month", "post_count"}``.
+    """
+    years = {}
+    for archive_month in ArchiveMonth.objects.all():
+        entry = years.setdefault(
+            archive_month.year,
+            {"year": archive_month.year, "post_count": 0, "months": []},
+        )
+        entry["post_count"] += archive_month.post_count
+        entry["months"].append(
+            {"month": archive_month.month, "post_count": archive_month.post_count}
+        )
+    return list(years.values())
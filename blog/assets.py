@@ -0,0 +1,162 @@
+"""
+CSS bundles with content-hashed names, built when static files are collected.
+
+Each entry of ``BUNDLES`` is concatenated from its sources, in order, and
+minified into ``<name>.<hash>.<ext>`` next to a gzip sibling (and a brotli
+one when the ``brotli`` package is installed), so a front server can serve
+them precompressed with far-future caching. ``assets.json`` in
+``STATIC_ROOT`` maps each bundle to its current file.
+
+Bundles are built by ``collectstatic``, through ``BundlingStaticFilesStorage``,
+or on their own by ``manage.py build_assets``. The ``{% bundle %}`` tag in
+``blog_extras`` links the built file, or each source while ``DEBUG`` is on
+or before the first build.
+"""
+
+import gzip
+import hashlib
+import json
+import re
+from functools import lru_cache
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import StaticFilesStorage, staticfiles_storage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:  # Optional: only .gz siblings are written without it
+    brotli = None
+
+BUNDLES = {
+    "css/site.css": [
+        "css/style.css",
+        "css/theme.css",
+        "css/utilities.css",
+        "css/main.css",
+        "css/components.css",
+        "css/responsive.css",
+    ],
+}
+MANIFEST_NAME = "assets.json"
+
+# Strings and comments first, so that nothing inside a string is touched
+CSS_TOKEN_RE = re.compile(
+    r"""(?P<string>"(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*')"""
+    r"|(?P<comment>/\*.*?\*/)"
+    r"|(?P<space>\s+)"
+    r"|(?P<punctuation>[{};,>:()])"
+    r"|(?P<other>[^\s\"'/{};,>:()]+|/)",
+    re.DOTALL,
+)
+# No whitespace is needed next to these; ``:`` is left alone on its left,
+# where ``a :hover`` and ``a:hover`` differ.
+TIGHT_BEFORE = set("{};,>)")
+TIGHT_AFTER = set("{};,>:(")
+
+
+def minify_css(css):
+    """Drop comments and redundant whitespace and semicolons."""
+    tokens = []
+    pending_space = False
+    for match in CSS_TOKEN_RE.finditer(css):
+        kind, text = match.lastgroup, match.group()
+        if kind in ("comment", "space"):
+            # A comment between two words still separates them
+            pending_space = True
+            continue
+        if pending_space and tokens:
+            if tokens[-1] not in TIGHT_AFTER and text not in TIGHT_BEFORE:
+                tokens.append(" ")
+        pending_space = False
+        if text == "}" and tokens and tokens[-1] == ";":
+            tokens.pop()
+        tokens.append(text)
+    return "".join(tokens) + "\n"
+
+
+def hashed_name(name, content):
+    path = PurePosixPath(name)
+    digest = hashlib.sha256(content).hexdigest()[:12]
+    return str(path.with_name(f"{path.stem}.{digest}{path.suffix}"))
+
+
+def precompressed(content):
+    """``(suffix, bytes)`` of the compressed siblings of a file."""
+    siblings = [(".gz", gzip.compress(content, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        siblings.append((".br", brotli.compress(content, mode=brotli.MODE_TEXT)))
+    return siblings
+
+
+def _write(storage, name, content):
+    if storage.exists(name):
+        storage.delete(name)
+    storage.save(name, ContentFile(content))
+
+
+def find_source(name):
+    """Read a bundle source through the static files finders."""
+    path = finders.find(name)
+    if path is None:
+        raise FileNotFoundError(f"Static file not found: {name}")
+    with open(path, "rb") as file:
+        return file.read()
+
+
+def build_bundles(read=find_source, storage=staticfiles_storage):
+    """
+    Write every bundle, its compressed siblings and the manifest to ``storage``.
+
+    ``read(name)`` returns the bytes of a source file. Returns the manifest.
+    """
+    manifest = {}
+    for bundle, sources in BUNDLES.items():
+        css = "\n".join(read(source).decode("utf-8") for source in sources)
+        content = minify_css(css).encode()
+        name = hashed_name(bundle, content)
+        _write(storage, name, content)
+        for suffix, compressed in precompressed(content):
+            _write(storage, name + suffix, compressed)
+        manifest[bundle] = name
+    _write(storage, MANIFEST_NAME, json.dumps(manifest, indent=2).encode())
+    return manifest
+
+
+class BundlingStaticFilesStorage(StaticFilesStorage):
+    """Static files storage that builds ``BUNDLES`` at the end of ``collectstatic``."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        if dry_run:
+            return
+
+        def read(name):
+            with self.open(name) as file:
+                return file.read()
+
+        manifest = build_bundles(read=read, storage=self)
+        for bundle, name in manifest.items():
+            yield bundle, name, True
+
+
+@lru_cache(maxsize=1)
+def _read_manifest(path, modified):
+    with staticfiles_storage.open(path) as file:
+        return json.load(file)
+
+
+def bundle_file(bundle):
+    """The built file of a bundle, or None before the first build."""
+    try:
+        modified = staticfiles_storage.get_modified_time(MANIFEST_NAME)
+    except (FileNotFoundError, NotImplementedError):
+        return None
+    return _read_manifest(MANIFEST_NAME, modified).get(bundle)
+
+
+def bundle_files(bundle):
+    """The static files to link for a bundle: the built one, else its sources."""
+    built = None if settings.DEBUG else bundle_file(bundle)
+    return [built] if built else BUNDLES[bundle]
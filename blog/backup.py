@@ -0,0 +1,294 @@
+"""
+Portable backups of the blog's content.
+
+An archive is a gzipped tar of JSON Lines files, one per table, plus the
+media files that posts reference:
+
+    manifest.json              format version and row counts
+    users.jsonl                the authors, matched by username on restore
+    categories.jsonl, tags.jsonl, posts.jsonl
+    post_categories.jsonl, post_tags.jsonl
+    media/post_images/...        images and their renditions
+
+Both directions stream: rows are read with ``iterator()`` into spooled
+temporary files, and restored in ``bulk_create`` batches straight from the
+tar stream, so memory use does not depend on the size of the blog. Primary
+keys, slugs and timestamps are kept; only authors are mapped by username.
+Renditions missing after a restore (from an archive without them, or with
+``media`` off) are forgotten and generated again in the background.
+"""
+
+import io
+import json
+import tarfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import batched
+from tempfile import SpooledTemporaryFile
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.files.base import File
+from django.core.files.storage import default_storage
+from django.core.management.color import no_style
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+
+from . import changelog, images
+from .models import Category, ChangeLogEntry, Post, Tag
+from .signals import posts_bulk_updated
+
+FORMAT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+MEDIA_PREFIX = "media/"
+BATCH_SIZE = 1000
+# Rows kept in memory per table before spilling to disk while exporting
+SPOOL_SIZE = 8 * 1024 * 1024
+
+USER_FIELDS = (
+    "id",
+    "username",
+    "email",
+    "first_name",
+    "last_name",
+    "is_staff",
+    "is_superuser",
+)
+
+# Tables in the order they are written and restored: each only refers to
+# the ones before it.
+TABLES = {
+    "categories": Category,
+    "tags": Tag,
+    "posts": Post,
+    "post_categories": Post.categories.through,
+    "post_tags": Post.tags.through,
+}
+
+
+class BackupError(Exception):
+    """An archive that cannot be restored into this database."""
+
+
+class ArchiveJSONEncoder(DjangoJSONEncoder):
+    """Keep the microseconds that DjangoJSONEncoder drops from datetimes."""
+
+    def default(self, o):
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def _columns(model):
+    return [field.attname for field in model._meta.concrete_fields]
+
+
+def _add_bytes(archive, name, data):
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mtime = int(time.time())
+    archive.addfile(info, io.BytesIO(data))
+
+
+def _add_rows(archive, name, columns, rows):
+    """Write ``rows`` (tuples in ``columns`` order) as a JSONL member; returns the count."""
+    encoder = ArchiveJSONEncoder(ensure_ascii=False)
+    count = 0
+    with SpooledTemporaryFile(max_size=SPOOL_SIZE) as spool:
+        for row in rows:
+            spool.write(encoder.encode(dict(zip(columns, row))).encode() + b"\n")
+            count += 1
+        info = tarfile.TarInfo(name)
+        info.size = spool.tell()
+        info.mtime = int(time.time())
+        spool.seek(0)
+        archive.addfile(info, spool)
+    return count
+
+
+def export_archive(fileobj, media=True, batch_size=BATCH_SIZE):
+    """Write the archive of the blog to a binary file object; returns the row counts."""
+    counts = {}
+    with tarfile.open(fileobj=fileobj, mode="w|gz") as archive:
+        authors = User.objects.filter(pk__in=Post.objects.values("author_id"))
+        counts["users"] = _add_rows(
+            archive,
+            "users.jsonl",
+            USER_FIELDS,
+            authors.order_by("pk").values_list(*USER_FIELDS).iterator(chunk_size=batch_size),
+        )
+        for table, model in TABLES.items():
+            columns = _columns(model)
+            rows = model.objects.order_by("pk").values_list(*columns)
+            counts[table] = _add_rows(
+                archive, f"{table}.jsonl", columns, rows.iterator(chunk_size=batch_size)
+            )
+
+        counts["media"] = 0
+        if media:
+            for name in _media_names(batch_size):
+                if not default_storage.exists(name):
+                    continue
+                info = tarfile.TarInfo(MEDIA_PREFIX + name)
+                info.size = default_storage.size(name)
+                info.mtime = int(time.time())
+                with default_storage.open(name, "rb") as image:
+                    archive.addfile(info, image)
+                counts["media"] += 1
+
+        manifest = {"format": FORMAT_VERSION, "counts": counts}
+        _add_bytes(archive, MANIFEST_NAME, json.dumps(manifest, indent=2).encode())
+    return counts
+
+
+def _media_names(batch_size):
+    """Each post image once, followed by its renditions."""
+    rows = Post.objects.exclude(image="").exclude(image__isnull=True).order_by("image")
+    previous = None
+    for name, renditions in rows.values_list("image", "image_renditions").iterator(
+        chunk_size=batch_size
+    ):
+        if name == previous:
+            continue
+        previous = name
+        yield name
+        if renditions.get("source") == name:
+            yield from images.rendition_names(renditions)
+
+
+def _read_rows(member_file, model):
+    """Yield unsaved instances of ``model`` from a JSONL member."""
+    fields = {field.attname: field for field in model._meta.concrete_fields}
+    for line in member_file:
+        data = json.loads(line)
+        yield model(**{name: fields[name].to_python(value) for name, value in data.items()})
+
+
+@contextmanager
+def _keeping_timestamps(model):
+    """Let ``bulk_create`` store the archived ``auto_now``/``auto_now_add`` values."""
+    fields = [
+        field
+        for field in model._meta.concrete_fields
+        if getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _restore_users(member_file):
+    """Map archived author ids to local users, creating the missing ones."""
+    rows = [json.loads(line) for line in member_file]
+    existing = User.objects.in_bulk([row["username"] for row in rows], field_name="username")
+    User.objects.bulk_create(
+        User(
+            password=make_password(None),
+            **{name: value for name, value in row.items() if name != "id"},
+        )
+        for row in rows
+        if row["username"] not in existing
+    )
+    local = User.objects.in_bulk([row["username"] for row in rows], field_name="username")
+    return {row["id"]: local[row["username"]].pk for row in rows}
+
+
+def has_content():
+    return Post.objects.exists() or Category.objects.exists() or Tag.objects.exists()
+
+
+def clear_content():
+    """Delete every post, category and tag, as a restore with ``replace`` does."""
+    for model in (Post, Category, Tag):
+        model.objects.all().delete()
+
+
+def reset_sequences():
+    """Move the primary key sequences past the restored ids (PostgreSQL needs it)."""
+    statements = connection.ops.sequence_reset_sql(no_style(), list(TABLES.values()))
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def restore_archive(fileobj, media=True, replace=False, batch_size=BATCH_SIZE):
+    """
+    Load an archive written by ``export_archive``; returns the row counts.
+
+    The database must hold no posts, categories or tags unless ``replace``
+    is set, which deletes them first. Derived data (search index, archive
+    months, caches, change log) is rebuilt once the rows are committed.
+    """
+    counts = dict.fromkeys(["users", *TABLES, "media"], 0)
+    manifest = None
+    with transaction.atomic():
+        if has_content():
+            if not replace:
+                raise BackupError("The database already has posts, categories or tags.")
+            clear_content()
+
+        authors = {}
+        with tarfile.open(fileobj=fileobj, mode="r|gz") as archive:
+            for member in archive:
+                if member.name == MANIFEST_NAME:
+                    manifest = json.load(archive.extractfile(member))
+                    if manifest.get("format") != FORMAT_VERSION:
+                        raise BackupError(f"Unsupported archive format: {manifest.get('format')!r}")
+                elif member.name == "users.jsonl":
+                    authors = _restore_users(archive.extractfile(member))
+                    counts["users"] = len(authors)
+                elif member.name.removesuffix(".jsonl") in TABLES:
+                    table = member.name.removesuffix(".jsonl")
+                    model = TABLES[table]
+                    with _keeping_timestamps(model):
+                        rows = _read_rows(archive.extractfile(member), model)
+                        for batch in batched(rows, batch_size):
+                            if model is Post:
+                                for post in batch:
+                                    post.author_id = authors[post.author_id]
+                            model.objects.bulk_create(batch)
+                            counts[table] += len(batch)
+                elif member.name.startswith(MEDIA_PREFIX) and member.isfile() and media:
+                    name = member.name.removeprefix(MEDIA_PREFIX)
+                    if default_storage.exists(name):
+                        default_storage.delete(name)
+                    default_storage.save(name, File(archive.extractfile(member), name=name))
+                    counts["media"] += 1
+        # The manifest comes last, so a truncated archive has none
+        if manifest is None:
+            raise BackupError("Not a complete blog archive: manifest.json is missing.")
+        for table in TABLES:
+            if counts[table] != manifest["counts"].get(table):
+                raise BackupError(f"The archive has the wrong number of {table}.")
+        reset_sequences()
+
+    for model in (Category, Tag):
+        for ids in batched(model.objects.values_list("pk", flat=True).iterator(), batch_size):
+            changelog.record(model._meta.model_name, ids, ChangeLogEntry.Action.UPSERT)
+    for ids in batched(Post.objects.values_list("pk", flat=True).iterator(), batch_size):
+        posts_bulk_updated.send(sender=Post, post_ids=list(ids))
+    counts["renditions"] = reset_missing_renditions(batch_size)
+    return counts
+
+
+def reset_missing_renditions(batch_size=BATCH_SIZE):
+    """
+    Forget renditions whose files are missing and regenerate them in the background.
+
+    Pages show the original image meanwhile. Returns the number of posts.
+    """
+    posts = Post.objects.exclude(image_renditions={}).only("image_renditions")
+    missing = [
+        post.pk for post in posts.iterator(chunk_size=batch_size) if not images.has_files(post)
+    ]
+    for ids in batched(missing, batch_size):
+        Post.objects.filter(pk__in=ids).update(image_renditions={})
+    for post_id in missing:
+        images.schedule_renditions(post_id)
+    return len(missing)
@@ -0,0 +1,99 @@
+"""
+Change log behind the delta-sync API (``/api/changes/``).
+
+The signal handlers in ``blog.signals`` record every change to a post,
+category or tag. Each object keeps a single entry that moves to the end of
+the log when the object changes, so the log grows with the number of
+objects, not edits, and a sync returns each changed object once.
+
+Posts are logged as the API sees them: an upsert while published, and a
+tombstone once unpublished or deleted. A scheduled post's upsert becomes
+visible at its publication date.
+"""
+
+import base64
+import binascii
+from datetime import datetime, timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ChangeLogEntry, Post
+
+# Entries newer than this are held back: their transaction may still be
+# committing, and a later commit of an earlier timestamp would be skipped.
+SETTLE_TIME = timedelta(seconds=5)
+
+
+def record(kind, object_ids, action, visible_at=None):
+    """Move the entries of ``object_ids`` to the end of the log."""
+    object_ids = list(object_ids)
+    if not object_ids:
+        return
+    visible_at = visible_at or {}
+    now = timezone.now()
+    ChangeLogEntry.objects.filter(kind=kind, object_id__in=object_ids).delete()
+    ChangeLogEntry.objects.bulk_create(
+        ChangeLogEntry(
+            kind=kind,
+            object_id=object_id,
+            action=action,
+            visible_at=visible_at.get(object_id, now),
+        )
+        for object_id in object_ids
+    )
+
+
+def record_posts(post_ids):
+    """
+    Log the current state of posts, given by id.
+
+    Published posts get an upsert. Drafts and deleted posts get a tombstone,
+    but only if the API ever showed them.
+    """
+    post_ids = set(post_ids)
+    if not post_ids:
+        return
+    now = timezone.now()
+    published = dict(
+        Post.objects.filter(
+            pk__in=post_ids, status="published", published_date__isnull=False
+        ).values_list("pk", "published_date")
+    )
+    record(
+        ChangeLogEntry.Kind.POST,
+        published,
+        ChangeLogEntry.Action.UPSERT,
+        visible_at={pk: max(now, date) for pk, date in published.items()},
+    )
+    shown = ChangeLogEntry.objects.filter(
+        kind=ChangeLogEntry.Kind.POST,
+        object_id__in=post_ids - published.keys(),
+        action=ChangeLogEntry.Action.UPSERT,
+    ).values_list("object_id", flat=True)
+    record(ChangeLogEntry.Kind.POST, list(shown), ChangeLogEntry.Action.DELETE)
+
+
+def changes_since(position=None, limit=100):
+    """The next ``limit`` visible entries after a decoded cursor position."""
+    entries = ChangeLogEntry.objects.filter(visible_at__lte=timezone.now() - SETTLE_TIME)
+    if position is not None:
+        visible_at, pk = position
+        entries = entries.filter(Q(visible_at__gt=visible_at) | Q(visible_at=visible_at, id__gt=pk))
+    return list(entries.order_by("visible_at", "id")[:limit])
+
+
+def encode_cursor(entry):
+    """Build the cursor pointing past ``entry``."""
+    raw = f"{entry.visible_at.isoformat()}|{entry.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Return ``(visible_at, id)``, or None for a bad cursor."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        visible_at, pk = base64.urlsafe_b64decode(padded.encode()).decode().split("|")
+        return datetime.fromisoformat(visible_at), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
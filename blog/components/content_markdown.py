@@ -1,20 +1,30 @@
 from reactpy import component, html
-import markdown
+
+from blog.rendering import renderer
 # from markdown_it import MarkdownIt
 
 # md = MarkdownIt()
 
 
 @component
-def Markdown(source: str):
-    # html_string = md.render(source)
-    html_string = markdown.markdown(
-        source,
-        extensions=[
-            "markdown.extensions.fenced_code",
-            "markdown.extensions.codehilite",
-        ],
-    )
+def Markdown(source: str = "", html_string: str | None = None):
+    """
+    Display markdown content.
+
+    Pass ``html_string`` (e.g. ``post.content_html``) to show HTML that was
+    already rendered on save; ``source`` is only rendered when it is missing.
+    """
+    if html_string is None:
+        # html_string = md.render(source)
+        html_string = renderer.render(
+            source,
+            extensions=[
+                "markdown.extensions.fenced_code",
+                "markdown.extensions.codehilite",
+            ],
+            extension_configs={},
+            sanitize=False,
+        )
 
     return html.div(
         {
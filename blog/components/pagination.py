@@ -9,10 +9,14 @@ def Pagination(page_obj=None, query_params=None):
     Component for displaying pagination controls.
 
     Args:
-        page_obj: Pagination object with page, paginator, has_next, has_previous attributes
+        page_obj: Pagination object with page, paginator, has_next, has_previous attributes,
+            or a keyset page with next_cursor and previous_cursor attributes
         query_params: Dictionary of query parameters to preserve in pagination links
 
     """
+    if getattr(page_obj, "is_keyset", False):
+        return KeysetPagination(page_obj=page_obj, query_params=query_params)
+
     if page_obj is None or not hasattr(page_obj, "paginator"):
         return None
 
@@ -110,3 +114,59 @@ def Pagination(page_obj=None, query_params=None):
             ),
         ),
     )
+
+
+@component
+def KeysetPagination(page_obj, query_params=None):
+    """
+    Previous/next controls for a keyset page, linked by opaque cursors.
+
+    Args:
+        page_obj: KeysetPage with next_cursor and previous_cursor attributes
+        query_params: Dictionary of query parameters to preserve in pagination links
+
+    """
+    if not page_obj.has_other_pages():
+        return None
+
+    def build_url(cursor):
+        params = dict(query_params or {})
+        params["cursor"] = cursor
+        return "?" + "&".join(f"{k}={v}" for k, v in params.items() if v)
+
+    return html.nav(
+        {"aria-label": "Page navigation"},
+        html.ul(
+            {"class": "pagination justify-content-center"},
+            html.li(
+                {
+                    "class": f"page-item {'disabled' if not page_obj.has_previous() else ''}",
+                },
+                html.a(
+                    {
+                        "class": "page-link",
+                        "href": build_url(page_obj.previous_cursor)
+                        if page_obj.has_previous()
+                        else "#",
+                        "aria-label": "Previous",
+                    },
+                    html.span({"aria-hidden": "true"}, "«"),
+                ),
+            ),
+            html.li(
+                {
+                    "class": f"page-item {'disabled' if not page_obj.has_next() else ''}",
+                },
+                html.a(
+                    {
+                        "class": "page-link",
+                        "href": build_url(page_obj.next_cursor)
+                        if page_obj.has_next()
+                        else "#",
+                        "aria-label": "Next",
+                    },
+                    html.span({"aria-hidden": "true"}, "»"),
+                ),
+            ),
+        ),
+    )
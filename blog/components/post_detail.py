@@ -57,7 +57,7 @@ def PostDetail(post_id: int):
         html.div(
             {"class": "card-body"},
             # html.div(
-            Markdown(source=post.content),
+            Markdown(source=post.content, html_string=post.content_html),
             # {
             #     "dangerouslySetInnerHTML": {
             #         "__html": getattr(post, "content_html", post.content),
@@ -24,6 +24,7 @@ def fetch_post(*, post_id):
     return (
         Post.objects.select_related("author")
         .prefetch_related("categories", "tags")
+        .defer("content", "content_html")
         .get(id=post_id)
     )
 
@@ -51,6 +52,7 @@ def PostListItem(post_id: int):
     local_tz = pytz.timezone("America/New_York")  # Change to your desired timezone
     local_time = post.published_date.astimezone(local_tz)
     formatted_date = local_time.strftime("%B %d, %Y")
+    reading_time = f" · {post.reading_time} min read" if post.reading_time else ""
 
     return html.div(
         {"class": "card mb-4"},
@@ -64,7 +66,7 @@ def PostListItem(post_id: int):
             ),
             html.div(
                 {"class": "text-light small"},
-                f"Published on {formatted_date} by {post.author.username}",
+                f"Published on {formatted_date} by {post.author.username}{reading_time}",
             ),
         ),
         html.div(
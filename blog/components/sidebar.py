@@ -9,6 +9,16 @@ from .tag_list import TagList
 
 @component
 def Sidebar(categories=None, tags=None, archive_dates=None):
+    """
+    Component for the sidebar with search, categories, tags and archives.
+
+    Args:
+        categories: List of Category objects
+        tags: List of Tag objects
+        archive_dates: Archive tree from blog.archive.archive_dates(), a list of
+            {"year", "post_count", "months": [{"month", "post_count"}]}
+
+    """
     show_sidebar, set_show_sidebar = use_state(False)
 
     if categories is None:
@@ -48,14 +58,22 @@ def Sidebar(categories=None, tags=None, archive_dates=None):
                                         {"href": f"/archive/{date['year']}/"},
                                         str(date["year"]),
                                     ),
+                                    html.span(
+                                        {"class": "text-muted small"},
+                                        f" ({date['post_count']})",
+                                    ),
                                     html.ul(
                                         [
                                             html.li(
                                                 html.a(
                                                     {
-                                                        "href": f"/archive/{date['year']}/{month}/",
+                                                        "href": f"/archive/{date['year']}/{month['month']}/",
                                                     },
-                                                    _get_month_name(month),
+                                                    _get_month_name(month["month"]),
+                                                ),
+                                                html.span(
+                                                    {"class": "text-muted small"},
+                                                    f" ({month['post_count']})",
                                                 ),
                                             )
                                             for month in date["months"]
@@ -0,0 +1,94 @@
+"""
+Conditional GET support: ETag and Last-Modified validators for the blog's
+pages, feeds and sitemaps.
+
+A response's validators come from one aggregate over the published posts it
+shows (their newest ``updated_at`` and their number). The aggregate is cached
+under the page cache's ``listing`` and ``sidebar`` versions, which change
+whenever a published post, category or tag does (see ``blog.signals``).
+"""
+
+import hashlib
+
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.views.decorators.http import condition
+
+from . import page_cache
+from .rendering import RENDERER_VERSION
+
+STATE_KEY = "blog:conditional:{label}:{listing}:{sidebar}"
+STATE_TIMEOUT = 60 * 60 * 24  # One day
+
+
+def published_state(label, queryset):
+    """
+    Newest ``updated_at`` and number of the posts in ``queryset``.
+
+    ``label`` names the queryset in the cache, e.g. ``"category:python"``.
+    Returns the state together with the dependency versions it was cached under.
+    """
+    versions = page_cache.dependency_versions([page_cache.LISTING, page_cache.SIDEBAR])
+    key = STATE_KEY.format(
+        label=hashlib.sha1(label.encode()).hexdigest(),
+        listing=versions[page_cache.LISTING],
+        sidebar=versions[page_cache.SIDEBAR],
+    )
+    state = cache.get(key)
+    if state is None:
+        state = queryset.aggregate(last_modified=Max("updated_at"), count=Count("id"))
+        cache.set(key, state, STATE_TIMEOUT)
+    return state, versions
+
+
+def validators(request, label, queryset, html=True):
+    """
+    Return the ``(etag, last_modified)`` of a response showing ``queryset``.
+
+    Both are None when there is nothing to validate: no published posts, or
+    an HTML page requested by a logged-in user, who sees staff-only controls.
+    The ETag also covers the sidebar generation (category and tag names and
+    counts), the renderer version and, for HTML, the HTMX request header.
+    An HTML page's ETag without the sidebar is kept on the request for the
+    page cache, which fills in the sidebar when serving the page.
+    """
+    if html and request.user.is_authenticated:
+        return None, None
+
+    state, versions = published_state(label, queryset)
+    if not state["count"]:
+        return None, None
+
+    parts = [label, state["last_modified"].isoformat(), state["count"], RENDERER_VERSION]
+    if not html:
+        parts.append(versions[page_cache.SIDEBAR])
+        etag = hashlib.sha1("|".join(map(str, parts)).encode()).hexdigest()
+        return etag, state["last_modified"]
+
+    parts.append(request.headers.get("HX-Request", ""))
+    request._page_etag = hashlib.sha1("|".join(map(str, parts)).encode()).hexdigest()
+    etag = page_cache.sidebar_etag(request._page_etag, versions[page_cache.SIDEBAR])
+    return etag, state["last_modified"]
+
+
+def conditional(state_func, html=True):
+    """
+    Decorate a view so conditional GETs are answered with 304 Not Modified.
+
+    ``state_func(request, *args, **kwargs)`` receives the view's arguments
+    and returns ``(label, queryset)`` for the published posts the response
+    shows. A 304 is returned before the view runs, so nothing is rendered.
+    """
+
+    def get_validators(request, *args, **kwargs):
+        if not hasattr(request, "_conditional_validators"):
+            label, queryset = state_func(request, *args, **kwargs)
+            request._conditional_validators = validators(request, label, queryset, html)
+        return request._conditional_validators
+
+    return condition(
+        etag_func=lambda request, *args, **kwargs: get_validators(request, *args, **kwargs)[0],
+        last_modified_func=lambda request, *args, **kwargs: get_validators(
+            request, *args, **kwargs
+        )[1],
+    )
@@ -1,13 +1,16 @@
-from .models import Category, Tag
+from .sidebar import sidebar_context
 
 
 def blog_context(request):
     """
     Provides global context for the blog, such as categories and tags for the sidebar.
+
+    The values are lazy and shared with the views through the cached sidebar
+    data, so pages that do not render the sidebar never touch it.
     """
+    context = sidebar_context(request)
     return {
-        "all_categories": Category.objects.all(),
-        "all_tags": Tag.objects.all(),
-        # You can add your archive dates logic here as well
-        # 'archive_dates': ...
+        "all_categories": context["categories"],
+        "all_tags": context["tags"],
+        "archive_dates": context["archive_dates"],
     }
@@ -0,0 +1,243 @@
+"""
+Resized copies ("renditions") of post images, for responsive markup.
+
+When a post's image changes, ``schedule_renditions()`` resizes it in a
+background thread after the commit, so saving in the admin is not held up
+by Pillow. Each width in ``RENDITION_WIDTHS`` narrower than the original
+is written as WebP and JPEG next to the upload, and ``Post.image_renditions``
+records their names and sizes:
+
+    {"source": "post_images/photo.jpg", "width": 4000, "height": 3000,
+     "renditions": [{"name": ..., "format": "webp", "width": 480, "height": 360}, ...]}
+
+Templates use ``srcset()`` and ``best_rendition()`` through the
+``responsive_image`` tag and ``og_image_url`` filter in ``blog_extras``.
+Existing images are backfilled with ``manage.py generate_image_renditions``.
+"""
+
+import hashlib
+import io
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import PurePosixPath
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from . import page_cache
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+RENDITION_WIDTHS = (480, 960, 1440)
+RENDITIONS_DIR = "post_images/renditions/"
+# Pillow format and save options, by rendition format
+FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+# Width of the image shown in link previews
+OG_IMAGE_WIDTH = 1200
+# Threads resizing images in the background; Pillow releases the GIL
+WORKERS = 2
+
+
+def rendition_name(source, width, format):
+    """Storage name of one rendition, unique to the source name."""
+    path = PurePosixPath(source)
+    digest = hashlib.sha1(source.encode()).hexdigest()[:8]
+    extension = "jpg" if format == "jpeg" else format
+    return f"{RENDITIONS_DIR}{path.stem}-{digest}-{width}w.{extension}"
+
+
+def _for_format(image, format):
+    if format == "jpeg" and image.mode != "RGB":
+        # JPEG has no alpha channel: flatten transparency onto white
+        background = Image.new("RGB", image.size, "white")
+        rgba = image.convert("RGBA")
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        return background
+    if format == "webp" and image.mode not in ("RGB", "RGBA"):
+        has_alpha = "A" in image.getbands() or "transparency" in image.info
+        return image.convert("RGBA" if has_alpha else "RGB")
+    return image
+
+
+def render_renditions(source, storage=default_storage):
+    """Write the renditions of an image in ``storage``; returns the image_renditions data."""
+    with storage.open(source, "rb") as file:
+        image = Image.open(file)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+
+    width, height = image.size
+    renditions = []
+    for target in sorted({min(width, target) for target in RENDITION_WIDTHS}):
+        target_height = max(1, round(height * target / width))
+        resized = image
+        if target != width:
+            resized = image.resize((target, target_height), Image.Resampling.LANCZOS)
+        for format, (pillow_format, options) in FORMATS.items():
+            buffer = io.BytesIO()
+            _for_format(resized, format).save(buffer, pillow_format, **options)
+            name = rendition_name(source, target, format)
+            if storage.exists(name):
+                storage.delete(name)
+            storage.save(name, ContentFile(buffer.getvalue()))
+            renditions.append(
+                {"name": name, "format": format, "width": target, "height": target_height}
+            )
+    return {"source": source, "width": width, "height": height, "renditions": renditions}
+
+
+def delete_renditions(data, storage=default_storage):
+    for name in rendition_names(data):
+        storage.delete(name)
+
+
+def rendition_names(data):
+    return [rendition["name"] for rendition in data.get("renditions", [])]
+
+
+def has_files(post, storage=default_storage):
+    """Whether every rendition recorded for the post is in ``storage``."""
+    return all(storage.exists(name) for name in rendition_names(post.image_renditions))
+
+
+def is_current(post):
+    """Whether the stored renditions belong to the post's current image."""
+    return bool(post.image) and post.image_renditions.get("source") == post.image.name
+
+
+def update_renditions(post_id, force=False):
+    """
+    Bring the renditions of a post's image up to date; returns True if it did work.
+
+    Renditions of a replaced or removed image are deleted. The update is
+    skipped if the image changes again meanwhile.
+    """
+    post = Post.objects.filter(pk=post_id).only("image", "image_renditions").first()
+    if post is None or (is_current(post) and not force):
+        return False
+
+    previous = post.image_renditions
+    data = {}
+    if post.image:
+        try:
+            data = render_renditions(post.image.name)
+        except (OSError, UnidentifiedImageError, Image.DecompressionBombError) as error:
+            logger.warning("Cannot resize the image of post %s: %s", post_id, error)
+            return False
+
+    same_image = Q(image=post.image.name) if post.image else Q(image="") | Q(image__isnull=True)
+    # A new updated_at changes the post page's ETag along with its markup
+    updated = Post.objects.filter(same_image, pk=post_id).update(
+        image_renditions=data, updated_at=timezone.now()
+    )
+    if not updated:
+        # The image was replaced while resizing; its own update follows
+        delete_renditions(data)
+        return False
+    if previous.get("source") != data.get("source"):
+        delete_renditions(previous)
+    # Listings show the image too, and their state keys the validators
+    page_cache.purge(*page_cache.posts_dependencies([post_id]))
+    return True
+
+
+_executor_lock = threading.Lock()
+_executor = None
+
+
+def schedule_renditions(post_id):
+    """Update the renditions of a post in a background thread after the commit."""
+    transaction.on_commit(lambda: _get_executor().submit(_run_update, post_id))
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="post-images")
+        return _executor
+
+
+def _run_update(post_id):
+    try:
+        update_renditions(post_id)
+    except Exception:
+        logger.exception("Resizing the image of post %s failed", post_id)
+    finally:
+        connections.close_all()
+
+
+def _backfill_one(post_id, force):
+    try:
+        return update_renditions(post_id, force=force)
+    finally:
+        connections.close_all()
+
+
+def backfill(workers=1, force=False):
+    """
+    Create the missing renditions of every post image in ``workers`` processes.
+
+    Returns the number of posts whose renditions were (re)written.
+    """
+    posts = Post.objects.exclude(image="").exclude(image__isnull=True)
+    post_ids = [
+        post.pk
+        for post in posts.only("image", "image_renditions").iterator()
+        if force or not is_current(post)
+    ]
+    if workers <= 1 or len(post_ids) < 2:
+        return sum(update_renditions(post_id, force=force) for post_id in post_ids)
+
+    # Forked workers must not share the parent's database connections
+    connections.close_all()
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("fork")
+    ) as executor:
+        results = executor.map(
+            _backfill_one,
+            post_ids,
+            [force] * len(post_ids),
+            chunksize=max(1, len(post_ids) // (workers * 4)),
+        )
+        return sum(results)
+
+
+def renditions(post, format):
+    """The post's renditions in ``format``, narrowest first; empty if out of date."""
+    if not is_current(post):
+        return []
+    return [item for item in post.image_renditions["renditions"] if item["format"] == format]
+
+
+def srcset(post, format):
+    """The ``srcset`` attribute value for the post's image in ``format``."""
+    return ", ".join(
+        f"{default_storage.url(item['name'])} {item['width']}w" for item in renditions(post, format)
+    )
+
+
+def best_rendition(post, width, format="jpeg"):
+    """The narrowest rendition at least ``width`` wide, else the widest; None if none."""
+    candidates = renditions(post, format)
+    for item in candidates:
+        if item["width"] >= width:
+            return item
+    return candidates[-1] if candidates else None
+
+
+def dimensions(post):
+    """``(width, height)`` of the post's image, or None until it has been measured."""
+    if not is_current(post):
+        return None
+    return post.image_renditions["width"], post.image_renditions["height"]
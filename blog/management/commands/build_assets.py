@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from blog.assets import build_bundles
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the minified, content-hashed CSS bundles and their manifest in "
+        "STATIC_ROOT, as collectstatic does."
+    )
+
+    def handle(self, *args, **options):
+        for bundle, name in build_bundles().items():
+            self.stdout.write(f"{bundle} -> {name}")
+        self.stdout.write(self.style.SUCCESS("Built the static bundles."))
@@ -0,0 +1,40 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from blog.backup import BATCH_SIZE, export_archive
+
+
+class Command(BaseCommand):
+    help = "Write posts, categories, tags and their images to a portable .tar.gz archive."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "archive", help="Path of the archive to write, or - for standard output."
+        )
+        parser.add_argument(
+            "--no-media",
+            action="store_true",
+            help="Leave out the images referenced by posts.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=BATCH_SIZE,
+            help="Number of rows fetched per query.",
+        )
+
+    def handle(self, *args, **options):
+        export = {"media": not options["no_media"], "batch_size": options["batch_size"]}
+        if options["archive"] == "-":
+            # Nothing else may be written to standard output
+            export_archive(sys.stdout.buffer, **export)
+            return
+        with open(options["archive"], "wb") as archive:
+            counts = export_archive(archive, **export)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Exported {counts['posts']} posts, {counts['categories']} categories, "
+                f"{counts['tags']} tags and {counts['media']} media files."
+            )
+        )
@@ -0,0 +1,103 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from blog.static_export import claim_pending, export_options, export_site
+
+
+class Command(BaseCommand):
+    help = "Export the public blog as static files, re-rendering only changed pages."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "output_dir",
+            nargs="?",
+            help='Directory to write the static site to. Defaults to BLOG_STATIC_EXPORT["ROOT"].',
+        )
+        parser.add_argument(
+            "--base-url",
+            help="Public URL of the mirror, used for absolute links and the Host header. "
+            'Defaults to BLOG_STATIC_EXPORT["BASE_URL"].',
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Number of rendering processes.",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Re-render every page, even if its inputs are unchanged.",
+        )
+        parser.add_argument(
+            "--skip-assets",
+            action="store_true",
+            help="Do not collect and copy static and media files.",
+        )
+        parser.add_argument(
+            "--watch",
+            action="store_true",
+            help="Keep running and update the mirror whenever a change marks it out of date. "
+            "Untouched pages keep their sidebar until the next full export.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=2.0,
+            help="Seconds between checks for changes with --watch.",
+        )
+
+    def handle(self, *args, **options):
+        output_dir = options["output_dir"] or export_options().get("ROOT")
+        if not output_dir:
+            raise CommandError('Pass an output directory or set BLOG_STATIC_EXPORT["ROOT"].')
+        base_url = (
+            options["base_url"] or export_options().get("BASE_URL") or "http://localhost:8000"
+        )
+
+        if options["watch"]:
+            self.watch(output_dir, base_url, options)
+            return
+
+        result = export_site(
+            output_dir,
+            base_url,
+            workers=options["workers"],
+            force=options["force"],
+            static=not options["skip_assets"],
+            media=not options["skip_assets"],
+        )
+        self.report(result)
+
+    def watch(self, output_dir, base_url, options):
+        self.stdout.write("Waiting for changes to export. Press Ctrl+C to stop.")
+        try:
+            while True:
+                if not claim_pending(output_dir):
+                    time.sleep(options["interval"])
+                    continue
+                close_old_connections()
+                result = export_site(
+                    output_dir,
+                    base_url,
+                    workers=options["workers"],
+                    static=False,
+                    media=not options["skip_assets"],
+                    refresh_sidebar=False,
+                )
+                self.report(result)
+        except KeyboardInterrupt:
+            self.stdout.write("Stopped.")
+
+    def report(self, result):
+        for url, status in sorted(result["failures"].items()):
+            self.stderr.write(f"{url}: HTTP {status}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rendered {result['rendered']} pages, skipped {result['skipped']} "
+                f"unchanged, removed {result['removed']}, {result['failed']} failed."
+            )
+        )
@@ -0,0 +1,26 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from blog.images import backfill
+
+
+class Command(BaseCommand):
+    help = "Create the resized WebP and JPEG copies of post images that are missing."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Number of resizing processes.",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Resize every image, even those whose copies are up to date.",
+        )
+
+    def handle(self, *args, **options):
+        count = backfill(workers=options["workers"], force=options["force"])
+        self.stdout.write(self.style.SUCCESS(f"Resized the images of {count} posts."))
@@ -0,0 +1,26 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from blog.og_cards import generate_cards
+
+
+class Command(BaseCommand):
+    help = "Draw the missing Open Graph cards of published posts without an image."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Number of drawing processes.",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Redraw every card, even those that are up to date.",
+        )
+
+    def handle(self, *args, **options):
+        count = generate_cards(workers=options["workers"], force=options["force"])
+        self.stdout.write(self.style.SUCCESS(f"Drew {count} Open Graph cards."))
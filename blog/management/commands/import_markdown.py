@@ -0,0 +1,60 @@
+import os
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.markdown_import import STATUSES, import_directory
+
+
+class Command(BaseCommand):
+    help = "Import a directory of markdown files with front matter as posts."
+
+    def add_arguments(self, parser):
+        parser.add_argument("directory", help="Directory searched recursively for *.md files.")
+        parser.add_argument(
+            "--author",
+            help="Username of the author of posts without an 'author' key. "
+            "Defaults to the first superuser.",
+        )
+        parser.add_argument(
+            "--status",
+            choices=sorted(STATUSES),
+            default="draft",
+            help="Status of posts without a 'status' key.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of files inserted per transaction.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Number of processes rendering the markdown.",
+        )
+
+    def handle(self, *args, **options):
+        if options["author"]:
+            author = User.objects.filter(username=options["author"]).first()
+        else:
+            author = User.objects.filter(is_superuser=True).order_by("pk").first()
+        if author is None:
+            raise CommandError("No such author; pass the username of an existing user with --author.")
+
+        stats = import_directory(
+            options["directory"],
+            author,
+            default_status=options["status"],
+            batch_size=options["batch_size"],
+            workers=options["workers"],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Imported {stats['imported']} posts."))
+        if stats["skipped"]:
+            self.stdout.write(f"Skipped {stats['skipped']} files whose slug is already taken.")
+        if stats["failed"]:
+            self.stderr.write(
+                f"Could not import {stats['failed']} files with invalid front matter "
+                "or category and tag names; see the log."
+            )
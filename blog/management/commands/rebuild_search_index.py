@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from blog.models import Post, SearchDocument
+from blog.search import index_posts
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index of published posts."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of posts indexed per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+
+        # Drop documents of posts that are no longer published.
+        SearchDocument.objects.exclude(post__status="published").delete()
+
+        post_ids = Post.objects.filter(status="published").values_list("pk", flat=True)
+        batch = []
+        total = 0
+        for post_id in post_ids.iterator(chunk_size=batch_size):
+            batch.append(post_id)
+            if len(batch) >= batch_size:
+                index_posts(batch)
+                total += len(batch)
+                batch = []
+        index_posts(batch)
+        total += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} published posts."))
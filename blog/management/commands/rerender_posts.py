@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand
+
+from blog import page_cache
+from blog.models import Post
+from blog.rendering import RENDERER_VERSION, renderer
+
+
+class Command(BaseCommand):
+    help = "Re-render the stored HTML of posts produced by an older renderer."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Re-render every post, not just the stale ones.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=200,
+            help="Number of posts written per UPDATE batch.",
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.only("id", "content")
+        if not options["all"]:
+            posts = posts.exclude(content_html_version=RENDERER_VERSION)
+
+        batch_size = options["batch_size"]
+        batch = []
+        total = 0
+
+        for post in posts.iterator(chunk_size=batch_size):
+            post.render_content()
+            batch.append(post)
+            if len(batch) >= batch_size:
+                total += self._flush(batch)
+
+        total += self._flush(batch)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Re-rendered {total} posts with renderer version {RENDERER_VERSION}."
+            )
+        )
+        stats = renderer.stats()
+        self.stdout.write(
+            f"Render cache: {stats['misses']} rendered, "
+            f"{stats['local_hits'] + stats['shared_hits']} served from cache."
+        )
+
+    def _flush(self, batch):
+        """Write the rendered HTML of a batch without touching updated_at."""
+        count = len(batch)
+        if count:
+            Post.objects.bulk_update(batch, ["content_html", "content_html_version"])
+            page_cache.purge(*(page_cache.post_dependency(post.pk) for post in batch))
+            batch.clear()
+        return count
@@ -0,0 +1,53 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.backup import BATCH_SIZE, BackupError, restore_archive
+
+
+class Command(BaseCommand):
+    help = "Restore posts, categories, tags and images from an export_blog archive."
+
+    def add_arguments(self, parser):
+        parser.add_argument("archive", help="Path of the archive to read, or - for standard input.")
+        parser.add_argument(
+            "--replace",
+            action="store_true",
+            help="Delete the existing posts, categories and tags first.",
+        )
+        parser.add_argument(
+            "--no-media",
+            action="store_true",
+            help="Do not write the archived images to the media storage.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=BATCH_SIZE,
+            help="Number of rows inserted per query.",
+        )
+
+    def handle(self, *args, **options):
+        restore = {
+            "media": not options["no_media"],
+            "replace": options["replace"],
+            "batch_size": options["batch_size"],
+        }
+        try:
+            if options["archive"] == "-":
+                counts = restore_archive(sys.stdin.buffer, **restore)
+            else:
+                with open(options["archive"], "rb") as archive:
+                    counts = restore_archive(archive, **restore)
+        except (BackupError, OSError) as error:
+            raise CommandError(error) from error
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Restored {counts['posts']} posts, {counts['categories']} categories, "
+                f"{counts['tags']} tags and {counts['media']} media files."
+            )
+        )
+        if counts["renditions"]:
+            self.stdout.write(
+                f"Regenerating the missing image renditions of {counts['renditions']} posts."
+            )
@@ -0,0 +1,349 @@
+"""
+Import a directory of markdown files as posts, in bulk.
+
+Each file may start with a front matter block between ``---`` lines:
+
+    ---
+    title: Hello, world
+    slug: hello-world
+    date: 2024-05-01 09:30
+    status: published
+    author: admin
+    tags: [django, python]
+    categories:
+      - Tutorials
+    ---
+
+Only ``key: value`` pairs, ``[a, b]`` lists and ``- item`` lists are
+understood. A file is skipped, and the reason logged, when its front matter
+is invalid, its slug is taken, or one of its category or tag names is too
+long, has no slug, or has the slug of another name. Names are never merged
+or truncated. Files are rendered in worker processes and written in batches:
+``Post.save()`` is not called, so the derived fields it fills in are
+computed here, and ``posts_bulk_updated`` is sent for each batch so the
+search index, archive and caches follow.
+"""
+
+import logging
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, time
+from itertools import batched, repeat
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.text import slugify
+
+from . import rendering
+from .models import Category, Post, Tag
+from .signals import posts_bulk_updated
+
+logger = logging.getLogger(__name__)
+
+FRONT_MATTER_DELIMITER = "---"
+STATUSES = {status for status, _ in Post.STATUS_CHOICES}
+
+
+class FrontMatterError(ValueError):
+    """A markdown file whose front matter cannot be imported."""
+
+
+def _scalar(value):
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        return value[1:-1]
+    return value
+
+
+def parse_front_matter(text):
+    """Split a markdown file into its front matter dict and its body."""
+    lines = text.lstrip("\ufeff").splitlines(keepends=True)
+    if not lines or lines[0].strip() != FRONT_MATTER_DELIMITER:
+        return {}, text
+
+    meta = {}
+    key = None
+    for index, line in enumerate(lines[1:], start=1):
+        stripped = line.strip()
+        if stripped == FRONT_MATTER_DELIMITER:
+            return meta, "".join(lines[index + 1 :]).lstrip("\n")
+        if not stripped or stripped.startswith("#"):
+            continue
+        if stripped.startswith("- ") and key is not None:
+            if not isinstance(meta[key], list):
+                meta[key] = []
+            meta[key].append(_scalar(stripped[2:]))
+            continue
+        key, separator, value = stripped.partition(":")
+        if not separator:
+            raise FrontMatterError(f"Expected 'key: value', got {stripped!r}")
+        key = key.strip().lower()
+        value = value.strip()
+        if value.startswith("[") and value.endswith("]"):
+            meta[key] = [_scalar(item) for item in value[1:-1].split(",") if item.strip()]
+        else:
+            meta[key] = _scalar(value)
+    raise FrontMatterError("The front matter block is not closed")
+
+
+def _parse_date(value):
+    try:
+        date = parse_datetime(value)
+        if date is None:
+            day = parse_date(value)
+            date = day and datetime.combine(day, time())
+    except ValueError:
+        date = None
+    if date is None:
+        raise FrontMatterError(f"Invalid date: {value!r}")
+    return timezone.make_aware(date) if timezone.is_naive(date) else date
+
+
+def _names(meta, key, model):
+    value = meta.get(key) or []
+    if isinstance(value, str):
+        value = value.split(",")
+    names = [name.strip() for name in value if name.strip()]
+
+    label = model._meta.verbose_name
+    max_length = model._meta.get_field("name").max_length
+    for name in names:
+        if len(name) > max_length:
+            raise FrontMatterError(f"{label} name longer than {max_length} characters: {name!r}")
+        if not slugify(name):
+            raise FrontMatterError(f"{label} name without a slug: {name!r}")
+    return names
+
+
+def read_post(path, default_status="draft"):
+    """
+    Read one markdown file into an unsaved Post with its derived fields.
+
+    Returns ``(post, author_username, category_names, tag_names)``; the post
+    has no author yet and the username is None without an ``author`` key.
+    Nothing is read from or written to the database tables, but rendering
+    goes through ``rendering.renderer``, whose shared cache may be the
+    database; worker processes replace it with a local-only renderer.
+    """
+    meta, body = parse_front_matter(Path(path).read_text(encoding="utf-8"))
+    title = meta.get("title") or Path(path).stem.replace("-", " ").replace("_", " ").strip()
+    status = meta.get("status") or default_status
+    if status not in STATUSES:
+        raise FrontMatterError(f"Unknown status: {status!r}")
+
+    post = Post(
+        title=title[:200],
+        slug=(meta.get("slug") or slugify(title) or slugify(Path(path).stem))[:200],
+        content=body,
+        status=status,
+        published_date=_parse_date(meta["date"]) if meta.get("date") else None,
+        meta_title=meta.get("meta_title", ""),
+        meta_description=meta.get("meta_description", meta.get("description", "")),
+    )
+    # What Post.save() would have done
+    if post.status == "published" and not post.published_date:
+        post.published_date = timezone.now()
+    post.populate_derived_fields()
+    categories, tags = _names(meta, "categories", Category), _names(meta, "tags", Tag)
+    return post, meta.get("author"), categories, tags
+
+
+def _read_or_error(path, default_status):
+    try:
+        return read_post(path, default_status)
+    except (FrontMatterError, UnicodeDecodeError) as error:
+        return error
+
+
+def _init_worker():
+    """Render without the shared cache, which may be the database, in worker processes."""
+    rendering.renderer = rendering.MarkdownRenderer(shared=False)
+
+
+@contextmanager
+def _file_reader(workers):
+    """Yield a ``read(paths, default_status)`` mapping files to read_post results or errors."""
+    if workers <= 1:
+        yield lambda paths, default_status: map(_read_or_error, paths, repeat(default_status))
+        return
+
+    # Forked workers must not share the parent's database connections; they
+    # are all started by the first read, before the parent reconnects.
+    connections.close_all()
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("fork"),
+        initializer=_init_worker,
+    ) as executor:
+        yield lambda paths, default_status: executor.map(
+            _read_or_error,
+            paths,
+            repeat(default_status),
+            chunksize=max(1, len(paths) // (workers * 4)),
+        )
+
+
+def slug_conflicts(model, names):
+    """
+    Map each name whose slug belongs to another name to that other name.
+
+    The other name is an existing category or tag, or an earlier name in
+    ``names``. Names that exist already never conflict.
+    """
+    max_length = model._meta.get_field("slug").max_length
+    wanted = {name: slugify(name)[:max_length] for name in dict.fromkeys(names)}
+    existing = set(model.objects.filter(name__in=wanted).values_list("name", flat=True))
+    owners = dict(
+        model.objects.filter(slug__in=wanted.values())
+        .exclude(name__in=existing)
+        .values_list("slug", "name")
+    )
+
+    conflicts = {}
+    for name, slug in wanted.items():
+        if name in existing:
+            continue
+        owner = owners.setdefault(slug, name)
+        if owner != name:
+            conflicts[name] = owner
+    return conflicts
+
+
+def resolve_taxonomy(model, names):
+    """Map names to categories or tags, creating the missing ones in one query."""
+    max_length = model._meta.get_field("slug").max_length
+    wanted = {name: slugify(name)[:max_length] for name in set(names)}
+    if not wanted:
+        return {}
+
+    def lookup():
+        existing = model.objects.filter(Q(name__in=wanted) | Q(slug__in=wanted.values()))
+        by_name = {obj.name: obj for obj in existing}
+        by_slug = {obj.slug: obj for obj in by_name.values()}
+        return {
+            name: by_name.get(name) or by_slug.get(slug)
+            for name, slug in wanted.items()
+            if name in by_name or slug in by_slug
+        }
+
+    found = lookup()
+    missing = [model(name=name, slug=wanted[name]) for name in wanted if name not in found]
+    if missing:
+        model.objects.bulk_create(missing, ignore_conflicts=True)
+        found = lookup()
+    return found
+
+
+def import_batch(entries):
+    """
+    Insert a batch of ``(post, category_names, tag_names)`` in one transaction.
+
+    Posts whose slug is already taken are skipped and keep a None ``pk``.
+    Returns the new post ids.
+    """
+    slugs = [post.slug for post, _, _ in entries]
+    taken = set(Post.objects.filter(slug__in=slugs).values_list("slug", flat=True))
+    new = []
+    for entry in entries:
+        if entry[0].slug not in taken:
+            taken.add(entry[0].slug)
+            new.append(entry)
+    if not new:
+        return []
+
+    with transaction.atomic():
+        posts = Post.objects.bulk_create([post for post, _, _ in new])
+        categories = resolve_taxonomy(Category, [name for _, names, _ in new for name in names])
+        tags = resolve_taxonomy(Tag, [name for _, _, names in new for name in names])
+        Post.categories.through.objects.bulk_create(
+            [
+                Post.categories.through(post_id=post.pk, category_id=categories[name].pk)
+                for post, names, _ in new
+                for name in dict.fromkeys(names)
+            ],
+            ignore_conflicts=True,
+        )
+        Post.tags.through.objects.bulk_create(
+            [
+                Post.tags.through(post_id=post.pk, tag_id=tags[name].pk)
+                for post, _, names in new
+                for name in dict.fromkeys(names)
+            ],
+            ignore_conflicts=True,
+        )
+    post_ids = [post.pk for post in posts]
+    posts_bulk_updated.send(sender=Post, post_ids=post_ids)
+    return post_ids
+
+
+def import_directory(directory, author, default_status="draft", batch_size=500, workers=1):
+    """
+    Import every ``*.md`` file under ``directory``; returns a Counter.
+
+    ``author`` writes the posts without an ``author`` key. Files are rendered
+    in ``workers`` processes. The counter holds ``imported``, ``skipped``
+    (slug already taken) and ``failed`` (bad front matter or taxonomy names)
+    counts; every file not imported is logged with the reason.
+    """
+    stats = Counter()
+    authors = {user.username: user for user in User.objects.all()}
+    paths = sorted(Path(directory).rglob("*.md"))
+    with _file_reader(workers) as read:
+        for chunk in batched(paths, batch_size):
+            entries = []
+            for path, result in zip(chunk, read(chunk, default_status)):
+                if isinstance(result, Exception):
+                    logger.warning("Skipping %s: %s", path, result)
+                    stats["failed"] += 1
+                    continue
+                post, username, categories, tags = result
+                post.author = authors.get(username) if username else author
+                if post.author is None:
+                    logger.warning("Skipping %s: unknown author %r", path, username)
+                    stats["failed"] += 1
+                    continue
+                entries.append((path, post, categories, tags))
+
+            entries = _without_slug_conflicts(entries, stats)
+            imported = len(import_batch([entry[1:] for entry in entries]))
+            stats["imported"] += imported
+            stats["skipped"] += len(entries) - imported
+            for path, post, _, _ in entries:
+                if post.pk is None:
+                    logger.warning("Skipping %s: the slug %r is already taken", path, post.slug)
+    return stats
+
+
+def _without_slug_conflicts(entries, stats):
+    """Drop the entries naming a category or tag whose slug belongs to another name."""
+    conflicts = {
+        model: slug_conflicts(model, [name for entry in entries for name in entry[index]])
+        for model, index in ((Category, 2), (Tag, 3))
+    }
+    kept = []
+    for entry in entries:
+        clashes = [
+            (model, name, conflicts[model][name])
+            for model, index in ((Category, 2), (Tag, 3))
+            for name in entry[index]
+            if name in conflicts[model]
+        ]
+        if clashes:
+            model, name, owner = clashes[0]
+            logger.warning(
+                "Skipping %s: the %s %r has the slug of %r",
+                entry[0],
+                model._meta.verbose_name.lower(),
+                name,
+                owner,
+            )
+            stats["failed"] += 1
+        else:
+            kept.append(entry)
+    return kept
@@ -0,0 +1,234 @@
+"""
+Resized copies of media images, made on request.
+
+``/resized/<name>?w=960&fm=webp&q=80`` serves the media file ``name``
+scaled down to an allowed width, optionally converted and recompressed.
+The first request draws the copy; it is then kept on disk under a hash of
+the options and the source's size and modification time, in a tree
+sharded by the first bytes of that hash:
+
+    <CACHE_DIR>/3f/a2/3fa2...c1.webp
+
+Once the tree outgrows ``MAX_BYTES``, the least recently served copies are
+deleted. A hit refreshes its file's modification time, at most once per
+``TOUCH_INTERVAL`` so serving does not turn into metadata writes.
+"""
+
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path, PurePosixPath
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from django.utils.http import urlencode
+from PIL import Image, ImageOps
+
+from .images import _for_format
+
+# Bump to invalidate every cached copy after changing how they are drawn
+RESIZE_VERSION = 1
+WIDTHS = (320, 480, 640, 960, 1280, 1440, 1920)
+QUALITIES = (50, 65, 80, 90)
+DEFAULT_QUALITY = 80
+# Pillow format, content type and save options, by format name
+FORMATS = {
+    "webp": ("WEBP", "image/webp", {"method": 4}),
+    "jpeg": ("JPEG", "image/jpeg", {"optimize": True, "progressive": True}),
+    "png": ("PNG", "image/png", {"optimize": True}),
+}
+# Format a copy keeps without ``fm``, by source extension
+SOURCE_FORMATS = {
+    ".jpg": "jpeg",
+    ".jpeg": "jpeg",
+    ".png": "png",
+    ".webp": "webp",
+    ".gif": "png",
+}
+EXTENSIONS = {"webp": "webp", "jpeg": "jpg", "png": "png"}
+
+TOUCH_INTERVAL = 60 * 60  # One hour
+# Share of MAX_BYTES written by this process between two eviction sweeps
+SWEEP_EVERY = 0.05
+# A sweep deletes copies until the tree is back under this share of MAX_BYTES
+LOW_WATERMARK = 0.9
+
+
+class ResizeError(ValueError):
+    """A resize request outside the allow-list."""
+
+
+def parse_options(name, params):
+    """
+    Validate the source name and ``w``/``fm``/``q`` query parameters.
+
+    Returns ``(width, format, quality)``; raises ResizeError.
+    """
+    extension = PurePosixPath(name).suffix.lower()
+    if extension not in SOURCE_FORMATS:
+        raise ResizeError("Not an image.")
+    try:
+        width = int(params.get("w", ""))
+        quality = int(params.get("q", DEFAULT_QUALITY))
+    except ValueError:
+        raise ResizeError("w and q must be integers.") from None
+    if width not in WIDTHS:
+        raise ResizeError(f"w must be one of {', '.join(map(str, WIDTHS))}.")
+    if quality not in QUALITIES:
+        raise ResizeError(f"q must be one of {', '.join(map(str, QUALITIES))}.")
+    format = params.get("fm") or SOURCE_FORMATS[extension]
+    if format not in FORMATS:
+        raise ResizeError(f"fm must be one of {', '.join(FORMATS)}.")
+    return width, format, quality
+
+
+def resized_url(name, width, format=None, quality=None):
+    """Path of a resized copy of the media file ``name``."""
+    url = reverse("blog:resized_media", kwargs={"name": name})
+    params = {"w": width}
+    if format:
+        params["fm"] = format
+    if quality:
+        params["q"] = quality
+    return f"{url}?{urlencode(params)}"
+
+
+def content_type(format):
+    return FORMATS[format][1]
+
+
+def variant_key(name, width, format, quality, storage=default_storage):
+    """
+    Cache key of a resized copy, changing whenever its source does.
+
+    Raises FileNotFoundError for a missing source.
+    """
+    source = [name, storage.size(name), storage.get_modified_time(name).timestamp()]
+    options = [width, format, quality, RESIZE_VERSION]
+    encoded = json.dumps([*source, *options]).encode()
+    return hashlib.sha256(encoded).hexdigest()[:32]
+
+
+def render_variant(name, width, format, quality, storage=default_storage):
+    """Draw a resized copy of ``name``; returns the encoded bytes."""
+    with storage.open(name, "rb") as file:
+        image = Image.open(file)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+
+    if image.mode not in ("RGB", "RGBA", "L", "LA"):
+        has_alpha = "A" in image.getbands() or "transparency" in image.info
+        image = image.convert("RGBA" if has_alpha else "RGB")
+    if width < image.width:
+        height = max(1, round(image.height * width / image.width))
+        image = image.resize((width, height), Image.Resampling.LANCZOS)
+
+    pillow_format, _, options = FORMATS[format]
+    if format != "png":
+        options = {**options, "quality": quality}
+    buffer = io.BytesIO()
+    _for_format(image, format).save(buffer, pillow_format, **options)
+    return buffer.getvalue()
+
+
+class DiskCache:
+    """Files in a sharded directory tree, evicted least recently used past ``max_bytes``."""
+
+    def __init__(self, directory, max_bytes):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # Sweep on the first write, since other processes have written too
+        self._written = max_bytes
+
+    def path(self, key, extension):
+        return self.directory / key[:2] / key[2:4] / f"{key}.{extension}"
+
+    def open(self, key, extension):
+        """Open a cached file for reading and mark it used; None on a miss."""
+        path = self.path(key, extension)
+        try:
+            file = path.open("rb")
+        except FileNotFoundError:
+            return None
+        now = time.time()
+        try:
+            if now - os.fstat(file.fileno()).st_mtime > TOUCH_INTERVAL:
+                os.utime(path, (now, now))
+        except FileNotFoundError:
+            # Evicted meanwhile; the open file is still readable
+            pass
+        return file
+
+    def put(self, key, extension, data):
+        """Store ``data`` atomically, then evict if this process wrote enough."""
+        path = self.path(key, extension)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=path.parent, delete=False) as temporary:
+            temporary.write(data)
+        try:
+            os.replace(temporary.name, path)
+        except OSError:
+            os.unlink(temporary.name)
+            raise
+
+        with self._lock:
+            self._written += len(data)
+            due = self._written >= self.max_bytes * SWEEP_EVERY
+            if due:
+                self._written = 0
+        if due:
+            self.sweep()
+
+    def sweep(self):
+        """Delete the least recently used files until under the low watermark; returns the count."""
+        files = []
+        total = 0
+        for path in self.directory.glob("*/*/*"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        if total <= self.max_bytes:
+            return 0
+
+        deleted = 0
+        target = self.max_bytes * LOW_WATERMARK
+        for _, size, path in sorted(files):
+            if total <= target:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            deleted += 1
+        return deleted
+
+
+@lru_cache(maxsize=4)
+def _disk_cache(directory, max_bytes):
+    return DiskCache(directory, max_bytes)
+
+
+def disk_cache():
+    """The cache configured in ``BLOG_MEDIA_RESIZE``."""
+    options = settings.BLOG_MEDIA_RESIZE
+    return _disk_cache(str(options["CACHE_DIR"]), options["MAX_BYTES"])
+
+
+def open_variant(name, key, width, format, quality):
+    """A readable file with the resized copy, drawn and cached on a miss."""
+    cache = disk_cache()
+    extension = EXTENSIONS[format]
+    file = cache.open(key, extension)
+    if file is None:
+        data = render_variant(name, width, format, quality)
+        cache.put(key, extension, data)
+        file = io.BytesIO(data)
+    return file
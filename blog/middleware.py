@@ -0,0 +1,26 @@
+from . import page_cache
+
+
+class AnonymousPageCacheMiddleware:
+    """
+    Serve anonymous GET requests from the page cache.
+
+    Only pages whose view declared its dependencies (see
+    ``blog.page_cache.depends_on``) are stored. Must come after the
+    authentication and HTMX middleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not page_cache.is_cacheable_request(request):
+            return self.get_response(request)
+
+        response = page_cache.get_cached_response(request)
+        if response is not None:
+            return response
+
+        response = self.get_response(request)
+        page_cache.store_response(request, response)
+        return response
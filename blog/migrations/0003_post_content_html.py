@@ -0,0 +1,77 @@
+# Generated by Django 5.2.5 on 2026-10-18 16:09
+
+import bleach
+import markdown
+from django.db import migrations, models
+
+# The renderer as of this migration, frozen: blog.rendering goes through the
+# cache, whose table may not exist yet, and will change in later versions.
+RENDERER_VERSION = 1
+
+EXTENSIONS = [
+    "markdown.extensions.fenced_code",
+    "markdown.extensions.codehilite",
+    "markdown.extensions.tables",
+    "markdown.extensions.toc",
+]
+EXTENSION_CONFIGS = {
+    "markdown.extensions.codehilite": {"css_class": "highlight", "linenums": False},
+    "markdown.extensions.tables": {"use_align_attribute": True},
+}
+ALLOWED_TAGS = bleach.sanitizer.ALLOWED_TAGS | {
+    "p", "br", "hr", "h1", "h2", "h3", "h4", "h5", "h6", "pre", "code", "span", "div",
+    "img", "table", "thead", "tbody", "tr", "th", "td", "del", "sup", "sub",
+}
+ALLOWED_ATTRIBUTES = {
+    "a": ["href", "title", "id", "class"],
+    "img": ["src", "alt", "title", "width", "height"],
+    "abbr": ["title"],
+    "acronym": ["title"],
+    **{f"h{level}": ["id"] for level in range(1, 7)},
+    "th": ["align"],
+    "td": ["align"],
+    "span": ["class"],
+    "div": ["class"],
+    "pre": ["class"],
+    "code": ["class"],
+}
+
+
+def render_markdown(source):
+    html = markdown.markdown(source, extensions=EXTENSIONS, extension_configs=EXTENSION_CONFIGS)
+    return bleach.clean(html, tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRIBUTES, strip=True)
+
+
+def render_existing_posts(apps, schema_editor):
+    Post = apps.get_model("blog", "Post")
+    batch = []
+    for post in Post.objects.only("id", "content").iterator(chunk_size=200):
+        post.content_html = render_markdown(post.content)
+        post.content_html_version = RENDERER_VERSION
+        batch.append(post)
+        if len(batch) >= 200:
+            Post.objects.bulk_update(batch, ["content_html", "content_html_version"])
+            batch = []
+    if batch:
+        Post.objects.bulk_update(batch, ["content_html", "content_html_version"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0002_post_image_post_meta_description_post_meta_title_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='content_html',
+            field=models.TextField(blank=True, editable=False, help_text='Sanitized HTML rendered from the markdown content on save.'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='content_html_version',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, help_text='Renderer version that produced content_html.'),
+        ),
+        migrations.RunPython(render_existing_posts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 5.2.5 on 2026-10-18 16:10
+
+import math
+import re
+
+import bleach
+import markdown
+from django.db import migrations, models
+
+# The summary rules as of this migration, frozen: blog.rendering goes through
+# the cache, whose table may not exist yet, and will change in later versions.
+SUMMARY_WORDS = 30
+WORDS_PER_MINUTE = 200
+HEADER_RE = re.compile(r"^#{1,6}\s+.*$", flags=re.MULTILINE)
+
+
+def strip_tags(html):
+    return bleach.clean(html, tags=set(), strip=True)
+
+
+def markdown_to_text(source):
+    return strip_tags(markdown.markdown(HEADER_RE.sub("", source).strip()))
+
+
+def truncate_words(text):
+    words = text.split()
+    if len(words) > SUMMARY_WORDS:
+        return " ".join(words[:SUMMARY_WORDS]) + "..."
+    return text
+
+
+def reading_time(word_count):
+    if not word_count:
+        return 0
+    return max(1, math.ceil(word_count / WORDS_PER_MINUTE))
+
+
+def backfill_summaries(apps, schema_editor):
+    Post = apps.get_model("blog", "Post")
+    fields = ["summary", "word_count", "reading_time"]
+    batch = []
+    posts = Post.objects.only("id", "content", "content_html")
+    for post in posts.iterator(chunk_size=200):
+        post.summary = truncate_words(markdown_to_text(post.content))
+        post.word_count = len(strip_tags(post.content_html).split())
+        post.reading_time = reading_time(post.word_count)
+        batch.append(post)
+        if len(batch) >= 200:
+            Post.objects.bulk_update(batch, fields)
+            batch = []
+    if batch:
+        Post.objects.bulk_update(batch, fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0003_post_content_html'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='reading_time',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, help_text='Estimated reading time in minutes.'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='summary',
+            field=models.TextField(blank=True, editable=False, help_text='Plain-text summary derived from the content on save.'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.2.5 on 2026-10-18 16:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from blog.rendering import strip_tags
+from blog.search.index import document_terms
+
+
+def index_published_posts(apps, schema_editor):
+    Post = apps.get_model("blog", "Post")
+    SearchDocument = apps.get_model("blog", "SearchDocument")
+    SearchPosting = apps.get_model("blog", "SearchPosting")
+
+    posts = Post.objects.filter(status="published").prefetch_related("tags", "categories")
+    for post in posts.iterator(chunk_size=200):
+        lengths, terms = document_terms(
+            post.title,
+            strip_tags(post.content_html),
+            [tag.name for tag in post.tags.all()],
+            [category.name for category in post.categories.all()],
+        )
+        document = SearchDocument.objects.create(
+            post=post,
+            **{f"{field}_length": length for field, length in lengths.items()},
+        )
+        SearchPosting.objects.bulk_create(
+            SearchPosting(
+                document=document,
+                term=term,
+                **{f"{field}_tf": tf for field, tf in tfs.items()},
+            )
+            for term, tfs in terms.items()
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0004_post_summary_word_count_reading_time'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title_length', models.PositiveIntegerField(default=0)),
+                ('content_length', models.PositiveIntegerField(default=0)),
+                ('tags_length', models.PositiveIntegerField(default=0)),
+                ('categories_length', models.PositiveIntegerField(default=0)),
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='search_document', to='blog.post')),
+            ],
+            options={
+                'verbose_name': 'Search document',
+                'verbose_name_plural': 'Search documents',
+            },
+        ),
+        migrations.CreateModel(
+            name='SearchPosting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('title_tf', models.PositiveIntegerField(default=0)),
+                ('content_tf', models.PositiveIntegerField(default=0)),
+                ('tags_tf', models.PositiveIntegerField(default=0)),
+                ('categories_tf', models.PositiveIntegerField(default=0)),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='postings', to='blog.searchdocument')),
+            ],
+            options={
+                'verbose_name': 'Search posting',
+                'verbose_name_plural': 'Search postings',
+                'constraints': [models.UniqueConstraint(fields=('term', 'document'), name='blog_searchposting_unique_term_document')],
+            },
+        ),
+        migrations.RunPython(index_published_posts, migrations.RunPython.noop),
+    ]
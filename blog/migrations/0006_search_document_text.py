@@ -0,0 +1,76 @@
+# Generated by Django 5.2.5 on 2026-10-18 16:21
+
+from django.db import migrations, models, transaction
+from django.db.utils import OperationalError
+
+from blog.rendering import strip_tags
+from blog.search.backends import postgres, sqlite
+
+
+def fill_document_text(apps, schema_editor):
+    SearchDocument = apps.get_model("blog", "SearchDocument")
+    documents = SearchDocument.objects.select_related("post").prefetch_related(
+        "post__tags", "post__categories"
+    )
+    batch = []
+    for document in documents.iterator(chunk_size=200):
+        post = document.post
+        names = [tag.name for tag in post.tags.all()]
+        names += [category.name for category in post.categories.all()]
+        document.title = post.title
+        document.taxonomy = " ".join(names)
+        document.body = strip_tags(post.content_html)
+        batch.append(document)
+        if len(batch) >= 200:
+            SearchDocument.objects.bulk_update(batch, ["title", "taxonomy", "body"])
+            batch = []
+    if batch:
+        SearchDocument.objects.bulk_update(batch, ["title", "taxonomy", "body"])
+
+
+def install_native_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        postgres.install(schema_editor)
+    elif vendor == "sqlite":
+        try:
+            with transaction.atomic(using=schema_editor.connection.alias):
+                sqlite.install(schema_editor)
+        except OperationalError:
+            # SQLite built without FTS5: search falls back to the inverted index.
+            pass
+
+
+def uninstall_native_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        postgres.uninstall(schema_editor)
+    elif vendor == "sqlite":
+        sqlite.uninstall(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0005_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='searchdocument',
+            name='body',
+            field=models.TextField(blank=True, help_text='Plain text of the post content.'),
+        ),
+        migrations.AddField(
+            model_name='searchdocument',
+            name='taxonomy',
+            field=models.TextField(blank=True, help_text='Tag and category names.'),
+        ),
+        migrations.AddField(
+            model_name='searchdocument',
+            name='title',
+            field=models.TextField(blank=True),
+        ),
+        migrations.RunPython(fill_document_text, migrations.RunPython.noop),
+        migrations.RunPython(install_native_index, uninstall_native_index),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.5 on 2026-10-18 16:23
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncMonth
+
+
+def build_archive(apps, schema_editor):
+    Post = apps.get_model("blog", "Post")
+    ArchiveMonth = apps.get_model("blog", "ArchiveMonth")
+    counts = (
+        Post.objects.filter(status="published", published_date__isnull=False)
+        .annotate(archive_month=TruncMonth("published_date"))
+        .values("archive_month")
+        .annotate(post_count=Count("id"))
+    )
+    ArchiveMonth.objects.bulk_create(
+        ArchiveMonth(
+            year=row["archive_month"].year,
+            month=row["archive_month"].month,
+            post_count=row["post_count"],
+        )
+        for row in counts
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0007_post_listing_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchiveMonth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField()),
+                ('month', models.PositiveSmallIntegerField()),
+                ('post_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Archive month',
+                'verbose_name_plural': 'Archive months',
+                'ordering': ['-year', '-month'],
+                'constraints': [models.UniqueConstraint(fields=('year', 'month'), name='blog_archivemonth_unique_year_month')],
+            },
+        ),
+        migrations.RunPython(build_archive, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.5 on 2026-10-18 16:42
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def log_existing_objects(apps, schema_editor):
+    """Start the log with an upsert for everything the API shows today."""
+    ChangeLogEntry = apps.get_model("blog", "ChangeLogEntry")
+    now = timezone.now()
+    entries = []
+    for kind in ("category", "tag"):
+        Model = apps.get_model("blog", kind)
+        entries.extend(
+            ChangeLogEntry(kind=kind, object_id=pk, action="upsert", visible_at=now)
+            for pk in Model.objects.values_list("pk", flat=True).iterator()
+        )
+    posts = apps.get_model("blog", "Post").objects.filter(
+        status="published", published_date__isnull=False
+    )
+    entries.extend(
+        ChangeLogEntry(kind="post", object_id=pk, action="upsert", visible_at=max(now, published))
+        for pk, published in posts.values_list("pk", "published_date").iterator()
+    )
+    ChangeLogEntry.objects.bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0008_archive_month'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLogEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('post', 'Post'), ('category', 'Category'), ('tag', 'Tag')], max_length=10)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('action', models.CharField(choices=[('upsert', 'Created or updated'), ('delete', 'Deleted')], max_length=10)),
+                ('visible_at', models.DateTimeField(help_text='When the change shows in the API; later than now for scheduled posts.')),
+            ],
+            options={
+                'verbose_name': 'Change log entry',
+                'verbose_name_plural': 'Change log entries',
+                'ordering': ['visible_at', 'id'],
+                'indexes': [models.Index(fields=['visible_at', 'id'], name='blog_changelog_cursor_idx')],
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='blog_changelogentry_unique_kind_object')],
+            },
+        ),
+        migrations.RunPython(log_existing_objects, migrations.RunPython.noop),
+    ]
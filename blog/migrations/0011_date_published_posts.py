@@ -0,0 +1,61 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:10
+
+from django.db import migrations
+from django.db.models import Count, F
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+
+def date_published_posts(apps, schema_editor):
+    """
+    Give published posts without a date their creation date.
+
+    The admin "publish" action used to leave the date empty, which kept
+    those posts out of the archive, the change log and keyset listings.
+    """
+    Post = apps.get_model("blog", "Post")
+    ArchiveMonth = apps.get_model("blog", "ArchiveMonth")
+    ChangeLogEntry = apps.get_model("blog", "ChangeLogEntry")
+
+    undated = Post.objects.filter(status="published", published_date__isnull=True)
+    post_ids = list(undated.values_list("pk", flat=True))
+    if not post_ids:
+        return
+    undated.update(published_date=F("created_at"))
+
+    counts = (
+        Post.objects.filter(status="published", published_date__isnull=False)
+        .annotate(archive_month=TruncMonth("published_date"))
+        .values("archive_month")
+        .annotate(post_count=Count("id"))
+    )
+    ArchiveMonth.objects.all().delete()
+    ArchiveMonth.objects.bulk_create(
+        ArchiveMonth(
+            year=row["archive_month"].year,
+            month=row["archive_month"].month,
+            post_count=row["post_count"],
+        )
+        for row in counts
+    )
+
+    now = timezone.now()
+    ChangeLogEntry.objects.filter(kind="post", object_id__in=post_ids).delete()
+    ChangeLogEntry.objects.bulk_create(
+        (
+            ChangeLogEntry(kind="post", object_id=pk, action="upsert", visible_at=now)
+            for pk in post_ids
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0010_post_image_renditions'),
+    ]
+
+    operations = [
+        migrations.RunPython(date_published_posts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.5 on 2026-10-18 19:05
+
+from django.db import migrations, models
+from django.db.models import Avg
+
+from blog.search.backends.inverted import term_weight
+from blog.search.index import FIELDS
+
+
+def compute_impacts(apps, schema_editor):
+    SearchDocument = apps.get_model("blog", "SearchDocument")
+    SearchPosting = apps.get_model("blog", "SearchPosting")
+
+    stats = SearchDocument.objects.aggregate(
+        **{field: Avg(f"{field}_length") for field in FIELDS}
+    )
+    averages = {field: stats[field] or 1.0 for field in FIELDS}
+
+    postings = SearchPosting.objects.select_related("document")
+    batch = []
+    for posting in postings.iterator(chunk_size=1000):
+        posting.impact = term_weight(
+            {field: getattr(posting, f"{field}_tf") for field in FIELDS},
+            {field: getattr(posting.document, f"{field}_length") for field in FIELDS},
+            averages,
+        )
+        batch.append(posting)
+        if len(batch) >= 1000:
+            SearchPosting.objects.bulk_update(batch, ["impact"])
+            batch = []
+    SearchPosting.objects.bulk_update(batch, ["impact"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0011_date_published_posts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='searchposting',
+            name='impact',
+            field=models.FloatField(default=0.0, help_text='BM25F weight of the term in the document, before idf.'),
+        ),
+        migrations.AddIndex(
+            model_name='searchposting',
+            index=models.Index(fields=['term', '-impact'], name='blog_searchposting_impact_idx'),
+        ),
+        migrations.RunPython(compute_impacts, migrations.RunPython.noop),
+    ]
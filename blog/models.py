@@ -1,13 +1,19 @@
 from typing import ClassVar
-import re
 
 from django.contrib.auth.models import User
 from django.db import models
 from django.utils import timezone
 from django.utils.text import slugify
 from django.urls import reverse
-import markdown as md
-import bleach
+
+from .rendering import (
+    RENDERER_VERSION,
+    markdown_to_text,
+    reading_time,
+    render_markdown,
+    strip_tags,
+    truncate_words,
+)
 
 
 # Create your models here.
@@ -68,6 +74,15 @@ class Post(BaseModel):
         ("published", "Published"),
     )
 
+    # Columns recomputed from ``content`` by populate_derived_fields().
+    CONTENT_DERIVED_FIELDS = (
+        "content_html",
+        "content_html_version",
+        "summary",
+        "word_count",
+        "reading_time",
+    )
+
     title = models.CharField(max_length=200)
     slug = models.SlugField(max_length=200, unique=True)
     author = models.ForeignKey(
@@ -76,6 +91,27 @@ class Post(BaseModel):
         related_name="blog_posts",
     )
     content = models.TextField()
+    content_html = models.TextField(
+        blank=True,
+        editable=False,
+        help_text="Sanitized HTML rendered from the markdown content on save.",
+    )
+    content_html_version = models.PositiveSmallIntegerField(
+        default=0,
+        editable=False,
+        help_text="Renderer version that produced content_html.",
+    )
+    summary = models.TextField(
+        blank=True,
+        editable=False,
+        help_text="Plain-text summary derived from the content on save.",
+    )
+    word_count = models.PositiveIntegerField(default=0, editable=False)
+    reading_time = models.PositiveSmallIntegerField(
+        default=0,
+        editable=False,
+        help_text="Estimated reading time in minutes.",
+    )
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="draft")
     categories = models.ManyToManyField(Category, related_name="posts")
     tags = models.ManyToManyField(Tag, related_name="posts")
@@ -94,6 +130,12 @@ class Post(BaseModel):
         null=True,
         help_text="Image for the blog post and Open Graph preview.",
     )
+    image_renditions = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        help_text="Size of the image and its resized copies; see blog.images.",
+    )
 
     # You can reuse meta_title and meta_description, or add specific OG fields:
     og_title = models.CharField(
@@ -111,6 +153,13 @@ class Post(BaseModel):
         verbose_name = "Post"
         verbose_name_plural = "Posts"
         ordering: ClassVar = ["-published_date", "-created_at"]
+        indexes: ClassVar = [
+            # Serves the newest-first listings and their keyset pagination.
+            models.Index(
+                fields=["status", "-published_date", "-id"],
+                name="blog_post_status_pub_id_idx",
+            ),
+        ]
 
     def get_absolute_url(self):
         """Returns the canonical URL for a post."""
@@ -126,7 +175,29 @@ class Post(BaseModel):
         if self.status == "published" and not self.published_date:
             self.published_date = timezone.now()
 
-        # --- NEW: Automatically populate OG fields if they are empty ---
+        self.populate_derived_fields()
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "content" in update_fields:
+            kwargs["update_fields"] = {*update_fields, *self.CONTENT_DERIVED_FIELDS}
+
+        super().save(*args, **kwargs)
+
+    def populate_derived_fields(self):
+        """
+        Fill in the denormalized fields derived from the title and content.
+
+        Runs on every save so list pages and feeds never have to touch the
+        markdown engine.
+        """
+        self.render_content()
+
+        plain_text = markdown_to_text(self.content)
+        self.summary = truncate_words(plain_text)
+        self.word_count = len(strip_tags(self.content_html).split())
+        self.reading_time = reading_time(self.word_count)
+
+        # --- Automatically populate OG fields if they are empty ---
         if not self.og_title:
             # Use the meta_title if available, otherwise use the main title
             self.og_title = self.meta_title if self.meta_title else self.title
@@ -136,26 +207,14 @@ class Post(BaseModel):
             if self.meta_description:
                 self.og_description = self.meta_description
             else:
-                # A simple way to get a plain text summary
-                # plain_content = self.content.replace("\n", " ").replace("\r", "")
-
-                # 0 Remove markdown headers from content
-                content_without_headers = re.sub(
-                    r"^#{1,6}\s+.*$", "", self.content, flags=re.MULTILINE
-                ).strip()
-
-                # 1. Convert Markdown to HTML
-                plain_content = md.markdown(content_without_headers)
-
-                # Strip HTML tags
-                plain_text = bleach.clean(plain_content, tags=set([]), strip=True)
-
-                # Truncate to 160 characters
                 self.og_description = (
                     (plain_text[:157] + "...") if len(plain_text) > 160 else plain_text
                 )
 
-        super().save(*args, **kwargs)
+    def render_content(self):
+        """Render the markdown content into the stored HTML column."""
+        self.content_html = render_markdown(self.content)
+        self.content_html_version = RENDERER_VERSION
 
     def publish(self):
         """Method to publish a draft post."""
@@ -169,25 +228,143 @@ class Post(BaseModel):
         self.published_date = None
         self.save()
 
-    @property
-    def summary(self):
-        """
-        A plain-text, truncated summary of the post content.
-        """
-        # 0 Remove markdown headers from content
-        content_without_headers = re.sub(
-            r"^#{1,6}\s+.*$", "", self.content, flags=re.MULTILINE
-        ).strip()
-
-        # 1. Convert Markdown to HTML
-        # html_body = md.markdown(self.content)
-        html_body = md.markdown(content_without_headers)
-
-        # 2. Strip HTML tags
-        plain_text = bleach.clean(html_body, tags=set([]), strip=True)
-
-        # 3. Truncate words (a simple way)
-        words = plain_text.split()
-        if len(words) > 30:
-            return " ".join(words[:30]) + "..."
-        return plain_text
+
+class SearchDocument(BaseModel):
+    """
+    Searchable text of a published post.
+
+    Only published posts have a document; see ``blog.search``. The text
+    columns feed the database-native full-text indexes, the lengths feed
+    the inverted index.
+    """
+
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        related_name="search_document",
+    )
+    title = models.TextField(blank=True)
+    taxonomy = models.TextField(blank=True, help_text="Tag and category names.")
+    body = models.TextField(blank=True, help_text="Plain text of the post content.")
+    title_length = models.PositiveIntegerField(default=0)
+    content_length = models.PositiveIntegerField(default=0)
+    tags_length = models.PositiveIntegerField(default=0)
+    categories_length = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Search document"
+        verbose_name_plural = "Search documents"
+
+    def __str__(self):
+        return f"Search document for post {self.post_id}"
+
+
+class SearchPosting(BaseModel):
+    """Term frequencies of one term in one document, per indexed field."""
+
+    document = models.ForeignKey(
+        SearchDocument,
+        on_delete=models.CASCADE,
+        related_name="postings",
+    )
+    term = models.CharField(max_length=64)
+    title_tf = models.PositiveIntegerField(default=0)
+    content_tf = models.PositiveIntegerField(default=0)
+    tags_tf = models.PositiveIntegerField(default=0)
+    categories_tf = models.PositiveIntegerField(default=0)
+    impact = models.FloatField(
+        default=0.0,
+        help_text="BM25F weight of the term in the document, before idf.",
+    )
+
+    class Meta:
+        verbose_name = "Search posting"
+        verbose_name_plural = "Search postings"
+        indexes: ClassVar = [
+            models.Index(fields=["term", "-impact"], name="blog_searchposting_impact_idx"),
+        ]
+        constraints: ClassVar = [
+            models.UniqueConstraint(
+                fields=["term", "document"],
+                name="blog_searchposting_unique_term_document",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.term} in document {self.document_id}"
+
+
+class ArchiveMonth(BaseModel):
+    """
+    Number of published posts in one calendar month.
+
+    A materialized view of the archive kept current by ``blog.archive``, so
+    the sidebar never has to scan the posts table.
+    """
+
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    post_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Archive month"
+        verbose_name_plural = "Archive months"
+        ordering: ClassVar = ["-year", "-month"]
+        constraints: ClassVar = [
+            models.UniqueConstraint(
+                fields=["year", "month"],
+                name="blog_archivemonth_unique_year_month",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.year}-{self.month:02d} ({self.post_count})"
+
+    def get_absolute_url(self):
+        """Returns the canonical URL for the month's archive page."""
+        return reverse(
+            "blog:month_archive", kwargs={"year": self.year, "month": self.month}
+        )
+
+
+class ChangeLogEntry(BaseModel):
+    """
+    The latest change to one post, category or tag, as seen by the API.
+
+    Kept current by ``blog.changelog``: each object has a single entry,
+    moved to the end of the log whenever the object changes, so mirrors can
+    sync everything that changed since their last cursor in one request.
+    """
+
+    class Kind(models.TextChoices):
+        POST = "post", "Post"
+        CATEGORY = "category", "Category"
+        TAG = "tag", "Tag"
+
+    class Action(models.TextChoices):
+        UPSERT = "upsert", "Created or updated"
+        DELETE = "delete", "Deleted"
+
+    kind = models.CharField(max_length=10, choices=Kind.choices)
+    object_id = models.PositiveBigIntegerField()
+    action = models.CharField(max_length=10, choices=Action.choices)
+    visible_at = models.DateTimeField(
+        help_text="When the change shows in the API; later than now for scheduled posts.",
+    )
+
+    class Meta:
+        verbose_name = "Change log entry"
+        verbose_name_plural = "Change log entries"
+        ordering: ClassVar = ["visible_at", "id"]
+        indexes: ClassVar = [
+            models.Index(fields=["visible_at", "id"], name="blog_changelog_cursor_idx"),
+        ]
+        constraints: ClassVar = [
+            models.UniqueConstraint(
+                fields=["kind", "object_id"],
+                name="blog_changelogentry_unique_kind_object",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.action} {self.kind} {self.object_id} at {self.visible_at:%Y-%m-%d %H:%M:%S}"
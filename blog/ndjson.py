@@ -0,0 +1,57 @@
+"""
+Newline-delimited JSON streams for bulk API exports.
+
+Rows are read with ``QuerySet.iterator()`` and written a chunk at a time,
+optionally gzip-compressed as they go, so memory use does not depend on
+the number of rows.
+"""
+
+import zlib
+from itertools import batched
+
+from rest_framework import renderers
+from rest_framework.utils.encoders import JSONEncoder
+
+CONTENT_TYPE = "application/x-ndjson"
+CHUNK_SIZE = 500
+
+
+def serialize_lines(queryset, serializer, chunk_size=CHUNK_SIZE):
+    """
+    Yield one block of NDJSON lines per chunk of ``queryset``.
+
+    ``serializer`` is a post serializer instance built without data; its
+    prefetches run once per chunk and its representation cache is skipped.
+    """
+    encoder = JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+    rows = queryset.prefetch_related(*serializer.prefetch_lookups).iterator(chunk_size=chunk_size)
+    for chunk in batched(rows, chunk_size):
+        yield "".join(encoder.encode(serializer.build_representation(row)) + "\n" for row in chunk).encode()
+
+
+def gzip_stream(blocks, level=6):
+    """Compress a stream of byte blocks into a single gzip member, block by block."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for block in blocks:
+        # Flush each block so consumers can start decoding before the end
+        yield compressor.compress(block) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+def accepts_gzip(request):
+    """Whether the client advertised gzip in ``Accept-Encoding``."""
+    encodings = request.headers.get("Accept-Encoding", "")
+    return any(encoding.split(";")[0].strip() == "gzip" for encoding in encodings.split(","))
+
+
+class NDJSONRenderer(renderers.BaseRenderer):
+    """Accept NDJSON requests; errors are rendered as a single JSON line."""
+
+    media_type = CONTENT_TYPE
+    format = "ndjson"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return JSONEncoder(ensure_ascii=False).encode(data).encode() + b"\n"
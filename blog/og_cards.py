@@ -0,0 +1,225 @@
+"""
+Open Graph cards: the image shown when a post without its own image is shared.
+
+A card is a 1200x630 PNG of the post's ``og_title``, author and tags. It is
+stored in the default storage under a hash of those inputs,
+
+    og_cards/<post id>/<digest>.png
+
+so a card is drawn once, and again only after its inputs change. Its URL
+carries the digest too, which lets ``views.og_card`` serve it with a
+year-long ``Cache-Control``. Cards are drawn on the first request for them;
+``manage.py generate_og_cards`` draws the missing ones for every post.
+"""
+
+import hashlib
+import io
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections
+from django.db.models import Prefetch, Q
+from django.urls import reverse
+from PIL import Image, ImageDraw, ImageFont
+
+from .models import Post, Tag
+
+# Bump to redraw every card after changing the layout
+CARD_VERSION = 1
+CARD_SIZE = (1200, 630)
+CARDS_DIR = "og_cards/"
+SITE_NAME = "Byte Board Blog"
+
+BACKGROUND = "#1e293b"
+ACCENT = "#38bdf8"
+TEXT = "#f8fafc"
+MUTED = "#94a3b8"
+MARGIN = 80
+TITLE_SIZES = (72, 64, 56, 48)
+TITLE_MAX_LINES = 3
+MAX_TAGS = 5
+
+
+def _font_path():
+    return getattr(settings, "BLOG_OG_CARDS", {}).get("FONT")
+
+
+@lru_cache(maxsize=16)
+def _font(path, size):
+    if path:
+        return ImageFont.truetype(path, size)
+    return ImageFont.load_default(size)
+
+
+def card_posts():
+    """Published posts with just what their cards are drawn from."""
+    return (
+        Post.objects.filter(status="published")
+        .select_related("author")
+        .only(
+            "title",
+            "og_title",
+            "image",
+            "author__username",
+            "author__first_name",
+            "author__last_name",
+        )
+        .prefetch_related(Prefetch("tags", Tag.objects.only("name")))
+    )
+
+
+def posts_needing_cards():
+    """Published posts without an image of their own, which are shared with a card."""
+    return card_posts().filter(Q(image="") | Q(image__isnull=True))
+
+
+def card_inputs(post):
+    """Everything a post's card depends on, as JSON-serializable data."""
+    return {
+        "version": CARD_VERSION,
+        "font": _font_path(),
+        "title": post.og_title or post.title,
+        "author": post.author.get_full_name() or post.author.username,
+        "tags": sorted(tag.name for tag in post.tags.all())[:MAX_TAGS],
+    }
+
+
+def card_digest(inputs):
+    encoded = json.dumps(inputs, sort_keys=True).encode()
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+def card_name(post_id, digest):
+    return f"{CARDS_DIR}{post_id}/{digest}.png"
+
+
+def card_url(post):
+    """Path of the view serving the post's current card."""
+    digest = card_digest(card_inputs(post))
+    return reverse("blog:og_card", kwargs={"pk": post.pk, "digest": digest})
+
+
+def _wrap(draw, text, font, width):
+    lines = []
+    for word in text.split():
+        if lines and draw.textlength(f"{lines[-1]} {word}", font=font) <= width:
+            lines[-1] = f"{lines[-1]} {word}"
+        else:
+            lines.append(word)
+    return lines
+
+
+def _fit_title(draw, title, width):
+    """Wrap the title in the largest size that fits, truncating at the smallest."""
+    path = _font_path()
+    for size in TITLE_SIZES:
+        font = _font(path, size)
+        lines = _wrap(draw, title, font, width)
+        if len(lines) <= TITLE_MAX_LINES:
+            return font, lines
+    lines = lines[:TITLE_MAX_LINES]
+    while draw.textlength(lines[-1] + "…", font=font) > width and " " in lines[-1]:
+        lines[-1] = lines[-1].rsplit(" ", 1)[0]
+    lines[-1] += "…"
+    return font, lines
+
+
+def render_card(inputs):
+    """Draw a card from ``card_inputs()``; returns the PNG bytes."""
+    width, height = CARD_SIZE
+    image = Image.new("RGB", CARD_SIZE, BACKGROUND)
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((0, 0, 16, height), fill=ACCENT)
+    path = _font_path()
+
+    draw.text((MARGIN, MARGIN), SITE_NAME, font=_font(path, 32), fill=ACCENT)
+
+    font, lines = _fit_title(draw, inputs["title"], width - 2 * MARGIN)
+    line_height = round(font.size * 1.2)
+    top = (height - line_height * len(lines)) // 2
+    for index, line in enumerate(lines):
+        draw.text((MARGIN, top + index * line_height), line, font=font, fill=TEXT)
+
+    small = _font(path, 30)
+    bottom = height - MARGIN - small.size
+    draw.text((MARGIN, bottom), inputs["author"], font=small, fill=TEXT)
+    tags = "  ".join(f"#{name}" for name in inputs["tags"])
+    if tags:
+        tags_width = draw.textlength(tags, font=small)
+        draw.text((width - MARGIN - tags_width, bottom), tags, font=small, fill=MUTED)
+
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG", optimize=True)
+    return buffer.getvalue()
+
+
+def ensure_card(post_id, inputs, force=False, storage=default_storage):
+    """
+    Draw the card for ``inputs`` unless it is stored already; returns its name.
+
+    The post's cards for earlier inputs are deleted.
+    """
+    name = card_name(post_id, card_digest(inputs))
+    if storage.exists(name) and not force:
+        return name
+
+    data = render_card(inputs)
+    if storage.exists(name):
+        storage.delete(name)
+    saved = storage.save(name, ContentFile(data))
+    if saved != name:
+        # Another request stored the same card meanwhile
+        storage.delete(saved)
+
+    directory = f"{CARDS_DIR}{post_id}"
+    for filename in storage.listdir(directory)[1]:
+        if f"{directory}/{filename}" != name:
+            storage.delete(f"{directory}/{filename}")
+    return name
+
+
+def _write_card(post_id, inputs, force):
+    name = card_name(post_id, card_digest(inputs))
+    if default_storage.exists(name) and not force:
+        return False
+    ensure_card(post_id, inputs, force=force)
+    return True
+
+
+def generate_cards(workers=1, force=False, chunk_size=500):
+    """
+    Draw the missing cards of published posts without an image.
+
+    Posts are read here and cards drawn in ``workers`` processes. Returns
+    the number of cards drawn.
+    """
+    posts = posts_needing_cards()
+    jobs = [(post.pk, card_inputs(post)) for post in posts.iterator(chunk_size=chunk_size)]
+    if not force:
+        jobs = [
+            (post_id, inputs)
+            for post_id, inputs in jobs
+            if not default_storage.exists(card_name(post_id, card_digest(inputs)))
+        ]
+    if workers <= 1 or len(jobs) < 2:
+        return sum(_write_card(post_id, inputs, force) for post_id, inputs in jobs)
+
+    # Forked workers must not share the parent's database connections
+    connections.close_all()
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("fork")
+    ) as executor:
+        post_ids, all_inputs = zip(*jobs)
+        results = executor.map(
+            _write_card,
+            post_ids,
+            all_inputs,
+            [force] * len(jobs),
+            chunksize=max(1, len(jobs) // (workers * 4)),
+        )
+        return sum(results)
@@ -0,0 +1,292 @@
+"""
+Full-page cache for anonymous visitors with dependency-based invalidation.
+
+Views declare what a page shows with ``depends_on(request, ...)``, using
+names such as ``post:12``, ``category:3``, ``tag:7``, ``archive:2025`` or
+``archive:2025-8``. Each name has a version number in the cache; a cached
+page remembers the versions it was rendered against and is only served
+while all of them are unchanged. ``purge()`` bumps versions, so a change
+retires exactly the pages that depend on it.
+
+The sidebar's category, tag and archive lists are on every page, so pages
+do not depend on them. A page is stored with a hole between the
+``SIDEBAR_START`` and ``SIDEBAR_END`` markers, filled when it is served
+with the lists of the current sidebar generation (see ``blog.sidebar``),
+which are rendered once per generation.
+"""
+
+import hashlib
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import parse_http_date_safe, quote_etag
+
+from . import archive, sidebar
+from .models import Post
+from .pagination import STATIC_EXPORT_ENVIRON
+
+LISTING = "listing"
+SIDEBAR = "sidebar"
+
+DEPENDENCY_KEY = "blog:page_cache:dep:{name}"
+PAGE_KEY = "blog:page_cache:page:{digest}"
+SIDEBAR_KEY = "blog:page_cache:sidebar:{generation}"
+
+# Around the sidebar lists in blog/partials/sidebar.html
+SIDEBAR_START = b"<!-- sidebar-lists -->"
+SIDEBAR_END = b"<!-- /sidebar-lists -->"
+SIDEBAR_TEMPLATE = "blog/partials/sidebar_lists.html"
+
+# Cache backends whose contents other processes cannot see
+PROCESS_LOCAL_BACKENDS = ("django.core.cache.backends.locmem.LocMemCache",)
+
+
+def _options():
+    return getattr(settings, "BLOG_PAGE_CACHE", {})
+
+
+def is_enabled():
+    return _options().get("ENABLED", True)
+
+
+def check_shared_cache(app_configs, **kwargs):
+    """
+    The versions purged in one process must be seen by all of them.
+
+    With a per-process cache, the other workers would keep serving pages
+    that were purged. That is harmless under ``runserver``, so with ``DEBUG``
+    on it is only a warning.
+    """
+    backend = settings.CACHES.get("default", {}).get("BACKEND")
+    if not is_enabled() or backend not in PROCESS_LOCAL_BACKENDS:
+        return []
+    message = f"BLOG_PAGE_CACHE is enabled with the per-process cache {backend}."
+    hint = (
+        "Configure a cache shared by all processes in CACHES, such as the database "
+        'cache or Redis, or set BLOG_PAGE_CACHE["ENABLED"] to False.'
+    )
+    if settings.DEBUG:
+        return [checks.Warning(message, hint=hint, id="blog.W001")]
+    return [checks.Error(message, hint=hint, id="blog.E001")]
+
+
+def depends_on(request, *names):
+    """Record that the page rendered for ``request`` shows the named objects."""
+    if not hasattr(request, "_page_cache_dependencies"):
+        request._page_cache_dependencies = set()
+    request._page_cache_dependencies.update(names)
+
+
+def post_dependency(post_id):
+    return f"post:{post_id}"
+
+
+def category_dependency(category_id):
+    return f"category:{category_id}"
+
+
+def tag_dependency(tag_id):
+    return f"tag:{tag_id}"
+
+
+def archive_dependency(year, month=None):
+    if month is None:
+        return f"archive:{year}"
+    return f"archive:{year}-{month}"
+
+
+def post_dependencies(post_id, archive_month=None, category_ids=(), tag_ids=()):
+    """Everything showing a published post: its page and the listings it is in."""
+    names = [post_dependency(post_id), LISTING]
+    if archive_month is not None:
+        year, month = archive_month
+        names += [archive_dependency(year), archive_dependency(year, month)]
+    names += [category_dependency(pk) for pk in category_ids]
+    names += [tag_dependency(pk) for pk in tag_ids]
+    return names
+
+
+def posts_dependencies(post_ids):
+    """
+    Everything that may show any of ``post_ids``, whatever their status.
+
+    A post's current publication date stands for its archive month, so
+    pages still listing a post that was just unpublished are covered.
+    """
+    post_ids = list(post_ids)
+    taxonomy = {"categories": defaultdict(list), "tags": defaultdict(list)}
+    for key, field in (("categories", "category_id"), ("tags", "tag_id")):
+        through = getattr(Post, key).through
+        for post_id, pk in through.objects.filter(post_id__in=post_ids).values_list(
+            "post_id", field
+        ):
+            taxonomy[key][post_id].append(pk)
+
+    names = []
+    for pk, published_date in Post.objects.filter(pk__in=post_ids).values_list(
+        "pk", "published_date"
+    ):
+        names += post_dependencies(
+            pk,
+            archive.month_of("published", published_date),
+            category_ids=taxonomy["categories"][pk],
+            tag_ids=taxonomy["tags"][pk],
+        )
+    return names
+
+
+def _dependency_key(name):
+    if name == SIDEBAR:
+        return sidebar.GENERATION_KEY
+    return DEPENDENCY_KEY.format(name=name)
+
+
+def dependency_versions(names):
+    """Current version of each dependency, starting missing ones afresh."""
+    keys = {_dependency_key(name): name for name in names}
+    found = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    return {keys[key]: version for key, version in found.items()}
+
+
+def purge(*names):
+    """Invalidate every cached page depending on any of ``names``."""
+    for name in set(names):
+        key = _dependency_key(name)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Nothing rendered against it yet, or the version was evicted
+            cache.set(key, time.time_ns(), None)
+
+
+def sidebar_etag(etag, generation):
+    """An HTML page's ETag: the ETag of its own content, with the sidebar's generation."""
+    return hashlib.sha1(f"{etag}|{generation}".encode()).hexdigest()
+
+
+def sidebar_fragment():
+    """``(generation, html)`` of the current sidebar lists, rendered on a miss."""
+    generation = sidebar.generation()
+    key = SIDEBAR_KEY.format(generation=generation)
+    html = cache.get(key)
+    if html is None:
+        data = sidebar.get_sidebar_data()
+        html = render_to_string(
+            SIDEBAR_TEMPLATE,
+            {
+                "all_categories": data["categories"],
+                "all_tags": data["tags"],
+                "archive_dates": data["archive_dates"],
+            },
+        )
+        cache.set(key, html, sidebar.DATA_TIMEOUT)
+    return generation, html
+
+
+def _split_sidebar(content):
+    """Cut the sidebar lists out of a page: ``[before, after]``, or None without them."""
+    start = content.find(SIDEBAR_START)
+    end = content.find(SIDEBAR_END, start)
+    if start == -1 or end == -1:
+        return None
+    return [content[: start + len(SIDEBAR_START)], content[end:]]
+
+
+def is_cacheable_request(request):
+    """
+    Only anonymous GET/HEAD requests without pending messages are cached.
+
+    The static exporter's requests bypass the cache: their listings are
+    paginated differently.
+    """
+    if not is_enabled() or request.method not in ("GET", "HEAD"):
+        return False
+    if request.META.get(STATIC_EXPORT_ENVIRON):
+        return False
+    if "messages" in request.COOKIES:
+        return False
+    return not request.user.is_authenticated
+
+
+def page_key(request):
+    """Cache key for the page: host, path, query string and the HTMX header."""
+    raw = "|".join(
+        [
+            request.get_host(),
+            request.get_full_path(),
+            request.headers.get("HX-Request", ""),
+        ]
+    )
+    return PAGE_KEY.format(digest=hashlib.sha256(raw.encode()).hexdigest())
+
+
+def get_cached_response(request):
+    """
+    Return the cached page for ``request`` if it is still current.
+
+    Conditional requests matching the stored validators get a 304 instead.
+    """
+    entry = cache.get(page_key(request))
+    if entry is None:
+        return None
+
+    if dependency_versions(entry["dependencies"]) != entry["dependencies"]:
+        return None
+
+    content = entry["content"]
+    etag = None
+    if isinstance(content, list):
+        generation, html = sidebar_fragment()
+        content = content[0] + html.encode(entry["charset"]) + content[1]
+        if entry["etag"] is not None:
+            etag = quote_etag(sidebar_etag(entry["etag"], generation))
+    response = HttpResponse(content, status=entry["status"])
+    for header, value in entry["headers"]:
+        response[header] = value
+    if etag is not None:
+        response["ETag"] = etag
+    return get_conditional_response(
+        request,
+        etag=response.get("ETag"),
+        last_modified=parse_http_date_safe(response.get("Last-Modified", "")),
+        response=response,
+    )
+
+
+def store_response(request, response):
+    """Cache a rendered page, if it declared its dependencies and is shareable."""
+    names = getattr(request, "_page_cache_dependencies", None)
+    if not names or request.method != "GET":
+        return
+    if response.status_code != 200 or response.streaming or response.cookies:
+        return
+    if "private" in response.get("Cache-Control", "") or "no-store" in response.get(
+        "Cache-Control", ""
+    ):
+        return
+
+    patch_vary_headers(response, ["HX-Request"])
+    entry = {
+        "dependencies": dependency_versions(names),
+        "status": response.status_code,
+        "headers": [
+            (header, value)
+            for header, value in response.items()
+            if header.lower() not in ("set-cookie", "content-length")
+        ],
+        "content": _split_sidebar(response.content) or response.content,
+        "charset": response.charset,
+        # The ETag of the content without the sidebar, see conditional.validators()
+        "etag": getattr(request, "_page_etag", None),
+    }
+    cache.set(page_key(request), entry, _options().get("TIMEOUT", 60 * 60))
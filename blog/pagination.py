@@ -0,0 +1,129 @@
+"""
+Keyset (cursor) pagination for post listings.
+
+Pages are addressed by an opaque cursor holding the ``(published_date, id)``
+of the row next to the page boundary instead of a page number, so every
+page is a single indexed range query: no ``COUNT(*)`` and no ``OFFSET``.
+"""
+
+import base64
+import binascii
+from datetime import datetime
+
+from django.db.models import Q
+
+NEXT = "n"
+PREVIOUS = "p"
+
+# WSGI environ key set on requests made by the static exporter. Their listings
+# always use page numbers, which map onto exported files; not settable over HTTP.
+STATIC_EXPORT_ENVIRON = "blog.static_export"
+
+
+def encode_cursor(direction, post):
+    """Build the cursor pointing past ``post`` in the given direction."""
+    raw = f"{direction}|{post.published_date.isoformat()}|{post.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Return ``(direction, published_date, id)``, or None for a bad cursor."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        direction, published, pk = (
+            base64.urlsafe_b64decode(padded.encode()).decode().split("|")
+        )
+        if direction not in (NEXT, PREVIOUS):
+            return None
+        return direction, datetime.fromisoformat(published), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+class KeysetPage:
+    """
+    One page of a keyset listing.
+
+    Offers the subset of ``django.core.paginator.Page`` that the listing
+    templates use, plus ``next_cursor``/``previous_cursor`` for the links.
+    """
+
+    is_keyset = True
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f"<KeysetPage of {len(self.object_list)} posts>"
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Paginate published posts newest first, ordered on ``(published_date, id)``.
+
+    Published posts always have a date (``Post.save()``, the admin publish
+    action and migration 0011 see to it); a post without one could not be
+    placed in the order, so it is left out rather than breaking the cursor.
+    """
+
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset.filter(published_date__isnull=False)
+        self.per_page = per_page
+
+    def page(self, cursor=None):
+        """Return the page after (or before) ``cursor``; the first page if unset."""
+        position = decode_cursor(cursor) if cursor else None
+
+        if position is None:
+            rows = list(self.queryset.order_by("-published_date", "-id")[: self.per_page + 1])
+            has_more = len(rows) > self.per_page
+            rows = rows[: self.per_page]
+            return self._build_page(rows, has_next=has_more, has_previous=False)
+
+        direction, published_date, pk = position
+        if direction == NEXT:
+            rows = list(
+                self.queryset.filter(
+                    Q(published_date__lt=published_date)
+                    | Q(published_date=published_date, id__lt=pk)
+                ).order_by("-published_date", "-id")[: self.per_page + 1]
+            )
+            has_more = len(rows) > self.per_page
+            rows = rows[: self.per_page]
+            return self._build_page(rows, has_next=has_more, has_previous=True)
+
+        rows = list(
+            self.queryset.filter(
+                Q(published_date__gt=published_date)
+                | Q(published_date=published_date, id__gt=pk)
+            ).order_by("published_date", "id")[: self.per_page + 1]
+        )
+        has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        rows.reverse()
+        return self._build_page(rows, has_next=True, has_previous=has_more)
+
+    def _build_page(self, rows, has_next, has_previous):
+        next_cursor = encode_cursor(NEXT, rows[-1]) if rows and has_next else None
+        previous_cursor = encode_cursor(PREVIOUS, rows[0]) if rows and has_previous else None
+        return KeysetPage(rows, next_cursor=next_cursor, previous_cursor=previous_cursor)
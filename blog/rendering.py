@@ -0,0 +1,261 @@
+"""
+Markdown rendering for post content.
+
+Every markdown call site goes through the shared ``renderer``, which caches
+rendered HTML by a hash of the source text and the extension configuration:
+first in a bounded in-process LRU, then in the configured Django cache.
+"""
+
+import hashlib
+import json
+import math
+import re
+import threading
+from collections import OrderedDict
+
+import bleach
+import markdown
+from django.conf import settings
+from django.core.cache import caches
+
+# Bump this whenever the extension set, its configuration or the sanitizer
+# allow-list changes, then run ``manage.py rerender_posts`` to rebuild the
+# stored HTML of every post rendered by an older version.
+RENDERER_VERSION = 1
+
+MARKDOWN_EXTENSIONS = [
+    "markdown.extensions.fenced_code",
+    "markdown.extensions.codehilite",
+    "markdown.extensions.tables",
+    "markdown.extensions.toc",
+]
+
+MARKDOWN_EXTENSION_CONFIGS = {
+    "markdown.extensions.codehilite": {
+        "css_class": "highlight",
+        "linenums": False,
+    },
+    # Emit ``align`` rather than inline ``style`` so the sanitizer can keep it.
+    "markdown.extensions.tables": {
+        "use_align_attribute": True,
+    },
+}
+
+# Number of words kept in the plain-text summary shown on list pages.
+SUMMARY_WORDS = 30
+
+# Average adult reading speed used for the reading time estimate.
+WORDS_PER_MINUTE = 200
+
+HEADER_RE = re.compile(r"^#{1,6}\s+.*$", flags=re.MULTILINE)
+
+# Tags and attributes produced by the extensions above (Pygments spans,
+# tables, toc anchors) on top of bleach's conservative defaults.
+ALLOWED_TAGS = bleach.sanitizer.ALLOWED_TAGS | {
+    "p",
+    "br",
+    "hr",
+    "h1",
+    "h2",
+    "h3",
+    "h4",
+    "h5",
+    "h6",
+    "pre",
+    "code",
+    "span",
+    "div",
+    "img",
+    "table",
+    "thead",
+    "tbody",
+    "tr",
+    "th",
+    "td",
+    "del",
+    "sup",
+    "sub",
+}
+
+ALLOWED_ATTRIBUTES = {
+    "a": ["href", "title", "id", "class"],
+    "img": ["src", "alt", "title", "width", "height"],
+    "abbr": ["title"],
+    "acronym": ["title"],
+    "h1": ["id"],
+    "h2": ["id"],
+    "h3": ["id"],
+    "h4": ["id"],
+    "h5": ["id"],
+    "h6": ["id"],
+    "th": ["align"],
+    "td": ["align"],
+    "span": ["class"],
+    "div": ["class"],
+    "pre": ["class"],
+    "code": ["class"],
+}
+
+
+class MarkdownRenderer:
+    """
+    Content-addressed markdown renderer.
+
+    Rendered HTML is kept in an in-process LRU bounded by the total size of
+    the cached strings, backed by a Django cache shared between workers.
+    Both are keyed by a SHA-256 of the source and the extension config, so
+    identical sources are only rendered once no matter where they come from.
+    With ``shared=False`` only the local LRU is used, so rendering never
+    touches the database cache.
+    """
+
+    def __init__(self, max_bytes=None, cache_alias=None, timeout=None, shared=True):
+        options = getattr(settings, "MARKDOWN_RENDER_CACHE", {})
+        self.max_bytes = (
+            max_bytes if max_bytes is not None else options.get("MAX_BYTES", 8 << 20)
+        )
+        self.cache_alias = cache_alias or options.get("CACHE_ALIAS", "default")
+        self.timeout = timeout if timeout is not None else options.get("TIMEOUT")
+        self.shared = shared
+        self._local = OrderedDict()
+        self._local_bytes = 0
+        self._lock = threading.Lock()
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def cache_key(source, extensions, extension_configs, sanitize):
+        """Hash of everything that determines the rendered output."""
+        config = json.dumps(
+            [RENDERER_VERSION, extensions, extension_configs, sanitize],
+            sort_keys=True,
+            default=str,
+        )
+        digest = hashlib.sha256()
+        digest.update(config.encode())
+        digest.update(b"\0")
+        digest.update(source.encode())
+        return f"markdown:{digest.hexdigest()}"
+
+    def render(
+        self,
+        source,
+        extensions=MARKDOWN_EXTENSIONS,
+        extension_configs=MARKDOWN_EXTENSION_CONFIGS,
+        sanitize=True,
+    ):
+        """Return the HTML for ``source``, rendering it only on a cache miss."""
+        key = self.cache_key(source, extensions, extension_configs, sanitize)
+
+        with self._lock:
+            html = self._local.get(key)
+            if html is not None:
+                self._local.move_to_end(key)
+                self.local_hits += 1
+                return html
+
+        shared_cache = caches[self.cache_alias] if self.shared else None
+        html = shared_cache.get(key) if shared_cache is not None else None
+        if html is None:
+            html = markdown.markdown(
+                source,
+                extensions=extensions,
+                extension_configs=extension_configs,
+            )
+            if sanitize:
+                html = bleach.clean(
+                    html,
+                    tags=ALLOWED_TAGS,
+                    attributes=ALLOWED_ATTRIBUTES,
+                    strip=True,
+                )
+            if shared_cache is not None:
+                if self.timeout is None:
+                    shared_cache.set(key, html)
+                else:
+                    shared_cache.set(key, html, self.timeout)
+            hit = False
+        else:
+            hit = True
+
+        with self._lock:
+            if hit:
+                self.shared_hits += 1
+            else:
+                self.misses += 1
+            self._remember(key, html)
+        return html
+
+    def _remember(self, key, html):
+        """Add an entry to the local LRU, evicting the oldest to stay in budget."""
+        size = len(html)
+        if size > self.max_bytes or key in self._local:
+            return
+        self._local[key] = html
+        self._local_bytes += size
+        while self._local_bytes > self.max_bytes:
+            _, evicted = self._local.popitem(last=False)
+            self._local_bytes -= len(evicted)
+
+    def stats(self):
+        """Hit/miss counters and the current size of the local LRU."""
+        with self._lock:
+            return {
+                "local_hits": self.local_hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "local_entries": len(self._local),
+                "local_bytes": self._local_bytes,
+            }
+
+    def clear(self):
+        """Drop the in-process entries and reset the counters."""
+        with self._lock:
+            self._local.clear()
+            self._local_bytes = 0
+            self.local_hits = self.shared_hits = self.misses = 0
+
+
+renderer = MarkdownRenderer()
+
+
+def render_markdown(source):
+    """Render markdown source to sanitized HTML with syntax highlighting."""
+    return renderer.render(source)
+
+
+def strip_tags(html):
+    """Return the text of an HTML fragment with every tag removed."""
+    return bleach.clean(html, tags=set(), strip=True)
+
+
+def markdown_to_text(source):
+    """
+    Convert markdown to plain text suitable for summaries and meta tags.
+
+    Headers are dropped first so the text starts with the body copy.
+    """
+    content_without_headers = HEADER_RE.sub("", source).strip()
+    html = renderer.render(
+        content_without_headers,
+        extensions=[],
+        extension_configs={},
+        sanitize=False,
+    )
+    return strip_tags(html)
+
+
+def truncate_words(text, num_words=SUMMARY_WORDS):
+    """Truncate text to a number of words, adding an ellipsis if cut."""
+    words = text.split()
+    if len(words) > num_words:
+        return " ".join(words[:num_words]) + "..."
+    return text
+
+
+def reading_time(word_count):
+    """Estimated reading time in whole minutes, at least one for any text."""
+    if not word_count:
+        return 0
+    return max(1, math.ceil(word_count / WORDS_PER_MINUTE))
@@ -0,0 +1,33 @@
+"""Full-text search over published posts."""
+
+from .backends import MAX_RESULTS, get_backend
+
+
+def search_post_ids(query, limit=MAX_RESULTS):
+    """Return the ids of the published posts matching ``query``, best first."""
+    return get_backend().search(query, limit)
+
+
+def index_posts(post_ids):
+    """Add, refresh or remove the search entries of the given posts."""
+    get_backend().index_posts(post_ids)
+
+
+def index_post(post):
+    """Add, refresh or remove the search entries of a single post."""
+    index_posts([post.pk])
+
+
+def ranked_posts(queryset, post_ids):
+    """Fetch the posts with the given ids from ``queryset``, in that order."""
+    posts = queryset.in_bulk(post_ids)
+    return [posts[post_id] for post_id in post_ids if post_id in posts]
+
+
+__all__ = [
+    "get_backend",
+    "index_post",
+    "index_posts",
+    "ranked_posts",
+    "search_post_ids",
+]
@@ -0,0 +1,40 @@
+"""
+Pluggable search backends.
+
+``BLOG_SEARCH_BACKEND`` may name a backend class by dotted path. When it is
+unset the backend follows the database: PostgreSQL full-text search,
+SQLite FTS5 when its table exists, and the inverted index otherwise.
+"""
+
+from functools import cache
+
+from django.conf import settings
+from django.db import connection
+from django.utils.module_loading import import_string
+
+from .base import MAX_RESULTS, BaseSearchBackend
+
+__all__ = ["MAX_RESULTS", "BaseSearchBackend", "get_backend"]
+
+
+@cache
+def get_backend():
+    """Return the configured search backend instance."""
+    backend_path = getattr(settings, "BLOG_SEARCH_BACKEND", None)
+    if backend_path:
+        return import_string(backend_path)()
+
+    if connection.vendor == "postgresql":
+        from .postgres import PostgresSearchBackend
+
+        return PostgresSearchBackend()
+
+    if connection.vendor == "sqlite":
+        from . import sqlite
+
+        if sqlite.is_installed():
+            return sqlite.SQLiteFTSBackend()
+
+    from .inverted import InvertedIndexBackend
+
+    return InvertedIndexBackend()
@@ -0,0 +1,52 @@
+from django.db import transaction
+
+from blog.models import Post, SearchDocument
+from blog.rendering import strip_tags
+
+# Upper bound on the number of ranked results returned for one query.
+MAX_RESULTS = 1000
+
+
+class BaseSearchBackend:
+    """
+    Interface shared by the search backends.
+
+    Every backend keeps one ``SearchDocument`` per published post; subclasses
+    decide how those documents are indexed and implement ``search()``.
+    """
+
+    def search(self, query, limit=MAX_RESULTS):
+        """Return the ids of the published posts matching ``query``, best first."""
+        raise NotImplementedError
+
+    def index_posts(self, post_ids):
+        """Rebuild the search documents of the given posts."""
+        post_ids = list(post_ids)
+        if not post_ids:
+            return
+
+        posts = (
+            Post.objects.filter(pk__in=post_ids, status="published")
+            .only("id", "title", "content_html")
+            .prefetch_related("tags", "categories")
+        )
+
+        with transaction.atomic():
+            SearchDocument.objects.filter(post_id__in=post_ids).delete()
+            documents = [self.build_document(post) for post in posts]
+            SearchDocument.objects.bulk_create(documents, batch_size=500)
+            self.documents_created(documents)
+
+    def build_document(self, post):
+        """Return the unsaved search document of a post."""
+        names = [tag.name for tag in post.tags.all()]
+        names += [category.name for category in post.categories.all()]
+        return SearchDocument(
+            post=post,
+            title=post.title,
+            taxonomy=" ".join(names),
+            body=strip_tags(post.content_html),
+        )
+
+    def documents_created(self, documents):
+        """Hook run after new documents are written, in the same transaction."""
@@ -0,0 +1,144 @@
+"""
+Inverted index with BM25F ranking, for databases without full-text search.
+
+Each search document stores its field lengths and has one ``SearchPosting``
+per distinct term holding the per-field term frequencies, and the term's
+BM25F weight in the document as ``impact``. A query reads, for each of its
+terms, at most ``CANDIDATES_PER_TERM`` postings by descending impact from
+the ``(term, -impact)`` index and ranks them in Python, so even a term in
+every post costs a bounded read. Posts beyond that cut for all the query
+terms are not ranked.
+"""
+
+import math
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db.models import Avg, Count
+
+from blog.models import SearchDocument, SearchPosting
+from blog.search.index import FIELDS, document_terms, tokenize
+
+from .base import MAX_RESULTS, BaseSearchBackend
+
+# Relative weight of a match in each field.
+FIELD_BOOSTS = {
+    "title": 3.0,
+    "content": 1.0,
+    "tags": 2.0,
+    "categories": 1.5,
+}
+
+# BM25 saturation and length normalization parameters.
+K1 = 1.2
+B = 0.75
+
+# Postings read per query term; only these candidates are ranked.
+CANDIDATES_PER_TERM = 2000
+
+STATS_CACHE_KEY = "blog:search:stats"
+
+
+def field_averages(stats):
+    return {field: stats[f"{field}_avg"] or 1.0 for field in FIELDS}
+
+
+def term_weight(tfs, lengths, averages):
+    """
+    Saturated BM25F weight of a term in a document, before idf.
+
+    ``tfs`` and ``lengths`` map each field to the term frequency and the
+    field length in terms.
+    """
+    weighted_tf = 0.0
+    for field in FIELDS:
+        if tfs[field]:
+            norm = 1 - B + B * lengths[field] / averages[field]
+            weighted_tf += FIELD_BOOSTS[field] * tfs[field] / norm
+    return weighted_tf * (K1 + 1) / (weighted_tf + K1)
+
+
+class InvertedIndexBackend(BaseSearchBackend):
+    """Search backend storing its own postings in ordinary tables."""
+
+    def build_document(self, post):
+        document = super().build_document(post)
+        lengths, terms = document_terms(
+            post.title,
+            document.body,
+            [tag.name for tag in post.tags.all()],
+            [category.name for category in post.categories.all()],
+        )
+        for field, length in lengths.items():
+            setattr(document, f"{field}_length", length)
+        document._terms = terms
+        return document
+
+    def documents_created(self, documents):
+        # Impacts only order the candidates, so slightly stale averages do
+        averages = field_averages(self.corpus_stats())
+        postings = (
+            SearchPosting(
+                document=document,
+                term=term,
+                impact=term_weight(
+                    {field: tfs.get(field, 0) for field in FIELDS},
+                    {field: getattr(document, f"{field}_length") for field in FIELDS},
+                    averages,
+                ),
+                **{f"{field}_tf": tf for field, tf in tfs.items()},
+            )
+            for document in documents
+            for term, tfs in document._terms.items()
+        )
+        SearchPosting.objects.bulk_create(postings, batch_size=1000)
+        cache.delete(STATS_CACHE_KEY)
+
+    def corpus_stats(self):
+        """Document count and average field lengths, cached between index writes."""
+        stats = cache.get(STATS_CACHE_KEY)
+        if stats is None:
+            stats = SearchDocument.objects.aggregate(
+                count=Count("id"),
+                **{f"{field}_avg": Avg(f"{field}_length") for field in FIELDS},
+            )
+            cache.set(STATS_CACHE_KEY, stats)
+        return stats
+
+    def search(self, query, limit=MAX_RESULTS):
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+
+        stats = self.corpus_stats()
+        total = stats["count"]
+        if not total:
+            return []
+        averages = field_averages(stats)
+        document_frequencies = dict(
+            SearchPosting.objects.filter(term__in=terms)
+            .values_list("term")
+            .annotate(Count("id"))
+            .order_by()
+        )
+
+        scores = defaultdict(float)
+        field_count = len(FIELDS)
+        for term, df in document_frequencies.items():
+            idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+            rows = (
+                SearchPosting.objects.filter(term=term)
+                .order_by("-impact")
+                .values_list(
+                    "document__post_id",
+                    *(f"{field}_tf" for field in FIELDS),
+                    *(f"document__{field}_length" for field in FIELDS),
+                )[: max(limit, CANDIDATES_PER_TERM)]
+            )
+            for post_id, *values in rows:
+                tfs = dict(zip(FIELDS, values[:field_count], strict=True))
+                lengths = dict(zip(FIELDS, values[field_count:], strict=True))
+                scores[post_id] += idf * term_weight(tfs, lengths, averages)
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
+        return [post_id for post_id, _ in ranked[:limit]]
@@ -0,0 +1,69 @@
+"""
+PostgreSQL full-text search backend.
+
+``blog_searchdocument.search_vector`` is a stored generated ``tsvector``
+column with a GIN index, so PostgreSQL keeps it current on every write.
+The column is managed by raw SQL in the migrations rather than by a model
+field, so the SQLite development database never sees it.
+"""
+
+from django.db import connection
+
+from .base import MAX_RESULTS, BaseSearchBackend
+
+SEARCH_CONFIG = "english"
+
+INSTALL_SQL = [
+    f"""
+    ALTER TABLE blog_searchdocument ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(title, '')), 'A')
+        || setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(taxonomy, '')), 'B')
+        || setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(body, '')), 'C')
+    ) STORED
+    """,
+    """
+    CREATE INDEX blog_searchdocument_search_vector_idx
+    ON blog_searchdocument USING GIN (search_vector)
+    """,
+]
+
+UNINSTALL_SQL = [
+    "DROP INDEX IF EXISTS blog_searchdocument_search_vector_idx",
+    "ALTER TABLE blog_searchdocument DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def install(schema_editor):
+    """Add the generated tsvector column and its GIN index."""
+    for statement in INSTALL_SQL:
+        schema_editor.execute(statement)
+
+
+def uninstall(schema_editor):
+    for statement in UNINSTALL_SQL:
+        schema_editor.execute(statement)
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """Search backend using the generated tsvector column and its GIN index."""
+
+    def search(self, query, limit=MAX_RESULTS):
+        query = query.strip()
+        if not query:
+            return []
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT document.post_id
+                FROM blog_searchdocument AS document,
+                     websearch_to_tsquery('{SEARCH_CONFIG}', %s) AS query
+                WHERE document.search_vector @@ query
+                ORDER BY ts_rank_cd(document.search_vector, query) DESC,
+                         document.post_id DESC
+                LIMIT %s
+                """,
+                [query, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
@@ -0,0 +1,110 @@
+"""
+SQLite FTS5 search backend.
+
+``blog_searchdocument_fts`` is an external-content FTS5 table mirroring
+``blog_searchdocument``; triggers keep it in sync on every insert, update
+and delete. SQLite migrations that rebuild ``blog_searchdocument`` drop
+those triggers, so such migrations must call ``install()`` again.
+"""
+
+from django.db import connection
+
+from blog.search.index import tokenize
+
+from .base import MAX_RESULTS, BaseSearchBackend
+
+FTS_TABLE = "blog_searchdocument_fts"
+
+# Column weights for bm25(): title, taxonomy, body.
+COLUMN_WEIGHTS = (10.0, 5.0, 1.0)
+
+INSTALL_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, taxonomy, body,
+        content='blog_searchdocument',
+        content_rowid='id',
+        tokenize='porter unicode61'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS blog_searchdocument_fts_insert
+    AFTER INSERT ON blog_searchdocument BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, taxonomy, body)
+        VALUES (new.id, new.title, new.taxonomy, new.body);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS blog_searchdocument_fts_delete
+    AFTER DELETE ON blog_searchdocument BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, taxonomy, body)
+        VALUES ('delete', old.id, old.title, old.taxonomy, old.body);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS blog_searchdocument_fts_update
+    AFTER UPDATE ON blog_searchdocument BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, taxonomy, body)
+        VALUES ('delete', old.id, old.title, old.taxonomy, old.body);
+        INSERT INTO {FTS_TABLE}(rowid, title, taxonomy, body)
+        VALUES (new.id, new.title, new.taxonomy, new.body);
+    END
+    """,
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+UNINSTALL_SQL = [
+    "DROP TRIGGER IF EXISTS blog_searchdocument_fts_insert",
+    "DROP TRIGGER IF EXISTS blog_searchdocument_fts_delete",
+    "DROP TRIGGER IF EXISTS blog_searchdocument_fts_update",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+
+def install(schema_editor):
+    """Create the FTS5 table and its sync triggers, then index existing rows."""
+    for statement in INSTALL_SQL:
+        schema_editor.execute(statement)
+
+
+def uninstall(schema_editor):
+    for statement in UNINSTALL_SQL:
+        schema_editor.execute(statement)
+
+
+def is_installed():
+    """True if the FTS5 table exists in the current database."""
+    return FTS_TABLE in connection.introspection.table_names()
+
+
+def match_expression(query):
+    """
+    Build an FTS5 MATCH expression requiring every query term.
+
+    Terms are quoted so user input can never be parsed as FTS5 syntax.
+    """
+    return " ".join(f'"{term}"' for term in dict.fromkeys(tokenize(query)))
+
+
+class SQLiteFTSBackend(BaseSearchBackend):
+    """Search backend using the SQLite FTS5 table maintained by triggers."""
+
+    def search(self, query, limit=MAX_RESULTS):
+        expression = match_expression(query)
+        if not expression:
+            return []
+
+        weights = ", ".join(str(weight) for weight in COLUMN_WEIGHTS)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT document.post_id
+                FROM {FTS_TABLE}
+                JOIN blog_searchdocument AS document ON document.id = {FTS_TABLE}.rowid
+                WHERE {FTS_TABLE} MATCH %s
+                ORDER BY bm25({FTS_TABLE}, {weights}), document.post_id DESC
+                LIMIT %s
+                """,
+                [expression, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
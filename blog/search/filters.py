@@ -0,0 +1,30 @@
+from django.db.models import Case, IntegerField, When
+from rest_framework import filters
+
+from . import search_post_ids
+
+
+class PostSearchFilter(filters.SearchFilter):
+    """
+    ``?search=`` filter for posts backed by the configured search backend.
+
+    Results are ordered by relevance unless the request also asks for an
+    explicit ``?ordering=``. The view's ``search_fields`` only need to be
+    set to enable the filter; the indexed fields are fixed by the backend.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        search_fields = self.get_search_fields(view, request)
+        search_terms = self.get_search_terms(request)
+        if not search_fields or not search_terms:
+            return queryset
+
+        post_ids = search_post_ids(" ".join(search_terms))
+        if not post_ids:
+            return queryset.none()
+
+        rank = Case(
+            *(When(pk=post_id, then=position) for position, post_id in enumerate(post_ids)),
+            output_field=IntegerField(),
+        )
+        return queryset.filter(pk__in=post_ids).order_by(rank)
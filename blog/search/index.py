@@ -0,0 +1,49 @@
+"""Tokenization shared by the search backends."""
+
+import re
+from collections import Counter, defaultdict
+
+FIELDS = ("title", "content", "tags", "categories")
+
+MAX_TERM_LENGTH = 64
+
+TOKEN_RE = re.compile(r"\w+", flags=re.UNICODE)
+
+STOP_WORDS = frozenset(
+    """
+    a an and are as at be but by for from has have he her his i if in into is
+    it its me my of on or our she so that the their them then there these they
+    this to was we were what when which who will with you your
+    """.split()
+)
+
+
+def tokenize(text):
+    """Split text into lowercase index terms, dropping stop words."""
+    return [
+        token[:MAX_TERM_LENGTH]
+        for token in TOKEN_RE.findall(text.lower())
+        if token not in STOP_WORDS and (len(token) > 1 or token.isdigit())
+    ]
+
+
+def document_terms(title, content, tag_names, category_names):
+    """
+    Tokenize the fields of a post.
+
+    Returns the length of each field in terms and a mapping of each term to
+    its frequency in every field.
+    """
+    field_tokens = {
+        "title": tokenize(title),
+        "content": tokenize(content),
+        "tags": tokenize(" ".join(tag_names)),
+        "categories": tokenize(" ".join(category_names)),
+    }
+    lengths = {field: len(tokens) for field, tokens in field_tokens.items()}
+
+    terms = defaultdict(dict)
+    for field, tokens in field_tokens.items():
+        for term, tf in Counter(tokens).items():
+            terms[term][field] = tf
+    return lengths, terms
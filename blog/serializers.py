@@ -1,9 +1,16 @@
+import hashlib
 from typing import ClassVar
 
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import Prefetch, prefetch_related_objects
 from rest_framework import serializers
 
-from .models import Category, Post, Tag
+from . import sidebar
+from .models import ArchiveMonth, Category, Post, Tag
+
+REPRESENTATION_KEY = "blog:api:{serializer}:{fieldset}:{id}:{updated_at}:{generation}"
+REPRESENTATION_TIMEOUT = 60 * 60 * 24  # One day
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -30,7 +37,149 @@ class TagSerializer(serializers.ModelSerializer):
         fields: ClassVar = ["id", "name", "slug"]
 
 
-class PostListSerializer(serializers.ModelSerializer):
+class ArchiveMonthSerializer(serializers.ModelSerializer):
+    """Serializer for the ArchiveMonth model."""
+
+    class Meta:
+        model = ArchiveMonth
+        fields: ClassVar = ["year", "month", "post_count"]
+
+
+class CachedListSerializer(serializers.ListSerializer):
+    """
+    Serialize a page of posts with one cache round trip.
+
+    Only the posts missing from the cache are serialized, and only they get
+    the child's relations prefetched.
+    """
+
+    def to_representation(self, data):
+        posts = list(data.all() if hasattr(data, "all") else data)
+        generation = sidebar.generation()
+        keys = [self.child.representation_key(post, generation) for post in posts]
+        cached = cache.get_many(keys)
+
+        missing = [post for key, post in zip(keys, posts) if key not in cached]
+        if missing and self.child.prefetch_lookups:
+            prefetch_related_objects(missing, *self.child.prefetch_lookups)
+        fresh = {
+            self.child.representation_key(post, generation): self.child.build_representation(post)
+            for post in missing
+        }
+        if fresh:
+            cache.set_many(fresh, REPRESENTATION_TIMEOUT)
+
+        return [cached.get(key) or fresh[key] for key in keys]
+
+
+class SparseFieldsetMixin:
+    """
+    Let clients choose the fields of a post and which relations to nest.
+
+    ``fields`` limits the output to the named fields. The relations in
+    ``expandable`` are nested objects when named in ``expand`` and primary
+    keys otherwise; when ``expand`` is not given they are all nested.
+    """
+
+    expandable: ClassVar = ["author", "categories", "tags"]
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        expand = self.expandable if expand is None else expand
+
+        errors = {}
+        unknown_fields = [name for name in fields or () if name not in self.fields]
+        if unknown_fields:
+            errors["fields"] = [f"Unknown field: {name}" for name in unknown_fields]
+        unknown_expand = [name for name in expand if name not in self.expandable]
+        if unknown_expand:
+            errors["expand"] = [f"Cannot expand: {name}" for name in unknown_expand]
+        if errors:
+            raise serializers.ValidationError(errors)
+
+        if fields:
+            for name in set(self.fields) - set(fields):
+                del self.fields[name]
+        for name in set(self.expandable) - set(expand):
+            if name in self.fields:
+                many = isinstance(self.fields[name], serializers.ListSerializer)
+                self.fields[name] = serializers.PrimaryKeyRelatedField(read_only=True, many=many)
+
+    @property
+    def fieldset(self):
+        """The output fields, expanded relations marked with a ``+``."""
+        return ",".join(
+            f"{name}+" if isinstance(field, serializers.BaseSerializer) else name
+            for name, field in self.fields.items()
+        )
+
+    @property
+    def prefetch_lookups(self):
+        """Prefetches loading just the columns of the many-to-many fields shown."""
+        lookups = []
+        for field in self.fields.values():
+            if isinstance(field, serializers.ListSerializer):
+                related = field.child.Meta.model.objects.only(*field.child.Meta.fields)
+            elif isinstance(field, serializers.ManyRelatedField):
+                related = Post._meta.get_field(field.source).related_model.objects.only("pk")
+            else:
+                continue
+            lookups.append(Prefetch(field.source, queryset=related))
+        return lookups
+
+    def optimize_queryset(self, queryset):
+        """
+        Select only the columns and joins the output needs.
+
+        Many-to-many fields are left to ``prefetch_lookups``, which runs only
+        for posts whose representation is not cached.
+        """
+        concrete = {field.name for field in Post._meta.concrete_fields}
+        # The representation cache key needs these
+        columns = {"id", "updated_at"}
+        for field in self.fields.values():
+            if field.source not in concrete:
+                continue
+            columns.add(field.source)
+            if isinstance(field, serializers.ModelSerializer):
+                queryset = queryset.select_related(field.source)
+                columns.update(f"{field.source}__{name}" for name in field.Meta.fields)
+        return queryset.only(*columns)
+
+
+class CachedRepresentationMixin:
+    """
+    Cache the representation of each post under ``(id, updated_at)``.
+
+    The sidebar generation is part of the key as well: renaming a category
+    or tag, or changing a post's taxonomy, does not touch ``updated_at``.
+    So is the ``fieldset``, as clients may ask for different fields.
+    """
+
+    def representation_key(self, post, generation):
+        fieldset = hashlib.sha1(self.fieldset.encode()).hexdigest()[:12]
+        return REPRESENTATION_KEY.format(
+            serializer=type(self).__name__,
+            fieldset=fieldset,
+            id=post.pk,
+            updated_at=post.updated_at.timestamp(),
+            generation=generation,
+        )
+
+    def build_representation(self, post):
+        return super().to_representation(post)
+
+    def to_representation(self, post):
+        key = self.representation_key(post, sidebar.generation())
+        data = cache.get(key)
+        if data is None:
+            prefetch_related_objects([post], *self.prefetch_lookups)
+            data = self.build_representation(post)
+            cache.set(key, data, REPRESENTATION_TIMEOUT)
+        return data
+
+
+class PostListSerializer(CachedRepresentationMixin, SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for listing Post instances."""
 
     author = UserSerializer(read_only=True)
@@ -39,6 +188,7 @@ class PostListSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Post
+        list_serializer_class = CachedListSerializer
         fields: ClassVar = [
             "id",
             "title",
@@ -53,7 +203,7 @@ class PostListSerializer(serializers.ModelSerializer):
         ]
 
 
-class PostDetailSerializer(serializers.ModelSerializer):
+class PostDetailSerializer(CachedRepresentationMixin, SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for detailed Post instance."""
 
     author = UserSerializer(read_only=True)
@@ -62,12 +212,14 @@ class PostDetailSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Post
+        list_serializer_class = CachedListSerializer
         fields: ClassVar = [
             "id",
             "title",
             "slug",
             "author",
             "content",
+            "content_html",
             "status",
             "categories",
             "tags",
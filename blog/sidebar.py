@@ -0,0 +1,81 @@
+"""
+Cached sidebar data shared by the context processor and the views.
+
+Categories and tags (with their published post counts) and the archive
+tree are built once and cached under a generation number. Model signals
+bump the generation (see ``blog.signals``), which retires every cached
+copy at once without having to know its key.
+"""
+
+import time
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils.functional import SimpleLazyObject
+
+from . import archive
+from .models import Category, Tag
+
+GENERATION_KEY = "blog:sidebar:generation"
+DATA_KEY = "blog:sidebar:data:{generation}"
+DATA_TIMEOUT = 60 * 60 * 24  # One day
+
+
+def generation():
+    """Current sidebar generation, starting a new one if the cache lost it."""
+    current = cache.get(GENERATION_KEY)
+    if current is None:
+        # A fresh, unique start value so entries of a lost generation never match.
+        cache.add(GENERATION_KEY, time.time_ns(), None)
+        current = cache.get(GENERATION_KEY)
+    return current
+
+
+def bump_generation():
+    """Invalidate every cached copy of the sidebar data."""
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, time.time_ns(), None)
+
+
+def build_sidebar_data():
+    """Query categories, tags and archives with their published post counts."""
+    published = Q(posts__status="published")
+    return {
+        "categories": list(
+            Category.objects.annotate(post_count=Count("posts", filter=published))
+        ),
+        "tags": list(Tag.objects.annotate(post_count=Count("posts", filter=published))),
+        "archive_dates": archive.archive_dates(),
+    }
+
+
+def get_sidebar_data():
+    """Return the sidebar data of the current generation, building it on a miss."""
+    key = DATA_KEY.format(generation=generation())
+    data = cache.get(key)
+    if data is None:
+        data = build_sidebar_data()
+        cache.set(key, data, DATA_TIMEOUT)
+    return data
+
+
+def sidebar_data(request):
+    """
+    Lazily fetched sidebar data, shared by everything rendering ``request``.
+
+    Nothing is read from the cache until a template actually uses it.
+    """
+    if not hasattr(request, "_sidebar_data"):
+        request._sidebar_data = SimpleLazyObject(get_sidebar_data)
+    return request._sidebar_data
+
+
+def sidebar_context(request):
+    """Template context with each part of the sidebar data as a lazy value."""
+    data = sidebar_data(request)
+    return {
+        name: SimpleLazyObject(lambda name=name: data[name])
+        for name in ("categories", "tags", "archive_dates")
+    }
@@ -0,0 +1,309 @@
+"""Signal handlers that keep the blog's derived data in sync with its models."""
+
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import Signal, receiver
+
+from . import archive, changelog, images, page_cache, sidebar, static_export
+from .models import Category, ChangeLogEntry, Post, Tag
+from .search import index_post, index_posts
+
+# Sent after posts are changed without going through Post.save(), e.g. by
+# QuerySet.update() in the admin bulk actions. Receivers get ``post_ids``.
+posts_bulk_updated = Signal()
+
+
+@receiver(pre_save, sender=Post)
+def remember_archive_month(sender, instance, raw=False, **kwargs):
+    """Note the status, archive month and image of a post before this save."""
+    instance._archive_month_before = None
+    instance._was_published = False
+    instance._image_before = ""
+    if raw or instance.pk is None:
+        return
+    previous = (
+        Post.objects.filter(pk=instance.pk).values("status", "published_date", "image").first()
+    )
+    if previous:
+        instance._image_before = previous.pop("image") or ""
+        instance._archive_month_before = archive.month_of(**previous)
+        instance._was_published = previous["status"] == "published"
+
+
+@receiver(post_save, sender=Post)
+def refresh_archive_on_save(sender, instance, raw=False, **kwargs):
+    """Publishing, unpublishing or re-dating a post moves it between months."""
+    if raw:
+        return
+    archive.refresh_months(
+        [
+            getattr(instance, "_archive_month_before", None),
+            archive.month_of(instance.status, instance.published_date),
+        ]
+    )
+
+
+@receiver(post_delete, sender=Post)
+def refresh_archive_on_delete(sender, instance, **kwargs):
+    archive.refresh_months([archive.month_of(instance.status, instance.published_date)])
+
+
+@receiver(post_save, sender=Post)
+def reindex_saved_post(sender, instance, raw=False, **kwargs):
+    """Refresh the search entries of a post whenever it is saved."""
+    if not raw:
+        index_post(instance)
+
+
+@receiver(m2m_changed, sender=Post.categories.through)
+@receiver(m2m_changed, sender=Post.tags.through)
+def reindex_post_taxonomy(sender, instance, action, reverse, pk_set, **kwargs):
+    """Refresh the search entries of posts whose tags or categories changed."""
+    if reverse and action == "pre_clear":
+        # Clearing from the category/tag side does not report the posts.
+        instance._cleared_post_ids = list(instance.posts.values_list("pk", flat=True))
+        return
+
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+
+    if not reverse:
+        index_post(instance)
+    elif action == "post_clear":
+        index_posts(getattr(instance, "_cleared_post_ids", []))
+    else:
+        index_posts(pk_set or [])
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Tag)
+def reindex_renamed_taxonomy(sender, instance, created, raw=False, **kwargs):
+    """A renamed category or tag changes the indexed text of its posts."""
+    if not raw and not created:
+        index_posts(instance.posts.values_list("pk", flat=True))
+
+
+@receiver(pre_delete, sender=Category)
+@receiver(pre_delete, sender=Tag)
+def remember_taxonomy_posts(sender, instance, **kwargs):
+    """Deleting a category or tag clears its links without an m2m signal."""
+    instance._affected_post_ids = list(instance.posts.values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Tag)
+def reindex_deleted_taxonomy(sender, instance, **kwargs):
+    index_posts(getattr(instance, "_affected_post_ids", []))
+
+
+@receiver(posts_bulk_updated)
+def reindex_bulk_updated_posts(sender, post_ids, **kwargs):
+    index_posts(post_ids)
+
+
+@receiver(posts_bulk_updated)
+def rebuild_archive_after_bulk_update(sender, post_ids, **kwargs):
+    archive.rebuild()
+
+
+@receiver(post_save, sender=Post)
+def bump_sidebar_on_post_save(sender, instance, raw=False, **kwargs):
+    """Post counts only change when a post enters or leaves an archive month."""
+    before = getattr(instance, "_archive_month_before", None)
+    if raw or before != archive.month_of(instance.status, instance.published_date):
+        sidebar.bump_generation()
+
+
+@receiver(post_delete, sender=Post)
+def bump_sidebar_on_post_delete(sender, instance, **kwargs):
+    if instance.status == "published":
+        sidebar.bump_generation()
+
+
+@receiver(m2m_changed, sender=Post.categories.through)
+@receiver(m2m_changed, sender=Post.tags.through)
+def bump_sidebar_on_taxonomy_change(sender, instance, action, reverse, **kwargs):
+    """Retagging a draft leaves the published post counts alone."""
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if reverse or instance.status == "published":
+        sidebar.bump_generation()
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Tag)
+def bump_sidebar_on_taxonomy_save(sender, **kwargs):
+    sidebar.bump_generation()
+
+
+@receiver(posts_bulk_updated)
+def bump_sidebar_after_bulk_update(sender, **kwargs):
+    sidebar.bump_generation()
+
+
+@receiver(post_save, sender=Post)
+def purge_pages_on_post_save(sender, instance, raw=False, **kwargs):
+    """
+    Drop the cached pages showing a published post after it is edited.
+
+    The sidebar lists are filled into cached pages when they are served
+    (see ``blog.page_cache``), so sidebar counts need no purging here.
+    """
+    if raw or not (getattr(instance, "_was_published", False) or instance.status == "published"):
+        return
+    page_cache.purge(
+        *page_cache.post_dependencies(
+            instance.pk,
+            getattr(instance, "_archive_month_before", None),
+            category_ids=instance.categories.values_list("pk", flat=True),
+            tag_ids=instance.tags.values_list("pk", flat=True),
+        ),
+        *page_cache.post_dependencies(
+            instance.pk, archive.month_of(instance.status, instance.published_date)
+        ),
+    )
+
+
+@receiver(pre_delete, sender=Post)
+def remember_post_pages(sender, instance, **kwargs):
+    """The post's categories and tags are gone by post_delete."""
+    instance._page_dependencies = (
+        page_cache.posts_dependencies([instance.pk]) if instance.status == "published" else []
+    )
+
+
+@receiver(post_delete, sender=Post)
+def purge_pages_on_post_delete(sender, instance, **kwargs):
+    page_cache.purge(*getattr(instance, "_page_dependencies", []))
+
+
+TAXONOMY_DEPENDENCIES = {
+    Post.categories.through: ("categories", page_cache.category_dependency),
+    Post.tags.through: ("tags", page_cache.tag_dependency),
+}
+
+
+@receiver(m2m_changed, sender=Post.categories.through)
+@receiver(m2m_changed, sender=Post.tags.through)
+def purge_pages_on_taxonomy_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Retagging changes the post's cards and the listings of each category or tag involved."""
+    field, dependency = TAXONOMY_DEPENDENCIES[sender]
+    if action == "pre_clear" and not reverse:
+        instance._cleared_taxonomy_ids = list(getattr(instance, field).values_list("pk", flat=True))
+        return
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+
+    if not reverse:
+        if instance.status != "published":
+            return
+        if action == "post_clear":
+            pk_set = getattr(instance, "_cleared_taxonomy_ids", [])
+        page_cache.purge(
+            *page_cache.posts_dependencies([instance.pk]), *map(dependency, pk_set or [])
+        )
+    else:
+        if action == "post_clear":
+            pk_set = getattr(instance, "_cleared_post_ids", [])
+        page_cache.purge(dependency(instance.pk), *page_cache.posts_dependencies(pk_set or []))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Tag)
+def purge_pages_on_taxonomy_save(sender, instance, created, raw=False, **kwargs):
+    """A renamed category or tag is shown on the page and card of each of its posts."""
+    if raw or created:
+        return
+    dependency = (
+        page_cache.category_dependency if sender is Category else page_cache.tag_dependency
+    )
+    page_cache.purge(
+        dependency(instance.pk),
+        *page_cache.posts_dependencies(instance.posts.values_list("pk", flat=True)),
+    )
+
+
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Tag)
+def purge_pages_on_taxonomy_delete(sender, instance, **kwargs):
+    dependency = (
+        page_cache.category_dependency if sender is Category else page_cache.tag_dependency
+    )
+    page_cache.purge(
+        dependency(instance.pk),
+        *page_cache.posts_dependencies(getattr(instance, "_affected_post_ids", [])),
+    )
+
+
+@receiver(posts_bulk_updated)
+def purge_pages_after_bulk_update(sender, post_ids, **kwargs):
+    page_cache.purge(page_cache.LISTING, *page_cache.posts_dependencies(post_ids))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(m2m_changed, sender=Post.categories.through)
+@receiver(m2m_changed, sender=Post.tags.through)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Tag)
+@receiver(posts_bulk_updated)
+def update_static_export(sender, raw=False, **kwargs):
+    """Re-render the pages of the static mirror affected by a change."""
+    if not raw:
+        static_export.schedule_update()
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def log_post_change(sender, instance, raw=False, **kwargs):
+    if not raw:
+        changelog.record_posts([instance.pk])
+
+
+@receiver(m2m_changed, sender=Post.categories.through)
+@receiver(m2m_changed, sender=Post.tags.through)
+def log_post_taxonomy_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Posts embed the ids of their categories and tags."""
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        changelog.record_posts([instance.pk])
+    elif action == "post_clear":
+        changelog.record_posts(getattr(instance, "_cleared_post_ids", []))
+    else:
+        changelog.record_posts(pk_set or [])
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Tag)
+def log_taxonomy_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        changelog.record(sender._meta.model_name, [instance.pk], ChangeLogEntry.Action.UPSERT)
+
+
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Tag)
+def log_taxonomy_delete(sender, instance, **kwargs):
+    changelog.record(sender._meta.model_name, [instance.pk], ChangeLogEntry.Action.DELETE)
+    changelog.record_posts(getattr(instance, "_affected_post_ids", []))
+
+
+@receiver(posts_bulk_updated)
+def log_bulk_updated_posts(sender, post_ids, **kwargs):
+    changelog.record_posts(post_ids)
+
+
+@receiver(post_save, sender=Post)
+def resize_changed_image(sender, instance, raw=False, **kwargs):
+    """Uploading, replacing or clearing an image updates its renditions."""
+    if not raw and (instance.image.name or "") != getattr(instance, "_image_before", ""):
+        images.schedule_renditions(instance.pk)
@@ -0,0 +1,392 @@
+"""
+Export the public blog as a tree of static files.
+
+Every public URL is rendered through the normal views with Django's test
+client and written to ``<output>/<path>/index.html`` (``index.xml`` for
+feeds). Pagination pages ``?page=N`` become ``<path>/page/N/`` and their
+links are rewritten to match, so the tree can be served by any static file
+server (with ``index.xml`` among its directory index files). Open Graph
+cards are written to the paths they are linked at.
+
+With ``BLOG_STATIC_EXPORT["ROOT"]`` set, model signals call
+``schedule_update()``, which only marks the mirror out of date after the
+commit. ``manage.py export_static --watch`` runs apart from the web
+workers and brings the mirror up to date whenever it is marked.
+
+Each page has a fingerprint of its inputs: the ``updated_at`` and taxonomy
+of the posts it shows. The sidebar every page includes has a fingerprint
+of its own. A manifest in the output directory records the fingerprints of
+the last export, so re-runs only render pages whose inputs changed. A
+changed sidebar re-renders every page, except in the watcher's updates:
+they leave untouched pages with a stale sidebar until the next full export.
+"""
+
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+import re
+import shutil
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connections, transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import og_cards
+from .models import Category, Post, Tag
+from .pagination import STATIC_EXPORT_ENVIRON
+from .rendering import RENDERER_VERSION
+from .sidebar import get_sidebar_data
+from .views import POSTS_PER_PAGE
+
+MANIFEST_NAME = ".export-manifest.json"
+# Present while the mirror is out of date, see schedule_update()
+PENDING_NAME = ".export-pending"
+PAGINATION_LINK_RE = re.compile(r'href="\?page=(\d+)"')
+
+# Sections of the sitemap, as registered in byte_board_blog/urls.py
+SITEMAP_SECTIONS = ("posts", "categories", "tags", "static")
+
+
+def _fingerprint(*parts):
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def _post_state(post):
+    return (
+        post["pk"],
+        post["updated_at"].isoformat(),
+        sorted(post["categories"]),
+        sorted(post["tags"]),
+    )
+
+
+def sidebar_fingerprint():
+    """Fingerprint of the sidebar (taxonomy names and counts, archive) shown on every page."""
+    data = get_sidebar_data()
+    return _fingerprint(
+        [(c.pk, c.name, c.slug, c.post_count) for c in data["categories"]],
+        [(t.pk, t.name, t.slug, t.post_count) for t in data["tags"]],
+        data["archive_dates"],
+    )
+
+
+def site_pages():
+    """
+    Return ``{url: fingerprint}`` for every public page of the blog.
+
+    Uses one query for the published posts and one per taxonomy; listings
+    are grouped in Python. The sidebar is left out, see sidebar_fingerprint().
+    """
+    posts = {
+        post["pk"]: {**post, "categories": [], "tags": []}
+        for post in Post.objects.filter(status="published").values(
+            "pk", "slug", "updated_at", "published_date"
+        )
+    }
+    categories, tags = (
+        {pk: (slug, name) for pk, slug, name in model.objects.values_list("pk", "slug", "name")}
+        for model in (Category, Tag)
+    )
+    for through, field, key, taxonomy in (
+        (Post.categories.through, "category_id", "categories", categories),
+        (Post.tags.through, "tag_id", "tags", tags),
+    ):
+        for post_id, taxonomy_id in through.objects.filter(post_id__in=posts).values_list(
+            "post_id", field
+        ):
+            # Names too: post pages show them
+            posts[post_id][key].append((taxonomy_id, taxonomy[taxonomy_id][1]))
+
+    listings = defaultdict(list)
+    listings[reverse("blog:home")] = list(posts.values())
+    # Taxonomy pages are titled with the name
+    titles = {}
+    for view, taxonomy in (("blog:category_posts", categories), ("blog:tag_posts", tags)):
+        for slug, name in taxonomy.values():
+            path = reverse(view, args=[slug])
+            listings[path] = []
+            titles[path] = name
+
+    pages = {}
+    for post in posts.values():
+        pages[reverse("blog:post_detail", args=[post["slug"]])] = _fingerprint(
+            _post_state(post), RENDERER_VERSION
+        )
+
+        for category_id, _ in post["categories"]:
+            listings[reverse("blog:category_posts", args=[categories[category_id][0]])].append(post)
+        for tag_id, _ in post["tags"]:
+            listings[reverse("blog:tag_posts", args=[tags[tag_id][0]])].append(post)
+        if post["published_date"] is not None:
+            local = timezone.localtime(post["published_date"])
+            listings[reverse("blog:year_archive", args=[local.year])].append(post)
+            listings[reverse("blog:month_archive", args=[local.year, local.month])].append(post)
+
+    for path, listed in listings.items():
+        fingerprint = _fingerprint(titles.get(path), sorted(_post_state(post) for post in listed))
+        pages[path] = fingerprint
+        for number in range(2, math.ceil(len(listed) / POSTS_PER_PAGE) + 1):
+            pages[f"{path}?page={number}"] = fingerprint
+
+    everything = _fingerprint(
+        sorted((post["pk"], post["updated_at"].isoformat()) for post in posts.values())
+    )
+    pages[reverse("blog:rss_feed")] = everything
+    pages[reverse("blog:atom_feed")] = everything
+    pages["/sitemap.xml"] = everything
+    for section in SITEMAP_SECTIONS:
+        pages[f"/sitemap-{section}.xml"] = everything
+    pages["/robots.txt"] = ""
+    # A card's URL changes with its content
+    for post in og_cards.posts_needing_cards():
+        pages[og_cards.card_url(post)] = ""
+    return pages
+
+
+def output_path(url, content_type):
+    """The file, relative to the export root, that serves ``url``."""
+    parts = urlsplit(url)
+    path = parts.path.lstrip("/")
+    page = parse_qs(parts.query).get("page")
+    if page:
+        path = f"{path}page/{page[0]}/"
+    if path == "" or path.endswith("/"):
+        path += "index.xml" if "xml" in content_type else "index.html"
+    return path
+
+
+def rewrite_pagination_links(html, path):
+    """Point ``?page=N`` links of the listing at ``path`` to its exported pages."""
+    return PAGINATION_LINK_RE.sub(
+        lambda match: f'href="{path}"' if match[1] == "1" else f'href="{path}page/{match[1]}/"',
+        html,
+    )
+
+
+def _allow_host(base_url):
+    """Allow the mirror's host; only safe in a process that serves no requests."""
+    # ALLOWED_HOSTS entries are matched against the host without its port
+    return override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, urlsplit(base_url).hostname])
+
+
+def _init_worker(base_url):
+    _allow_host(base_url).enable()
+
+
+def render_page(url, output_dir, base_url):
+    """Render ``url`` and write it under ``output_dir``; returns ``(url, status)``."""
+    parts = urlsplit(base_url)
+    client = Client(HTTP_HOST=parts.netloc)
+    response = client.get(url, secure=parts.scheme == "https", **{STATIC_EXPORT_ENVIRON: True})
+    if response.status_code != 200:
+        return url, response.status_code
+
+    if response.streaming:
+        content = b"".join(response.streaming_content)
+        response.close()
+    else:
+        content = response.content
+    content_type = response.get("Content-Type", "")
+    if "html" in content_type:
+        content = rewrite_pagination_links(
+            content.decode(response.charset), urlsplit(url).path
+        ).encode(response.charset)
+
+    target = Path(output_dir) / output_path(url, content_type)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    temporary = target.with_name(f".{target.name}.tmp")
+    temporary.write_bytes(content)
+    os.replace(temporary, target)
+    return url, response.status_code
+
+
+def render_pages(urls, output_dir, base_url, workers=1, allow_host=True):
+    """
+    Render ``urls`` in ``workers`` processes; returns ``{url: status}``.
+
+    With ``allow_host`` the host of ``base_url`` is added to ``ALLOWED_HOSTS``
+    while rendering. Without it, the host must already be allowed.
+    """
+    if workers <= 1 or len(urls) < 2:
+        if not allow_host:
+            return dict(render_page(url, output_dir, base_url) for url in urls)
+        with _allow_host(base_url):
+            return dict(render_page(url, output_dir, base_url) for url in urls)
+
+    # Forked workers must not share the parent's database connections
+    connections.close_all()
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("fork"),
+        initializer=_init_worker,
+        initargs=(base_url,),
+    ) as executor:
+        results = executor.map(
+            render_page,
+            urls,
+            [output_dir] * len(urls),
+            [base_url] * len(urls),
+            chunksize=max(1, len(urls) // (workers * 4)),
+        )
+        return dict(results)
+
+
+def _copy_if_changed(source, destination):
+    destination_stat = os.stat(destination) if os.path.exists(destination) else None
+    source_stat = os.stat(source)
+    if (
+        destination_stat
+        and destination_stat.st_size == source_stat.st_size
+        and destination_stat.st_mtime >= source_stat.st_mtime
+    ):
+        return destination
+    return shutil.copy2(source, destination)
+
+
+def copy_assets(output_dir, static=True, media=True):
+    """
+    Collect static files and copy them and media into the export.
+
+    ``STORAGES`` collects with ``BundlingStaticFilesStorage``, so files keep
+    their names; only the CSS bundles it builds are content-hashed.
+    """
+    sources = []
+    if static:
+        call_command("collectstatic", interactive=False, verbosity=0)
+        sources.append((settings.STATIC_ROOT, settings.STATIC_URL))
+    if media:
+        sources.append((settings.MEDIA_ROOT, settings.MEDIA_URL))
+
+    for root, url in sources:
+        if root and os.path.isdir(root):
+            shutil.copytree(
+                root,
+                Path(output_dir) / url.strip("/"),
+                copy_function=_copy_if_changed,
+                dirs_exist_ok=True,
+            )
+
+
+def read_manifest(output_dir):
+    """The last export's ``{"sidebar": fingerprint, "pages": {url: fingerprint}}``."""
+    try:
+        manifest = json.loads((Path(output_dir) / MANIFEST_NAME).read_text())
+    except (FileNotFoundError, ValueError):
+        manifest = {}
+    if "pages" not in manifest:
+        # Missing, or written before the sidebar had its own fingerprint
+        return {"sidebar": None, "pages": {}}
+    return manifest
+
+
+def write_manifest(output_dir, manifest):
+    path = Path(output_dir) / MANIFEST_NAME
+    temporary = path.with_name(f"{path.name}.tmp")
+    temporary.write_text(json.dumps(manifest, indent=1, sort_keys=True))
+    os.replace(temporary, path)
+
+
+def export_site(
+    output_dir,
+    base_url,
+    workers=1,
+    force=False,
+    static=True,
+    media=True,
+    allow_host=True,
+    refresh_sidebar=True,
+):
+    """
+    Bring the static export in ``output_dir`` up to date.
+
+    Renders pages whose fingerprint changed since the last export (all of
+    them with ``force``), deletes pages that no longer exist and copies the
+    static and media files. A changed sidebar re-renders every page unless
+    ``refresh_sidebar`` is false. Returns a dict of counts: rendered,
+    skipped, removed and failed, plus the ``failures`` as ``{url: status}``.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    manifest = read_manifest(output_dir)
+    previous = manifest["pages"]
+    sidebar = sidebar_fingerprint()
+    if manifest["sidebar"] != sidebar:
+        if refresh_sidebar or not previous:
+            force = True
+        elif not force:
+            # Pages left alone keep the sidebar they were rendered with
+            sidebar = manifest["sidebar"]
+    pages = site_pages()
+    stale = [url for url, fingerprint in pages.items() if force or previous.get(url) != fingerprint]
+
+    statuses = render_pages(stale, output_dir, base_url, workers, allow_host)
+    failures = {url: status for url, status in statuses.items() if status != 200}
+
+    manifest = {
+        "sidebar": sidebar,
+        "pages": {url: fingerprint for url, fingerprint in pages.items() if url not in failures},
+    }
+    removed = 0
+    for url in previous.keys() - pages.keys():
+        for content_type in ("text/html", "application/xml"):
+            target = output_dir / output_path(url, content_type)
+            if target.exists():
+                target.unlink()
+                removed += 1
+
+    copy_assets(output_dir, static=static, media=media)
+    write_manifest(output_dir, manifest)
+
+    return {
+        "rendered": len(stale) - len(failures),
+        "skipped": len(pages) - len(stale),
+        "removed": removed,
+        "failed": len(failures),
+        "failures": failures,
+    }
+
+
+def export_options():
+    return getattr(settings, "BLOG_STATIC_EXPORT", {})
+
+
+def schedule_update():
+    """
+    Mark the static mirror out of date once the current transaction commits.
+
+    Does nothing unless ``BLOG_STATIC_EXPORT["ROOT"]`` is set. The update
+    itself is left to ``manage.py export_static --watch``.
+    """
+    root = export_options().get("ROOT")
+    if root:
+        transaction.on_commit(lambda: mark_pending(root))
+
+
+def mark_pending(output_dir):
+    path = Path(output_dir) / PENDING_NAME
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.touch()
+
+
+def claim_pending(output_dir):
+    """
+    Clear the out-of-date mark; returns whether it was set.
+
+    Changes committed while the update runs mark the mirror again.
+    """
+    try:
+        (Path(output_dir) / PENDING_NAME).unlink()
+    except FileNotFoundError:
+        return False
+    return True
@@ -1,15 +1,35 @@
-import markdown
+import html
+import re
+from pathlib import PurePosixPath
+from urllib.parse import unquote
 
 from django import template
+from django.conf import settings
+from django.core.files.storage import default_storage
 from django.template.defaultfilters import stringfilter
+from django.templatetags.static import static
+from django.utils.html import escape, format_html_join
+
+from blog import assets, images, media_resize, og_cards
+from blog.pagination import STATIC_EXPORT_ENVIRON
+from blog.rendering import renderer
 
 register = template.Library()
 
+MEDIA_IMAGE_RE = re.compile(r'<img\b([^>]*?) src="([^"?]+)"([^>]*)>')
+BODY_IMAGE_WIDTHS = (480, 960, 1440)
+BODY_IMAGE_SIZES = "(min-width: 992px) 720px, 100vw"
+
 
 @register.filter
 @stringfilter
 def convert_markdown(value):
-    return markdown.markdown(value, extensions=["markdown.extensions.fenced_code"])
+    return renderer.render(
+        value,
+        extensions=["markdown.extensions.fenced_code"],
+        extension_configs={},
+        sanitize=False,
+    )
 
 
 @register.filter(name="month_name")
@@ -34,3 +54,75 @@ def month_name(month_number):
         return months[int(month_number) - 1]
     except (ValueError, IndexError):
         return ""  # Return empty string for invalid input
+
+
+@register.inclusion_tag("blog/partials/post_image.html")
+def responsive_image(post, sizes="100vw", css_class="img-fluid"):
+    """
+    Render a post's image as a ``<picture>`` with WebP and JPEG ``srcset``.
+
+    Until its renditions exist, the original image is shown.
+    """
+    fallback = images.best_rendition(post, images.OG_IMAGE_WIDTH)
+    return {
+        "post": post,
+        "sizes": sizes,
+        "css_class": css_class,
+        "webp_srcset": images.srcset(post, "webp"),
+        "jpeg_srcset": images.srcset(post, "jpeg"),
+        "src": default_storage.url(fallback["name"]) if fallback else post.image.url,
+        "dimensions": images.dimensions(post),
+    }
+
+
+@register.filter
+def og_image_url(post):
+    """Path of the post's image sized for link previews, or of its generated card."""
+    if not post.image:
+        return og_cards.card_url(post)
+    rendition = images.best_rendition(post, images.OG_IMAGE_WIDTH)
+    return default_storage.url(rendition["name"]) if rendition else post.image.url
+
+
+@register.filter
+@stringfilter
+def resized_images(value, request=None):
+    """
+    Point the media images of rendered post HTML at resized copies.
+
+    Each gets a ``srcset`` of ``BODY_IMAGE_WIDTHS`` and loads lazily, so
+    posts embedding large originals need no editing. Pages rendered for the
+    static export (pass the ``request``) keep the originals: a static file
+    server cannot answer the copies' query strings.
+    """
+    if request is not None and request.META.get(STATIC_EXPORT_ENVIRON):
+        return value
+
+    def replace(match):
+        before, src, after = match.groups()
+        src = html.unescape(src)
+        if not src.startswith(settings.MEDIA_URL) or "srcset=" in before + after:
+            return match.group(0)
+        name = unquote(src.removeprefix(settings.MEDIA_URL))
+        if PurePosixPath(name).suffix.lower() not in media_resize.SOURCE_FORMATS:
+            return match.group(0)
+        srcset = ", ".join(
+            f"{media_resize.resized_url(name, width)} {width}w" for width in BODY_IMAGE_WIDTHS
+        )
+        return (
+            f'<img{before} src="{escape(media_resize.resized_url(name, 960))}"'
+            f' srcset="{escape(srcset)}" sizes="{BODY_IMAGE_SIZES}"'
+            f' loading="lazy" decoding="async"{after}>'
+        )
+
+    return MEDIA_IMAGE_RE.sub(replace, value)
+
+
+@register.simple_tag
+def bundle(name):
+    """``<link>`` tags for a CSS bundle of ``blog.assets``: the built file, or its sources."""
+    return format_html_join(
+        "\n    ",
+        '<link rel="stylesheet" href="{}">',
+        ((static(path),) for path in assets.bundle_files(name)),
+    )
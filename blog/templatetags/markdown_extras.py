@@ -1,8 +1,9 @@
-import markdown
 from django import template
 from django.template.defaultfilters import stringfilter
 from django.utils.safestring import mark_safe
 
+from blog.rendering import render_markdown
+
 register = template.Library()
 
 
@@ -11,20 +12,8 @@ register = template.Library()
 def markdown_filter(value):
     """
     Converts a markdown string to HTML, preserving code highlighting.
+
+    Post bodies are rendered once on save; prefer ``post.content_html`` in
+    templates and keep this filter for ad-hoc markdown snippets.
     """
-    html = markdown.markdown(
-        value,
-        extensions=[
-            "markdown.extensions.fenced_code",
-            "markdown.extensions.codehilite",
-            "markdown.extensions.tables",
-            "markdown.extensions.toc",
-        ],
-        extension_configs={
-            "markdown.extensions.codehilite": {
-                "css_class": "highlight",
-                "linenums": False,
-            },
-        },
-    )
-    return mark_safe(html)
+    return mark_safe(render_markdown(value))
@@ -1,3 +1,1394 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+import os
+import tempfile
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+
+from . import (
+    archive,
+    assets,
+    backup,
+    images,
+    markdown_import,
+    media_resize,
+    og_cards,
+    page_cache,
+    rendering,
+    sidebar,
+    static_export,
+)
+from .markdown_import import import_directory, parse_front_matter
+from .models import ArchiveMonth, Category, Post, SearchDocument, Tag
+from .search import search_post_ids
+from .search.backends import get_backend
+from .search.backends.inverted import term_weight
+from .signals import posts_bulk_updated
+
+# For tests counting queries: the database cache would add its own
+PROCESS_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+class StoredHTMLTests(TestCase):
+    """Post HTML is rendered and sanitized on save, not on page views."""
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user("author")
+
+    def create_post(self, content):
+        return Post.objects.create(
+            title="Stored",
+            author=self.author,
+            content=content,
+            status="published",
+            published_date=timezone.now(),
+        )
+
+    def test_markup_outside_the_allow_list_is_removed(self):
+        post = self.create_post(
+            "# Title\n\n"
+            "<script>alert(1)</script>\n\n"
+            '<img src="x.png" onerror="alert(2)">\n\n'
+            "[link](javascript:alert(3)) <a href=\"#\" onclick=\"alert(4)\">a</a>\n\n"
+            "```python\nprint(1)\n```"
+        )
+        html = post.content_html
+        self.assertNotIn("<script", html)
+        self.assertNotIn("onerror", html)
+        self.assertNotIn("javascript:", html)
+        self.assertNotIn("onclick", html)
+        self.assertIn('<img src="x.png">', html)
+        self.assertIn('<h1 id="title">Title</h1>', html)
+        self.assertIn('<div class="highlight">', html)
+        self.assertEqual(post.content_html_version, rendering.RENDERER_VERSION)
+
+    def test_page_views_do_not_render_markdown(self):
+        post = self.create_post("Some *stored* text")
+        with mock.patch("markdown.markdown") as markdown:
+            response = self.client.get(post.get_absolute_url())
+        self.assertContains(response, "<em>stored</em>")
+        markdown.assert_not_called()
+
+    def test_rerender_posts_updates_stale_html(self):
+        post = self.create_post("Some *stored* text")
+        Post.objects.filter(pk=post.pk).update(content_html="stale", content_html_version=0)
+        updated_at = Post.objects.get(pk=post.pk).updated_at
+
+        call_command("rerender_posts", stdout=io.StringIO())
+
+        post.refresh_from_db()
+        self.assertEqual(post.content_html, "<p>Some <em>stored</em> text</p>")
+        self.assertEqual(post.content_html_version, rendering.RENDERER_VERSION)
+        self.assertEqual(post.updated_at, updated_at)
+
+
+class DerivedFieldsTests(TestCase):
+    """Summary, word count and reading time follow the content they come from."""
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user("author")
+
+    def test_fields_are_derived_on_save(self):
+        words = " ".join(["word"] * 401)
+        post = Post.objects.create(
+            title="Derived",
+            author=self.author,
+            content=f"## Heading\n\n<b>Bold</b> {words}",
+        )
+        self.assertEqual(post.summary, "Bold " + " ".join(["word"] * 29) + "...")
+        # The heading counts: it is part of what is read
+        self.assertEqual(post.word_count, 403)
+        self.assertEqual(post.reading_time, 3)
+        self.assertEqual(Post.objects.create(title="Empty", author=self.author).reading_time, 0)
+
+    def test_saving_content_by_field_updates_the_derived_fields(self):
+        post = Post.objects.create(title="Derived", author=self.author, content="One two")
+        post.content = "One two three"
+        post.save(update_fields=["content"])
+        post.refresh_from_db()
+        self.assertEqual((post.summary, post.word_count), ("One two three", 3))
+        self.assertEqual(post.content_html, "<p>One two three</p>")
+
+    def test_list_pages_leave_the_body_unread(self):
+        Post.objects.create(
+            title="Listed",
+            author=self.author,
+            content="Listed body",
+            status="published",
+            published_date=timezone.now(),
+        )
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/")
+        self.assertContains(response, "Listed body")
+        self.assertContains(response, "1 min read")
+        post_queries = [q["sql"] for q in queries if 'FROM "blog_post"' in q["sql"]]
+        self.assertTrue(post_queries)
+        for sql in post_queries:
+            self.assertNotIn('"blog_post"."content"', sql)
+
+
+@override_settings(CACHES=PROCESS_CACHES)
+class RenderCacheTests(TestCase):
+    """The renderer renders a source once and keeps its local copies within budget."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_identical_sources_render_once(self):
+        renderer = rendering.MarkdownRenderer()
+        with mock.patch("markdown.markdown", wraps=rendering.markdown.markdown) as markdown:
+            html = renderer.render("*one*")
+            self.assertEqual(renderer.render("*one*"), html)
+            # Another process only has the shared cache
+            self.assertEqual(rendering.MarkdownRenderer().render("*one*"), html)
+            renderer.render("*one*", sanitize=False)
+        self.assertEqual(markdown.call_count, 2)
+        self.assertEqual(renderer.stats()["local_hits"], 1)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        renderer = rendering.MarkdownRenderer(max_bytes=40)
+        renderer.render("first")  # <p>first</p>: 12 bytes
+        renderer.render("second")
+        renderer.render("third")
+        renderer.render("first")
+        renderer.render("fourth")
+
+        stats = renderer.stats()
+        self.assertLessEqual(stats["local_bytes"], 40)
+        self.assertEqual(stats["local_entries"], 3)
+        cache.clear()
+        renderer.render("first")
+        self.assertEqual(renderer.stats()["local_hits"], 2)
+        renderer.render("second")
+        self.assertEqual(renderer.stats()["misses"], 5)
+
+    def test_oversized_renders_are_not_kept_locally(self):
+        renderer = rendering.MarkdownRenderer(max_bytes=10)
+        renderer.render("too long to keep")
+        self.assertEqual(renderer.stats()["local_entries"], 0)
+
+
+@override_settings(BLOG_SEARCH_BACKEND="blog.search.backends.inverted.InvertedIndexBackend")
+class InvertedIndexSearchTests(TestCase):
+    """The inverted index ranks with BM25F and reads a bounded number of postings."""
+
+    def setUp(self):
+        cache.clear()
+        get_backend.cache_clear()
+        self.addCleanup(get_backend.cache_clear)
+        self.author = User.objects.create_user("author")
+
+    def create_post(self, title, content, status="published"):
+        return Post.objects.create(
+            title=title,
+            author=self.author,
+            content=content,
+            status=status,
+            published_date=timezone.now(),
+        )
+
+    def test_fields_are_weighted(self):
+        in_content = self.create_post("Notes", "A few words about django and more")
+        in_title = self.create_post("Django notes", "A few words about web sites")
+        tagged = self.create_post("More notes", "A few words about frameworks")
+        tagged.tags.add(Tag.objects.create(name="Django"))
+        # Tags are weighed against the average number per post
+        for post in (in_content, in_title, self.create_post("Other", "Nothing to see")):
+            post.tags.add(Tag.objects.get_or_create(name="Web")[0])
+        self.create_post("Django draft", "Not published", status="draft")
+
+        self.assertEqual(search_post_ids("django"), [in_title.pk, tagged.pk, in_content.pk])
+        self.assertEqual(search_post_ids("the"), [])
+
+        response = self.client.get("/search/", {"q": "Django"})
+        self.assertEqual(
+            [post.pk for post in response.context["posts"]],
+            [in_title.pk, tagged.pk, in_content.pk],
+        )
+
+    def test_rarer_terms_weigh_more(self):
+        common = self.create_post("Python", "Python python python")
+        rare = self.create_post("Rust", "Python code")
+        for i in range(3):
+            self.create_post(f"Python {i}", "More python")
+        self.assertEqual(search_post_ids("python rust")[0], rare.pk)
+        self.assertIn(common.pk, search_post_ids("python rust"))
+
+    def test_candidates_are_capped_per_term(self):
+        best = self.create_post("Common common", "common")
+        posts = [self.create_post(f"Post {i}", f"common filler words {i}") for i in range(4)]
+        inverted = "blog.search.backends.inverted"
+        with (
+            mock.patch(f"{inverted}.CANDIDATES_PER_TERM", 2),
+            mock.patch(f"{inverted}.term_weight", wraps=term_weight) as scored,
+        ):
+            self.assertEqual(search_post_ids("common", limit=1), [best.pk])
+            search_post_ids("common filler", limit=1)
+        self.assertEqual(scored.call_count, 2 + 2 * 2)
+        self.assertEqual(len(search_post_ids("common")), 5)
+        self.assertCountEqual(search_post_ids("filler"), [post.pk for post in posts])
+
+
+class DatabaseSearchTestsMixin:
+    """Ranking and index upkeep shared by the database-native backends."""
+
+    def setUp(self):
+        cache.clear()
+        get_backend.cache_clear()
+        self.addCleanup(get_backend.cache_clear)
+        self.author = User.objects.create_user("author")
+
+    def create_post(self, title, content):
+        return Post.objects.create(
+            title=title,
+            author=self.author,
+            content=content,
+            status="published",
+            published_date=timezone.now(),
+        )
+
+    def test_title_outranks_tags_and_body(self):
+        in_body = self.create_post("Notes", "Deploying a django site")
+        in_title = self.create_post("Django deployment", "Notes on shipping")
+        tagged = self.create_post("More notes", "Notes on shipping")
+        tagged.tags.add(Tag.objects.create(name="Django"))
+        self.create_post("Other", "Nothing to see")
+        self.assertEqual(search_post_ids("django"), [in_title.pk, tagged.pk, in_body.pk])
+
+    def test_terms_are_stemmed_and_all_required(self):
+        running = self.create_post("Running", "Tips for long runs")
+        self.create_post("Walking", "Tips for long walks")
+        self.assertEqual(search_post_ids("runs tips"), [running.pk])
+        self.assertEqual(search_post_ids("runs swimming"), [])
+
+    def test_query_syntax_is_not_interpreted(self):
+        post = self.create_post("Django", "Quotes")
+        for query in ('"django', "django AND (", "django*) NOT", "-django:"):
+            self.assertIsInstance(search_post_ids(query), list)
+        self.assertEqual(search_post_ids('"django'), [post.pk])
+
+    def test_index_follows_edits(self):
+        post = self.create_post("Django", "Body")
+        post.title = "Flask"
+        post.save()
+        self.assertEqual(search_post_ids("django"), [])
+        self.assertEqual(search_post_ids("flask"), [post.pk])
+        post.unpublish()
+        self.assertEqual(search_post_ids("flask"), [])
+
+
+@skipUnless(connection.vendor == "sqlite", "SQLite only")
+@override_settings(BLOG_SEARCH_BACKEND="blog.search.backends.sqlite.SQLiteFTSBackend")
+class SQLiteFTSSearchTests(DatabaseSearchTestsMixin, TestCase):
+    """The FTS5 table ranks with weighted bm25() and follows the documents."""
+
+
+@skipUnless(connection.vendor == "postgresql", "PostgreSQL only")
+@override_settings(BLOG_SEARCH_BACKEND="blog.search.backends.postgres.PostgresSearchBackend")
+class PostgresSearchTests(DatabaseSearchTestsMixin, TestCase):
+    """The weighted tsvector column ranks with ts_rank_cd() and follows the documents."""
+
+
+class KeysetPaginationTests(TestCase):
+    """Keyset listings reach every published post, however it was published."""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser("admin")
+        now = timezone.now()
+        for i in range(7):
+            Post.objects.create(
+                title=f"Post {i}",
+                author=self.admin,
+                content="Keyset body",
+                status="published",
+                published_date=now - timedelta(days=i),
+            )
+        self.draft = Post.objects.create(title="Draft", author=self.admin, content="Keyset body")
+
+    def publish_draft(self):
+        self.client.force_login(self.admin)
+        self.client.post(
+            "/my-blog-admin/blog/post/",
+            {"action": "publish_posts", "_selected_action": [self.draft.pk]},
+        )
+        self.client.logout()
+        cache.clear()
+
+    def test_publish_action_dates_posts(self):
+        self.publish_draft()
+        self.draft.refresh_from_db()
+        self.assertEqual(self.draft.status, "published")
+        self.assertIsNotNone(self.draft.published_date)
+
+    @override_settings(BLOG_KEYSET_PAGINATION=True)
+    def test_pages_cover_every_post_once(self):
+        self.publish_draft()
+        slugs, cursor = [], None
+        while True:
+            response = self.client.get("/", {"cursor": cursor} if cursor else {})
+            self.assertEqual(response.status_code, 200)
+            page = response.context["page_obj"]
+            slugs += [post.slug for post in page]
+            if not page.has_next():
+                break
+            cursor = page.next_cursor
+        self.assertEqual(sorted(slugs), sorted(Post.objects.values_list("slug", flat=True)))
+        self.assertEqual(slugs[0], "draft")
+
+        previous = self.client.get("/", {"cursor": page.previous_cursor}).context["page_obj"]
+        self.assertEqual([post.slug for post in previous], slugs[-len(page) - 5 : -len(page)])
+
+    @override_settings(BLOG_KEYSET_PAGINATION=True)
+    def test_api_search_keeps_relevance_order(self):
+        self.assertIn("cursor=", self.client.get("/api/posts/", {"page_size": 2}).json()["next"])
+
+        Post.objects.filter(title="Post 5").update(title="Keyset keyset keyset")
+        Post.objects.get(title="Keyset keyset keyset").save()
+        response = self.client.get("/api/posts/", {"search": "keyset"}).json()
+        self.assertEqual(response["count"], 7)
+        self.assertEqual(response["results"][0]["title"], "Keyset keyset keyset")
+
+
+class ArchiveTests(TestCase):
+    """The materialized archive matches a recount after every kind of change."""
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user("author")
+
+    def create_post(self, title, month, status="published"):
+        return Post.objects.create(
+            title=title,
+            author=self.author,
+            content="Archived",
+            status=status,
+            published_date=timezone.make_aware(datetime(2024, month, 15)),
+        )
+
+    def assertMatchesRecount(self, expected):
+        months = list(ArchiveMonth.objects.values_list("year", "month", "post_count"))
+        self.assertEqual(months, expected)
+        archive.rebuild()
+        self.assertEqual(
+            list(ArchiveMonth.objects.values_list("year", "month", "post_count")), months
+        )
+
+    def test_counts_follow_post_changes(self):
+        first = self.create_post("First", 1)
+        second = self.create_post("Second", 1)
+        self.create_post("Third", 3)
+        draft = self.create_post("Draft", 2, status="draft")
+        self.assertMatchesRecount([(2024, 3, 1), (2024, 1, 2)])
+
+        second.published_date = timezone.make_aware(datetime(2024, 2, 15))
+        second.save()
+        draft.status = "published"
+        draft.save()
+        first.unpublish()
+        self.assertMatchesRecount([(2024, 3, 1), (2024, 2, 2)])
+
+    def test_bulk_updates_rebuild_the_archive(self):
+        posts = [self.create_post(f"Post {i}", 5) for i in range(3)]
+        Post.objects.filter(pk=posts[0].pk).update(status="draft")
+        posts_bulk_updated.send(sender=Post, post_ids=[posts[0].pk])
+        self.assertMatchesRecount([(2024, 5, 2)])
+
+        posts[1].delete()
+        self.assertMatchesRecount([(2024, 5, 1)])
+        posts[2].delete()
+        self.assertMatchesRecount([])
+
+    def test_sidebar_tree_reads_only_the_archive(self):
+        self.create_post("January", 1)
+        self.create_post("March", 3)
+        with CaptureQueriesContext(connection) as queries:
+            dates = archive.archive_dates()
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(
+            dates,
+            [
+                {
+                    "year": 2024,
+                    "post_count": 2,
+                    "months": [
+                        {"month": 3, "post_count": 1},
+                        {"month": 1, "post_count": 1},
+                    ],
+                }
+            ],
+        )
+
+
+@override_settings(CACHES=PROCESS_CACHES)
+class SidebarDataTests(TestCase):
+    """The sidebar data is built once per generation, and changes start a new one."""
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user("author")
+        self.tag = Tag.objects.create(name="Django")
+        self.post = Post.objects.create(
+            title="Sidebar",
+            author=self.author,
+            content="Body",
+            status="published",
+            published_date=timezone.now(),
+        )
+
+    def tag_counts(self):
+        return {tag.name: tag.post_count for tag in sidebar.get_sidebar_data()["tags"]}
+
+    def test_data_is_built_once_per_generation(self):
+        sidebar.get_sidebar_data()
+        with self.assertNumQueries(0):
+            sidebar.get_sidebar_data()
+        # A lost generation starts a new one instead of serving stale data
+        cache.delete(sidebar.GENERATION_KEY)
+        with self.assertNumQueries(3):
+            sidebar.get_sidebar_data()
+
+    def test_changes_that_show_in_the_sidebar_bump_the_generation(self):
+        self.assertEqual(self.tag_counts(), {"Django": 0})
+
+        self.post.tags.add(self.tag)
+        self.assertEqual(self.tag_counts(), {"Django": 1})
+        Tag.objects.create(name="Python")
+        self.assertEqual(self.tag_counts(), {"Django": 1, "Python": 0})
+        self.post.unpublish()
+        self.assertEqual(self.tag_counts(), {"Django": 0, "Python": 0})
+        self.tag.delete()
+        self.assertEqual(self.tag_counts(), {"Python": 0})
+
+    def test_other_changes_keep_the_generation(self):
+        draft = Post.objects.create(title="Draft", author=self.author, content="Body")
+        generation = sidebar.generation()
+
+        self.post.content = "Edited body"
+        self.post.save()
+        draft.tags.add(self.tag)
+
+        self.assertEqual(sidebar.generation(), generation)
+
+
+class PageCacheTests(TestCase):
+    """Cached pages keep their own content and get the current sidebar when served."""
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user("author")
+        self.tag = Tag.objects.create(name="Django")
+        self.post, self.other = (
+            Post.objects.create(
+                title=title,
+                author=self.author,
+                content="Cached body",
+                status="published",
+                published_date=timezone.now(),
+            )
+            for title in ("Cached", "Other")
+        )
+        self.post_url = self.post.get_absolute_url()
+
+    def templates(self, response):
+        return [template.name for template in response.templates]
+
+    def test_anonymous_pages_are_served_from_the_cache(self):
+        self.assertIn("blog/post_detail.html", self.templates(self.client.get(self.post_url)))
+        self.assertNotIn("blog/post_detail.html", self.templates(self.client.get(self.post_url)))
+
+        # HTMX requests get their own copy
+        htmx = self.client.get(self.post_url, headers={"HX-Request": "true"})
+        self.assertIn("blog/partials/post_detail_content.html", self.templates(htmx))
+
+        self.client.force_login(self.author)
+        self.assertIn("blog/post_detail.html", self.templates(self.client.get(self.post_url)))
+
+    def test_editing_a_post_purges_its_page_and_the_listings(self):
+        other_url = self.other.get_absolute_url()
+        for url in ("/", self.post_url, other_url):
+            self.client.get(url)
+
+        self.post.title = "Edited"
+        self.post.save()
+
+        self.assertContains(self.client.get("/"), "Edited")
+        self.assertIn("blog/post_detail.html", self.templates(self.client.get(self.post_url)))
+        self.assertNotIn("blog/post_detail.html", self.templates(self.client.get(other_url)))
+
+    def test_publishing_purges_the_listings_only(self):
+        self.client.get("/")
+        self.client.get(self.post_url)
+
+        Post.objects.create(
+            title="Fresh",
+            author=self.author,
+            content="New body",
+            status="published",
+            published_date=timezone.now(),
+        )
+
+        self.assertContains(self.client.get("/"), "Fresh")
+        self.assertNotIn("blog/post_detail.html", self.templates(self.client.get(self.post_url)))
+
+    def test_sidebar_change_keeps_pages_cached(self):
+        self.client.get(self.post_url)
+        self.other.tags.add(Tag.objects.create(name="Python"))
+
+        response = self.client.get(self.post_url)
+
+        self.assertNotIn("blog/post_detail.html", self.templates(response))
+        self.assertContains(response, "Python")
+
+    def test_served_etag_follows_the_sidebar(self):
+        first = self.client.get(self.post_url)
+        revalidated = self.client.get(self.post_url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(revalidated.status_code, 304)
+
+        self.other.tags.add(Tag.objects.create(name="Python"))
+        cached = self.client.get(self.post_url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(cached.status_code, 200)
+        self.assertNotEqual(cached["ETag"], first["ETag"])
+
+        # A fresh render validates the same way as the cached copy
+        cache.delete(page_cache.page_key(cached.wsgi_request))
+        fresh = self.client.get(self.post_url)
+        self.assertIn("blog/post_detail.html", self.templates(fresh))
+        self.assertEqual(fresh["ETag"], cached["ETag"])
+
+    def test_retagging_purges_the_post_and_tag_pages(self):
+        tag_url = self.tag.get_absolute_url()
+        self.client.get(self.post_url)
+        self.client.get(tag_url)
+
+        self.post.tags.add(self.tag)
+
+        self.assertContains(self.client.get(tag_url), "Cached")
+        response = self.client.get(self.post_url)
+        self.assertIn("blog/post_detail.html", self.templates(response))
+
+    def test_renaming_a_tag_purges_its_posts(self):
+        self.post.tags.add(self.tag)
+        self.client.get(self.post_url)
+        self.client.get(self.other.get_absolute_url())
+
+        self.tag.name = "Renamed"
+        self.tag.save()
+
+        self.assertIn("blog/post_detail.html", self.templates(self.client.get(self.post_url)))
+        other = self.client.get(self.other.get_absolute_url())
+        self.assertNotIn("blog/post_detail.html", self.templates(other))
+
+    def test_per_process_cache_is_refused(self):
+        with override_settings(CACHES=PROCESS_CACHES, DEBUG=False):
+            self.assertEqual([e.id for e in page_cache.check_shared_cache(None)], ["blog.E001"])
+        with override_settings(CACHES=PROCESS_CACHES, BLOG_PAGE_CACHE={"ENABLED": False}):
+            self.assertEqual(page_cache.check_shared_cache(None), [])
+        self.assertEqual(page_cache.check_shared_cache(None), [])
+
+
+@override_settings(CACHES=PROCESS_CACHES, BLOG_PAGE_CACHE={"ENABLED": False})
+class ConditionalGetTests(TestCase):
+    """Pages, feeds and sitemaps answer unchanged conditional GETs with a 304."""
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user("author")
+        self.post = Post.objects.create(
+            title="Validated",
+            author=self.author,
+            content="Body",
+            status="published",
+            published_date=timezone.now(),
+        )
+        self.urls = ["/", self.post.get_absolute_url(), "/feed/rss/", "/sitemap.xml"]
+
+    def test_unchanged_responses_are_not_sent_again(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                with CaptureQueriesContext(connection) as queries:
+                    revalidated = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+                self.assertEqual(revalidated.status_code, 304)
+                # Only ATOMIC_REQUESTS savepoints: the validators are cached
+                self.assertFalse([q for q in queries if "SAVEPOINT" not in q["sql"]])
+                since = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+                self.assertEqual(since.status_code, 304)
+
+    def test_edits_change_the_validators(self):
+        etags = {url: self.client.get(url)["ETag"] for url in self.urls}
+        self.post.title = "Edited"
+        self.post.save()
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_htmx_and_logged_in_pages_validate_apart(self):
+        url = self.post.get_absolute_url()
+        etag = self.client.get(url)["ETag"]
+        htmx = self.client.get(url, HTTP_IF_NONE_MATCH=etag, headers={"HX-Request": "true"})
+        self.assertEqual(htmx.status_code, 200)
+        self.assertNotEqual(htmx["ETag"], etag)
+
+        self.client.force_login(self.author)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header("ETag"))
+        self.assertTrue(self.client.get("/feed/rss/").has_header("ETag"))
+
+
+class StaticExportTests(TestCase):
+    """export_site writes the public pages and re-renders only what changed."""
+
+    # A port, as in a development or staging mirror
+    BASE_URL = "http://mirror.example:8000"
+
+    def setUp(self):
+        cache.clear()
+        self.output = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        media = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(MEDIA_ROOT=media))
+        author = User.objects.create_user("author")
+        self.tag = Tag.objects.create(name="Django")
+        self.posts = [
+            Post.objects.create(
+                title=f"Exported {i}",
+                author=author,
+                content=f"Body {i}",
+                status="published",
+                published_date=timezone.now() - timedelta(days=i),
+            )
+            for i in range(2)
+        ]
+        self.posts[0].tags.add(self.tag)
+
+    def export(self):
+        return static_export.export_site(self.output, self.BASE_URL, static=False, media=False)
+
+    def test_export_writes_every_page(self):
+        result = self.export()
+
+        self.assertEqual(result["failures"], {})
+        self.assertIn("Exported 0", (self.output / "index.html").read_text())
+        for path in (
+            f"post/{self.posts[1].slug}/index.html",
+            f"tag/{self.tag.slug}/index.html",
+            "feed/rss/index.xml",
+            "robots.txt",
+        ):
+            self.assertTrue((self.output / path).is_file(), path)
+
+    def test_cards_are_written_where_pages_link_them(self):
+        self.export()
+
+        page = (self.output / f"post/{self.posts[0].slug}/index.html").read_text()
+        url = og_cards.card_url(self.posts[0])
+        self.assertIn(url, page)
+        with Image.open(self.output / url.lstrip("/")) as card:
+            self.assertEqual(card.size, og_cards.CARD_SIZE)
+
+    def test_body_images_keep_their_media_urls(self):
+        self.posts[0].content = "![Diagram](/media/uploads/diagram.png)"
+        self.posts[0].save()
+
+        self.export()
+
+        page = (self.output / f"post/{self.posts[0].slug}/index.html").read_text()
+        self.assertIn('src="/media/uploads/diagram.png"', page)
+        self.assertNotIn("/resized/", page)
+
+    def test_unchanged_pages_are_skipped(self):
+        first = self.export()
+        second = self.export()
+
+        self.assertEqual(second["rendered"], 0)
+        self.assertEqual(second["skipped"], first["rendered"])
+
+    def test_edited_post_rerenders_its_pages_only(self):
+        self.export()
+        post = self.posts[1]
+        post.content = "Edited body"
+        post.save()
+
+        result = self.export()
+
+        self.assertEqual(result["failures"], {})
+        self.assertGreater(result["skipped"], 0)
+        page = self.output / f"post/{post.slug}/index.html"
+        self.assertIn("Edited body", page.read_text())
+
+    def test_failed_pages_are_reported_and_retried(self):
+        pages = {**static_export.site_pages(), "/missing/": "fingerprint"}
+        with mock.patch.object(static_export, "site_pages", return_value=pages):
+            first = self.export()
+            second = self.export()
+
+        self.assertEqual(first["failures"], {"/missing/": 404})
+        self.assertEqual((second["rendered"], second["failed"]), (0, 1))
+        self.assertNotIn("/missing/", static_export.read_manifest(self.output)["pages"])
+
+    def test_edit_rerenders_the_pages_showing_the_post(self):
+        self.export()
+        post = self.posts[0]
+        post.content = "Edited body"
+        post.save()
+
+        with mock.patch.object(
+            static_export, "render_pages", wraps=static_export.render_pages
+        ) as render_pages:
+            self.export()
+
+        stale = set(render_pages.call_args.args[0])
+        self.assertLessEqual(
+            {"/", post.get_absolute_url(), self.tag.get_absolute_url()}, stale
+        )
+        self.assertNotIn(self.posts[1].get_absolute_url(), stale)
+
+    def test_deleted_post_page_is_removed(self):
+        self.export()
+        slug = self.posts[1].slug
+        self.posts[1].delete()
+
+        result = self.export()
+
+        # Its page and its card
+        self.assertEqual(result["removed"], 2)
+        self.assertFalse((self.output / f"post/{slug}/index.html").exists())
+
+    def test_sidebar_change_rerenders_untouched_pages_only_when_refreshing(self):
+        self.export()
+        untouched = self.output / f"post/{self.posts[1].slug}/index.html"
+        mtime = untouched.stat().st_mtime_ns
+        # A new tag on one post changes the tag counts in every sidebar
+        self.posts[0].tags.add(Tag.objects.create(name="Python"))
+
+        update = static_export.export_site(
+            self.output, self.BASE_URL, static=False, media=False, refresh_sidebar=False
+        )
+        self.assertGreater(update["skipped"], 0)
+        self.assertEqual(untouched.stat().st_mtime_ns, mtime)
+
+        full = self.export()
+        self.assertEqual(full["skipped"], 0)
+        self.assertNotEqual(untouched.stat().st_mtime_ns, mtime)
+
+    def test_changes_mark_the_mirror_for_the_watcher(self):
+        with override_settings(BLOG_STATIC_EXPORT={"ROOT": str(self.output)}):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.posts[0].save()
+
+        self.assertTrue(static_export.claim_pending(self.output))
+        self.assertFalse(static_export.claim_pending(self.output))
+
+
+@override_settings(CACHES=PROCESS_CACHES)
+class PostAPIReadPathTests(TestCase):
+    """The post API loads a page of posts with a fixed number of queries."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user("author")
+        categories = Category.objects.bulk_create(
+            Category(name=f"Category {i}", slug=f"category-{i}") for i in range(3)
+        )
+        tags = Tag.objects.bulk_create(Tag(name=f"Tag {i}", slug=f"tag-{i}") for i in range(3))
+        now = timezone.now()
+        posts = Post.objects.bulk_create(
+            Post(
+                title=f"Post {i}",
+                slug=f"post-{i}",
+                author=author,
+                content="Body",
+                status="published",
+                published_date=now - timedelta(minutes=i),
+            )
+            for i in range(120)
+        )
+        Post.categories.through.objects.bulk_create(
+            Post.categories.through(post=post, category=categories[i % 3])
+            for i, post in enumerate(posts)
+        )
+        Post.tags.through.objects.bulk_create(
+            Post.tags.through(post=post, tag=tag) for post in posts for tag in tags
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_page_query_count_does_not_grow_with_page_size(self):
+        # The request's savepoint pair, count, page, categories and tags
+        with self.assertNumQueries(6):
+            small = self.client.get("/api/posts/", {"page_size": 10})
+        cache.clear()
+        with self.assertNumQueries(6):
+            response = self.client.get("/api/posts/", {"page_size": 100})
+
+        self.assertEqual(len(small.json()["results"]), 10)
+        results = response.json()["results"]
+        self.assertEqual(len(results), 100)
+        self.assertEqual(results[0]["author"]["username"], "author")
+        self.assertEqual(len(results[0]["tags"]), 3)
+
+    def test_cached_representations_skip_taxonomy_queries(self):
+        first = self.client.get("/api/posts/", {"page_size": 100}).json()
+        # The request's savepoint pair, count and page only
+        with self.assertNumQueries(4):
+            second = self.client.get("/api/posts/", {"page_size": 100}).json()
+        self.assertEqual(first, second)
+
+    def test_updated_post_is_serialized_again(self):
+        self.client.get("/api/posts/", {"page_size": 100})
+        post = Post.objects.get(slug="post-0")
+        post.title = "Renamed"
+        post.save()
+
+        results = self.client.get("/api/posts/", {"page_size": 100}).json()["results"]
+        self.assertEqual(results[0]["title"], "Renamed")
+
+    def test_scheduled_post_appears_once_due(self):
+        scheduled = Post.objects.get(slug="post-0")
+        scheduled.published_date = timezone.now() + timedelta(hours=1)
+        scheduled.save()
+
+        self.assertEqual(self.client.get(f"/api/posts/{scheduled.slug}/").status_code, 404)
+        later = timezone.now() + timedelta(hours=2)
+        with mock.patch("django.utils.timezone.now", return_value=later):
+            response = self.client.get(f"/api/posts/{scheduled.slug}/")
+        self.assertEqual(response.status_code, 200)
+
+    def test_fields_and_expand_select_the_output(self):
+        # The request's savepoint pair, count and page: no join, no prefetch
+        with self.assertNumQueries(4):
+            response = self.client.get("/api/posts/", {"fields": "id,title,author", "expand": ""})
+        post = response.json()["results"][0]
+        self.assertEqual(set(post), {"id", "title", "author"})
+        self.assertIsInstance(post["author"], int)
+
+        response = self.client.get("/api/posts/", {"fields": "title,tags", "expand": "tags"})
+        tag = response.json()["results"][0]["tags"][0]
+        expected = Tag.objects.get(name="Tag 0")
+        self.assertEqual(tag, {"id": expected.pk, "name": "Tag 0", "slug": "tag-0"})
+
+    def test_detail_defers_content_unless_requested(self):
+        # The request's savepoint pair, the post and its category ids
+        with self.assertNumQueries(4) as context:
+            response = self.client.get("/api/posts/post-0/", {"fields": "title,categories", "expand": ""})
+        self.assertEqual(response.json(), {"title": "Post 0", "categories": [1]})
+        self.assertNotIn('"content"', context.captured_queries[1]["sql"])
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.client.get("/api/posts/", {"fields": "title,secret", "expand": "status"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json(),
+            {"fields": ["Unknown field: secret"], "expand": ["Cannot expand: status"]},
+        )
+
+
+class PostExportTests(TestCase):
+    """The NDJSON export streams the corpus, optionally gzipped and incrementally."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("reader")
+        tag = Tag.objects.create(name="Django")
+        for i in range(5):
+            post = Post.objects.create(
+                title=f"Export {i}", author=cls.user, content=f"Body {i}", status="published"
+            )
+            post.tags.add(tag)
+        Post.objects.create(title="Draft", author=cls.user, content="Hidden")
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def export(self, **params):
+        response = self.client.get("/api/posts/export/", params)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        return response
+
+    def read(self, response):
+        return [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+
+    def test_requires_authentication(self):
+        self.client.logout()
+        self.assertEqual(self.client.get("/api/posts/export/").status_code, 403)
+
+    def test_streams_one_line_per_published_post(self):
+        response = self.export()
+        # The posts and their prefetched categories and tags, per chunk
+        with self.assertNumQueries(3):
+            posts = self.read(response)
+        self.assertEqual([post["title"] for post in posts], [f"Export {i}" for i in range(5)])
+        self.assertEqual(posts[0]["content"], "Body 0")
+        self.assertEqual(posts[0]["tags"][0]["name"], "Django")
+
+    def test_gzip_and_fields(self):
+        response = self.client.get(
+            "/api/posts/export/", {"fields": "id,title"}, headers={"Accept-Encoding": "gzip, br"}
+        )
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        lines = gzip.decompress(b"".join(response.streaming_content)).splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(set(json.loads(lines[0])), {"id", "title"})
+
+    def test_updated_since(self):
+        cutoff = timezone.now()
+        post = Post.objects.get(title="Export 2")
+        post.save()
+
+        posts = self.read(self.export(updated_since=cutoff.isoformat()))
+        self.assertEqual([post["title"] for post in posts], ["Export 2"])
+        response = self.client.get("/api/posts/export/", {"updated_since": "yesterday"})
+        self.assertEqual(response.status_code, 400)
+
+
+class ChangeLogAPITests(TestCase):
+    """The changes endpoint returns upserts and tombstones after a cursor."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user("author")
+        cls.tag = Tag.objects.create(name="Django")
+        cls.post = Post.objects.create(title="Synced", author=cls.author, content="Body", status="published")
+        cls.post.tags.add(cls.tag)
+        Post.objects.create(title="Draft", author=cls.author, content="Never shown")
+
+    def setUp(self):
+        cache.clear()
+
+    def changes(self, since=None, **params):
+        # Read from a moment later, once the entries have settled
+        later = timezone.now() + timedelta(minutes=1)
+        if since:
+            params["since"] = since
+        with mock.patch("django.utils.timezone.now", return_value=later):
+            return self.client.get("/api/changes/", params).json()
+
+    def test_initial_sync_returns_current_objects_once(self):
+        page = self.changes()
+        records = [(record["type"], record["id"], record["action"]) for record in page["results"]]
+        self.assertEqual(records, [("tag", self.tag.pk, "upsert"), ("post", self.post.pk, "upsert")])
+        self.assertEqual(page["results"][1]["data"]["tags"], [self.tag.pk])
+        self.assertFalse(page["has_more"])
+
+        self.assertEqual(self.changes(page["next"])["results"], [])
+
+    def test_unpublish_and_delete_leave_tombstones(self):
+        cursor = self.changes()["next"]
+        self.post.unpublish()
+        self.tag.delete()
+
+        records = [(record["type"], record["action"]) for record in self.changes(cursor)["results"]]
+        self.assertEqual(records, [("post", "delete"), ("tag", "delete")])
+        self.assertEqual(Post.objects.get(pk=self.post.pk).tags.count(), 0)
+
+    def test_scheduled_post_shows_when_due(self):
+        cursor = self.changes()["next"]
+        scheduled = Post.objects.create(
+            title="Tomorrow",
+            author=self.author,
+            content="Soon",
+            status="published",
+            published_date=timezone.now() + timedelta(days=1),
+        )
+        self.assertEqual(self.changes(cursor)["results"], [])
+
+        later = timezone.now() + timedelta(days=2)
+        with mock.patch("django.utils.timezone.now", return_value=later):
+            page = self.client.get("/api/changes/", {"since": cursor}).json()
+        self.assertEqual([record["id"] for record in page["results"]], [scheduled.pk])
+
+    def test_bad_cursor_is_rejected(self):
+        self.assertEqual(self.client.get("/api/changes/", {"since": "nope"}).status_code, 400)
+
+    def test_limit_must_be_positive(self):
+        for limit in ("0", "-3", "many"):
+            with self.subTest(limit=limit):
+                response = self.client.get("/api/changes/", {"limit": limit})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("limit", response.json())
+        page = self.changes(limit=1)
+        self.assertEqual(len(page["results"]), 1)
+        self.assertTrue(page["has_more"])
+        self.assertEqual(len(self.changes(page["next"], limit=1)["results"]), 1)
+
+
+class MarkdownImportTests(TestCase):
+    """import_markdown writes posts, taxonomy and derived fields in bulk."""
+
+    def setUp(self):
+        self.author = User.objects.create_superuser("admin")
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+    def write(self, name, text):
+        (self.directory / name).write_text(text, encoding="utf-8")
+
+    def test_parse_front_matter(self):
+        meta, body = parse_front_matter(
+            "---\ntitle: \"A: B\"\ntags: [one, 'two']\ncategories:\n  - News\n---\n\nBody\n"
+        )
+        self.assertEqual(meta, {"title": "A: B", "tags": ["one", "two"], "categories": ["News"]})
+        self.assertEqual(body, "Body\n")
+        self.assertEqual(parse_front_matter("# No front matter"), ({}, "# No front matter"))
+
+    def test_import_directory(self):
+        Tag.objects.create(name="Django")
+        for i in range(3):
+            self.write(
+                f"post-{i}.md",
+                f"---\ntitle: Post {i}\nstatus: published\ndate: 2024-05-0{i + 1}\n"
+                f"tags: [Django, Python]\ncategories: Notes\n---\n**Bold** text {i}.\n",
+            )
+        self.write("draft.md", "Just a body.")
+        self.write("broken.md", "---\ntitle: Broken\n")
+
+        with CaptureQueriesContext(connection) as context, self.assertLogs("blog.markdown_import"):
+            stats = import_directory(self.directory, self.author, batch_size=10)
+        inserts = [
+            query["sql"]
+            for query in context
+            if query["sql"].startswith("INSERT") and ' INTO "blog_post' in query["sql"]
+        ]
+        # One statement each for the posts, their categories and their tags
+        self.assertEqual(len(inserts), 3)
+
+        self.assertEqual(stats, Counter(imported=4, failed=1))
+        post = Post.objects.get(slug="post-1")
+        self.assertEqual(post.summary, "Bold text 1.")
+        self.assertEqual(post.og_title, "Post 1")
+        self.assertIn("<strong>Bold</strong>", post.content_html)
+        self.assertEqual(sorted(post.tags.values_list("name", flat=True)), ["Django", "Python"])
+        self.assertEqual(Tag.objects.count(), 2)
+        self.assertEqual(Post.objects.get(slug="draft").status, "draft")
+        self.assertEqual(ArchiveMonth.objects.get().post_count, 3)
+
+        with self.assertLogs("blog.markdown_import") as logs:
+            self.assertEqual(import_directory(self.directory, self.author)["skipped"], 4)
+        self.assertIn("post-1.md: the slug 'post-1' is already taken", "\n".join(logs.output))
+
+    def test_workers_render_without_the_database_cache(self):
+        self.write("post.md", "---\ntitle: Worker\n---\n*Rendered* in a worker.\n")
+        self.addCleanup(setattr, rendering, "renderer", rendering.renderer)
+        markdown_import._init_worker()
+        with self.assertNumQueries(0):
+            post, *_ = markdown_import.read_post(self.directory / "post.md")
+        self.assertIn("<em>Rendered</em>", post.content_html)
+
+    def test_import_with_workers(self):
+        for i in range(4):
+            self.write(f"post-{i}.md", f"---\ntags: [Tag {i % 2}]\n---\nBody {i}\n")
+        stats = import_directory(self.directory, self.author, workers=2)
+        self.assertEqual(stats, Counter(imported=4))
+        self.assertEqual(Post.objects.get(slug="post-3").content_html, "<p>Body 3</p>")
+
+    def test_taxonomy_names_are_never_merged_or_truncated(self):
+        Tag.objects.create(name="C")
+        files = {
+            "long.md": f"tags: [{'x' * 51}]",
+            "no-slug.md": "tags: [!!!]",
+            "existing-slug.md": "tags: [C++]",
+            "first.md": "categories: [Django]",
+            "same-slug.md": "categories: [django]",
+            "long-category.md": f"categories: [{'y' * 100}]",
+        }
+        for name, front_matter in files.items():
+            self.write(name, f"---\n{front_matter}\n---\nBody\n")
+
+        with self.assertLogs("blog.markdown_import") as logs:
+            stats = import_directory(self.directory, self.author)
+
+        self.assertEqual(stats, Counter(imported=2, failed=4))
+        self.assertEqual(
+            sorted(Post.objects.values_list("slug", flat=True)), ["first", "long-category"]
+        )
+        self.assertEqual(list(Tag.objects.values_list("name", flat=True)), ["C"])
+        log = "\n".join(logs.output)
+        self.assertIn("long.md: Tag name longer than 50 characters", log)
+        self.assertIn("no-slug.md: Tag name without a slug: '!!!'", log)
+        self.assertIn("existing-slug.md: the tag 'C++' has the slug of 'C'", log)
+        self.assertIn("same-slug.md: the category 'django' has the slug of 'Django'", log)
+
+
+class BackupTests(TestCase):
+    """export_archive and restore_archive round-trip the content with its keys."""
+
+    def setUp(self):
+        author = User.objects.create_user("writer")
+        tag = Tag.objects.create(name="Django")
+        self.post = Post.objects.create(title="Kept", author=author, content="*Body*", status="published")
+        self.post.tags.add(tag)
+
+    def test_round_trip(self):
+        archive = io.BytesIO()
+        backup.export_archive(archive, media=False)
+        before = list(Post.objects.values())
+        User.objects.filter(username="writer").update(username="renamed")
+
+        archive.seek(0)
+        counts = backup.restore_archive(archive, media=False, replace=True)
+
+        self.assertEqual((counts["posts"], counts["tags"], counts["post_tags"]), (1, 1, 1))
+        after = list(Post.objects.values())
+        # The author is matched by username, so it is created again
+        self.assertEqual(User.objects.get(username="writer").pk, after[0]["author_id"])
+        for row in before + after:
+            row.pop("author_id")
+        self.assertEqual(before, after)
+        self.assertEqual(list(Post.objects.get().tags.values_list("name", flat=True)), ["Django"])
+        self.assertTrue(SearchDocument.objects.filter(post_id=self.post.pk).exists())
+
+    def test_restore_refuses_to_merge(self):
+        archive = io.BytesIO()
+        backup.export_archive(archive, media=False)
+        archive.seek(0)
+        with self.assertRaises(backup.BackupError):
+            backup.restore_archive(archive)
+
+
+class ImageRenditionTests(TestCase):
+    """Post images get WebP and JPEG renditions used by the responsive markup."""
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(MEDIA_ROOT=media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        buffer = io.BytesIO()
+        Image.new("RGBA", (2000, 1000), (200, 10, 10, 128)).save(buffer, "PNG")
+        author = User.objects.create_user("writer")
+        self.post = Post.objects.create(
+            title="Photo",
+            author=author,
+            content="Body",
+            status="published",
+            image=SimpleUploadedFile("photo.png", buffer.getvalue()),
+        )
+
+    def test_update_renditions(self):
+        self.assertTrue(images.update_renditions(self.post.pk))
+        self.post.refresh_from_db()
+        self.assertEqual(images.dimensions(self.post), (2000, 1000))
+        self.assertEqual(
+            [(item["width"], item["height"]) for item in images.renditions(self.post, "webp")],
+            [(480, 240), (960, 480), (1440, 720)],
+        )
+        self.assertEqual(images.best_rendition(self.post, 1200)["width"], 1440)
+        self.assertFalse(images.update_renditions(self.post.pk))
+
+        response = self.client.get(self.post.get_absolute_url())
+        self.assertContains(response, 'type="image/webp"')
+        self.assertContains(response, "photo-")
+        self.assertContains(response, 'width="2000" height="1000"')
+
+    def test_replaced_image_is_not_current(self):
+        images.update_renditions(self.post.pk)
+        self.post.refresh_from_db()
+        old = images.renditions(self.post, "jpeg")
+        self.post.image = SimpleUploadedFile("other.png", self.post.image.read())
+        self.assertFalse(images.is_current(self.post))
+        self.assertEqual(images.srcset(self.post, "jpeg"), "")
+
+        self.post.save()
+        images.update_renditions(self.post.pk)
+        self.assertFalse(any(images.default_storage.exists(item["name"]) for item in old))
+
+    def test_update_changes_updated_at_and_the_etag(self):
+        cache.clear()
+        before = self.post.updated_at
+        url = self.post.get_absolute_url()
+        etag = self.client.get(url)["ETag"]
+
+        images.update_renditions(self.post.pk)
+
+        self.post.refresh_from_db()
+        self.assertGreater(self.post.updated_at, before)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertContains(response, "srcset")
+
+    def delete_rendition_files(self):
+        for name in images.rendition_names(self.post.image_renditions):
+            default_storage.delete(name)
+
+    def test_backup_carries_the_renditions(self):
+        images.update_renditions(self.post.pk)
+        self.post.refresh_from_db()
+        archive = io.BytesIO()
+        backup.export_archive(archive)
+        self.delete_rendition_files()
+
+        archive.seek(0)
+        counts = backup.restore_archive(archive, replace=True)
+
+        self.assertEqual(counts["renditions"], 0)
+        self.assertTrue(images.has_files(Post.objects.get()))
+
+    def test_restore_forgets_missing_renditions(self):
+        images.update_renditions(self.post.pk)
+        self.post.refresh_from_db()
+        archive = io.BytesIO()
+        backup.export_archive(archive, media=False)
+        self.delete_rendition_files()
+
+        archive.seek(0)
+        with self.captureOnCommitCallbacks() as callbacks:
+            counts = backup.restore_archive(archive, media=False, replace=True)
+
+        self.assertEqual(counts["renditions"], 1)
+        self.assertEqual(Post.objects.get().image_renditions, {})
+        self.assertEqual(len(callbacks), 1)
+
+
+class OpenGraphCardTests(TestCase):
+    """Posts without an image are shared with a generated, cached card."""
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(MEDIA_ROOT=media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        author = User.objects.create_user("writer", first_name="Ada", last_name="Lovelace")
+        self.post = Post.objects.create(title="Card", author=author, content="Body", status="published")
+        self.post.tags.add(Tag.objects.create(name="Django"))
+
+    def test_card_is_served_by_digest(self):
+        response = self.client.get(self.post.get_absolute_url())
+        url = og_cards.card_url(self.post)
+        self.assertContains(response, f"http://testserver{url}")
+
+        response = self.client.get(url)
+        self.assertEqual(response["Content-Type"], "image/png")
+        self.assertIn("immutable", response["Cache-Control"])
+        with Image.open(io.BytesIO(b"".join(response.streaming_content))) as card:
+            self.assertEqual(card.size, og_cards.CARD_SIZE)
+
+        self.post.og_title = "Renamed"
+        self.post.save()
+        self.assertNotEqual(og_cards.card_url(self.post), url)
+        self.assertRedirects(
+            self.client.get(url), og_cards.card_url(self.post), fetch_redirect_response=False
+        )
+
+    def test_generate_cards(self):
+        self.assertEqual(og_cards.generate_cards(), 1)
+        self.assertEqual(og_cards.generate_cards(), 0)
+        inputs = og_cards.card_inputs(self.post)
+        self.assertEqual((inputs["author"], inputs["tags"]), ("Ada Lovelace", ["Django"]))
+
+
+class ResizedMediaTests(TestCase):
+    """/resized/ serves allow-listed copies of media images from a disk cache."""
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.addCleanup(cache_dir.cleanup)
+        self.cache_dir = Path(cache_dir.name)
+        settings = override_settings(
+            MEDIA_ROOT=media.name,
+            BLOG_MEDIA_RESIZE={"CACHE_DIR": self.cache_dir, "MAX_BYTES": 10 * 1024 * 1024},
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        buffer = io.BytesIO()
+        Image.new("RGB", (2000, 1000), "teal").save(buffer, "JPEG")
+        default_storage.save("uploads/photo.jpg", ContentFile(buffer.getvalue()))
+        self.url = media_resize.resized_url("uploads/photo.jpg", 480, "webp")
+
+    def test_resize_and_revalidate(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response["Content-Type"], "image/webp")
+        with Image.open(io.BytesIO(b"".join(response.streaming_content))) as image:
+            self.assertEqual(image.size, (480, 240))
+        self.assertEqual(len(list(self.cache_dir.glob("*/*/*.webp"))), 1)
+
+        response = self.client.get(self.url, headers={"if-none-match": response["ETag"]})
+        self.assertEqual(response.status_code, 304)
+
+    def test_allow_list(self):
+        for query in ("w=500", "w=480&q=100", "w=480&fm=gif", "w="):
+            response = self.client.get(f"/resized/uploads/photo.jpg?{query}")
+            self.assertEqual(response.status_code, 400, query)
+        self.assertEqual(self.client.get("/resized/uploads/missing.jpg?w=480").status_code, 404)
+
+    def test_body_images_use_resized_copies(self):
+        author = User.objects.create_user("writer")
+        post = Post.objects.create(
+            title="Embeds",
+            author=author,
+            content="![Photo](/media/uploads/photo.jpg)",
+            status="published",
+        )
+        response = self.client.get(post.get_absolute_url())
+        self.assertContains(response, 'src="/resized/uploads/photo.jpg?w=960"')
+        self.assertContains(response, "/resized/uploads/photo.jpg?w=480 480w")
+
+    def test_eviction_drops_least_recently_used(self):
+        cache = media_resize.DiskCache(self.cache_dir, max_bytes=1000)
+        for index, key in enumerate(["a" * 32, "b" * 32, "c" * 32]):
+            cache.put(key, "jpg", b"x" * 100)
+            os.utime(cache.path(key, "jpg"), (index, index))
+        cache.max_bytes = 250
+        self.assertEqual(cache.sweep(), 1)
+        self.assertIsNone(cache.open("a" * 32, "jpg"))
+        cache.open("b" * 32, "jpg").close()
+
+
+class AssetBundleTests(TestCase):
+    """CSS bundles are minified, hashed, precompressed and linked from the manifest."""
+
+    def setUp(self):
+        static_root = tempfile.TemporaryDirectory()
+        self.addCleanup(static_root.cleanup)
+        self.static_root = Path(static_root.name)
+        settings = override_settings(STATIC_ROOT=self.static_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_minify_css(self):
+        css = '/* note */\na :hover , b > c {\n  color: red;\n  content: "x ;} y";\n}\n'
+        self.assertEqual(assets.minify_css(css), 'a :hover,b>c{color:red;content:"x ;} y"}\n')
+
+    def test_build_and_link(self):
+        response = self.client.get("/")
+        self.assertContains(response, "/static/css/theme.css")
+
+        manifest = assets.build_bundles()
+        name = manifest["css/site.css"]
+        self.assertRegex(name, r"^css/site\.[0-9a-f]{12}\.css$")
+        content = (self.static_root / name).read_bytes()
+        self.assertEqual(gzip.decompress((self.static_root / f"{name}.gz").read_bytes()), content)
+        self.assertIn(b".highlight .k{", content)
+
+        cache.clear()  # The home page was stored by the page cache
+        response = self.client.get("/")
+        self.assertContains(response, f'<link rel="stylesheet" href="/static/{name}">')
+        self.assertNotContains(response, "/static/css/theme.css")
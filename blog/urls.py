@@ -3,6 +3,7 @@ from django.urls import path
 from django.utils.feedgenerator import Atom1Feed
 
 from . import views
+from .conditional import conditional
 from .models import Post
 
 app_name = "blog"
@@ -39,6 +40,11 @@ class AtomLatestPostsFeed(LatestPostsFeed):
     subtitle = LatestPostsFeed.description
 
 
+conditional_feed = conditional(
+    lambda request: ("feed", views.published_posts()), html=False
+)
+
+
 urlpatterns = [
     # Home page
     path("", views.home, name="home"),
@@ -46,6 +52,10 @@ urlpatterns = [
     path("post/<slug:slug>/", views.post_detail, name="post_detail"),
     # Share post
     path("post/<int:pk>/share/", views.share_post, name="share_post"),
+    # Open Graph card of a post without an image
+    path("post/<int:pk>/card/<str:digest>.png", views.og_card, name="og_card"),
+    # Media images resized on request
+    path("resized/<path:name>", views.resized_media, name="resized_media"),
     # Category posts
     path("category/<slug:slug>/", views.category_posts, name="category_posts"),
     # Tag posts
@@ -55,9 +65,9 @@ urlpatterns = [
     path("archive/<int:year>/<int:month>/", views.archive_posts, name="month_archive"),
     # Search posts
     path("search/", views.search_posts, name="search_posts"),
-    # RSS and Atom feeds
-    path("feed/rss/", LatestPostsFeed(), name="rss_feed"),
-    path("feed/atom/", AtomLatestPostsFeed(), name="atom_feed"),
+    # RSS and Atom feeds, answering conditional GETs from feed readers with a 304
+    path("feed/rss/", conditional_feed(LatestPostsFeed()), name="rss_feed"),
+    path("feed/atom/", conditional_feed(AtomLatestPostsFeed()), name="atom_feed"),
     # About page
     path("about/", views.about_me, name="about_me"),
     # ReactPy demo
@@ -2,73 +2,91 @@ import datetime
 
 # import markdown
 # from django.contrib.admin.views.decorators import staff_member_required
+from django.conf import settings
 from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
-from django.db.models import Q
 from django.contrib import messages
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponseBadRequest
+from django.utils.cache import get_conditional_response, patch_cache_control
 
 # from django.db.models import Count
 # from django.http import HttpResponse
 from django.shortcuts import get_object_or_404, render, redirect
+from PIL import Image, UnidentifiedImageError
 
 # from django.views.decorators.csrf import csrf_protect
-from social_sharing.sharing import share_to_mastodon, share_to_bluesky
+from social_sharing.jobs import enqueue_share
+from social_sharing.sharing import PLATFORMS, configured_platforms
 
+from . import media_resize, og_cards, page_cache
+from .conditional import conditional
 from .models import Category, Post, Tag
+from .pagination import STATIC_EXPORT_ENVIRON, KeysetPaginator
+from .search import ranked_posts, search_post_ids
+from .sidebar import sidebar_context
 
 
-def get_common_context():
+def get_common_context(request):
     """Helper function to get common context data for all views."""
-    categories = Category.objects.all()
-    tags = Tag.objects.all()
-
-    # Get archive dates (years and months with posts)
-    published_dates = Post.objects.filter(status="published").dates(
-        "published_date",
-        "month",
-        order="DESC",
+    # Categories, tags and archive dates come lazily from the cached sidebar data
+    return sidebar_context(request)
+
+
+def published_post_list():
+    """
+    Published posts with everything a post card needs.
+
+    The markdown body and its rendered HTML are deferred: cards only show the
+    stored summary and reading time.
+    """
+    return (
+        Post.objects.filter(status="published")
+        .select_related("author")
+        .prefetch_related("categories", "tags")
+        .defer("content", "content_html")
     )
 
-    archive_dates = []
-    years_dict = {}
 
-    for date in published_dates:
-        year = date.year
-        month = date.month
+def published_posts(**filters):
+    """Bare queryset of published posts, used to compute conditional GET validators."""
+    return Post.objects.filter(status="published", **filters)
+
 
-        if year not in years_dict:
-            years_dict[year] = {"year": year, "months": []}
+POSTS_PER_PAGE = 5
 
-        if month not in years_dict[year]["months"]:
-            years_dict[year]["months"].append(month)
 
-    for year, data in sorted(years_dict.items(), reverse=True):
-        archive_dates.append(
-            {"year": year, "months": sorted(data["months"], reverse=True)},
-        )
+def paginate_posts(request, posts):
+    """
+    Paginate a listing of published posts, newest first.
 
-    return {"categories": categories, "tags": tags, "archive_dates": archive_dates}
+    With ``BLOG_KEYSET_PAGINATION`` enabled, pages are addressed by an opaque
+    ``?cursor=`` and cost the same at any depth; otherwise by ``?page=``.
+    The static exporter always gets page numbers.
+    """
+    keyset = getattr(settings, "BLOG_KEYSET_PAGINATION", False)
+    if keyset and not request.META.get(STATIC_EXPORT_ENVIRON):
+        return KeysetPaginator(posts, POSTS_PER_PAGE).page(request.GET.get("cursor"))
 
+    paginator = Paginator(posts.order_by("-published_date", "-id"), POSTS_PER_PAGE)
+    page = request.GET.get("page")
 
+    try:
+        return paginator.page(page)
+    except PageNotAnInteger:
+        return paginator.page(1)
+    except EmptyPage:
+        return paginator.page(paginator.num_pages)
+
+
+@conditional(lambda request: ("home", published_posts()))
 def home(request):
     """Home page view that displays a list of recent published posts."""
     """Home page view that displays a list of recent published posts."""
     # Fetch and paginate the data. Use prefetch/select_related for efficiency.
-    post_list = (
-        Post.objects.filter(status="published")
-        .select_related("author")
-        .prefetch_related("categories", "tags")
-        .order_by("-published_date")
-    )
-    paginator = Paginator(post_list, 5)  # Show 5 posts per page
-    page_number = request.GET.get("page")
+    page_obj = paginate_posts(request, published_post_list())
+    page_cache.depends_on(request, page_cache.LISTING)
 
-    # Use get_page() which handles invalid page numbers gracefully
-    try:
-        page_obj = paginator.get_page(page_number)
-    except (EmptyPage, PageNotAnInteger):
-        page_obj = paginator.get_page(1)
-
-    context = get_common_context()
+    context = get_common_context(request)
     context.update(
         {
             "posts": page_obj,
@@ -84,72 +102,69 @@ def home(request):
     return render(request, "blog/home.html", context)
 
 
+@conditional(lambda request, slug: (f"post:{slug}", published_posts(slug=slug)))
 def post_detail(request, slug):
     """View for displaying a single post."""
     post = get_object_or_404(Post, slug=slug, status="published")
+    page_cache.depends_on(request, page_cache.post_dependency(post.pk))
 
     # Get common context data
-    context = get_common_context()
+    context = get_common_context(request)
     context["post"] = post
 
     return render(request, "blog/post_detail.html", context)
 
 
+@conditional(
+    lambda request, slug: (f"category:{slug}", published_posts(categories__slug=slug))
+)
 def category_posts(request, slug):
     """View for displaying posts in a specific category."""
     category = get_object_or_404(Category, slug=slug)
-    posts = Post.objects.filter(categories=category, status="published").order_by(
-        "-published_date",
-    )
+    page_cache.depends_on(request, page_cache.category_dependency(category.pk))
+    posts = published_post_list().filter(categories=category)
 
     # Pagination
-    paginator = Paginator(posts, 5)  # Show 5 posts per page
-    page = request.GET.get("page")
-
-    try:
-        posts = paginator.page(page)
-    except PageNotAnInteger:
-        posts = paginator.page(1)
-    except EmptyPage:
-        posts = paginator.page(paginator.num_pages)
+    posts = paginate_posts(request, posts)
 
     # Get common context data
-    context = get_common_context()
+    context = get_common_context(request)
     context["category"] = category
     context["posts"] = posts
 
     return render(request, "blog/category_posts.html", context)
 
 
+@conditional(lambda request, slug: (f"tag:{slug}", published_posts(tags__slug=slug)))
 def tag_posts(request, slug):
     """View for displaying posts with a specific tag."""
     tag = get_object_or_404(Tag, slug=slug)
-    posts = Post.objects.filter(tags=tag, status="published").order_by(
-        "-published_date",
-    )
+    page_cache.depends_on(request, page_cache.tag_dependency(tag.pk))
+    posts = published_post_list().filter(tags=tag)
 
     # Pagination
-    paginator = Paginator(posts, 5)  # Show 5 posts per page
-    page = request.GET.get("page")
-
-    try:
-        posts = paginator.page(page)
-    except PageNotAnInteger:
-        posts = paginator.page(1)
-    except EmptyPage:
-        posts = paginator.page(paginator.num_pages)
+    posts = paginate_posts(request, posts)
 
     # Get common context data
-    context = get_common_context()
+    context = get_common_context(request)
     context["tag"] = tag
     context["posts"] = posts
 
     return render(request, "blog/tag_posts.html", context)
 
 
+def archive_state(request, year, month=None):
+    filters = {"published_date__year": year}
+    if month:
+        filters["published_date__month"] = month
+    return f"archive:{year}-{month}", published_posts(**filters)
+
+
+@conditional(archive_state)
 def archive_posts(request, year, month=None):
     """View for displaying posts from a specific year and month."""
-    posts = Post.objects.filter(status="published")
+    posts = published_post_list()
+    page_cache.depends_on(request, page_cache.archive_dependency(year, month))
 
     if year:
         posts = posts.filter(published_date__year=year)
@@ -157,18 +172,8 @@ def archive_posts(request, year, month=None):
     if month:
         posts = posts.filter(published_date__month=month)
 
-    posts = posts.order_by("-published_date")
-
     # Pagination
-    paginator = Paginator(posts, 5)  # Show 5 posts per page
-    page = request.GET.get("page")
-
-    try:
-        posts = paginator.page(page)
-    except PageNotAnInteger:
-        posts = paginator.page(1)
-    except EmptyPage:
-        posts = paginator.page(paginator.num_pages)
+    posts = paginate_posts(request, posts)
 
     # Construct the title in the view
     if month is not None:
@@ -179,7 +184,7 @@ def archive_posts(request, year, month=None):
         title = f"Archive:  Posts from {year}"
 
     # Get common context data
-    context = get_common_context()
+    context = get_common_context(request)
     context.update(
         {
             "year": year,
@@ -196,25 +201,12 @@ def archive_posts(request, year, month=None):
 def search_posts(request):
     """View for searching posts by title, content, categories, and tags."""
     query = request.GET.get("q", "").strip()
-    posts = Post.objects.filter(status="published")
-
-    if query:
-        # Search in post title, content, categories, and tags
-        posts = (
-            posts.filter(
-                Q(title__icontains=query)
-                | Q(content__icontains=query)
-                | Q(categories__name__icontains=query)
-                | Q(tags__name__icontains=query)
-            )
-            .distinct()
-            .order_by("-published_date")
-        )
-    else:
-        posts = posts.none()  # Return empty queryset if no query
 
-    # Pagination
-    paginator = Paginator(posts, 5)  # Show 5 posts per page
+    # Rank matching posts with the search index; an empty query matches nothing
+    post_ids = search_post_ids(query) if query else []
+
+    # Paginate the ranked ids, then load only the posts shown on this page
+    paginator = Paginator(post_ids, POSTS_PER_PAGE)
     page = request.GET.get("page")
 
     try:
@@ -224,8 +216,10 @@ def search_posts(request):
     except EmptyPage:
         posts = paginator.page(paginator.num_pages)
 
+    posts.object_list = ranked_posts(published_post_list(), posts.object_list)
+
     # Get common context data
-    context = get_common_context()
+    context = get_common_context(request)
     context.update(
         {
             "query": query,
@@ -238,29 +232,97 @@ def search_posts(request):
     return render(request, "blog/search_posts.html", context)
 
 
+OG_CARD_MAX_AGE = 60 * 60 * 24 * 365  # One year
+
+
+def og_card(request, pk, digest):
+    """
+    Open Graph card of a published post.
+
+    The digest in the URL changes with the card, so responses are cached
+    for good; an outdated digest redirects to the current card.
+    """
+    post = get_object_or_404(og_cards.card_posts(), pk=pk)
+    inputs = og_cards.card_inputs(post)
+    current = og_cards.card_digest(inputs)
+    if digest != current:
+        return redirect("blog:og_card", pk=pk, digest=current)
+
+    name = og_cards.ensure_card(post.pk, inputs)
+    response = FileResponse(default_storage.open(name, "rb"), content_type="image/png")
+    patch_cache_control(response, public=True, max_age=OG_CARD_MAX_AGE, immutable=True)
+    return response
+
+
+RESIZED_MEDIA_MAX_AGE = 60 * 60 * 24  # One day
+
+
+def resized_media(request, name):
+    """
+    A media image scaled to ``?w=``, optionally converted (``fm``) and recompressed (``q``).
+
+    Copies are drawn on the first request and then served from the disk
+    cache; the ETag follows the source file, so clients revalidate cheaply.
+    """
+    try:
+        width, format, quality = media_resize.parse_options(name, request.GET)
+        key = media_resize.variant_key(name, width, format, quality)
+    except media_resize.ResizeError as error:
+        return HttpResponseBadRequest(str(error))
+    except FileNotFoundError:
+        raise Http404("No such media file.") from None
+
+    etag = f'"{key}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        try:
+            file = media_resize.open_variant(name, key, width, format, quality)
+        except (UnidentifiedImageError, Image.DecompressionBombError):
+            return HttpResponseBadRequest("Not an image.")
+        response = FileResponse(file, content_type=media_resize.content_type(format))
+        response["ETag"] = etag
+    patch_cache_control(response, public=True, max_age=RESIZED_MEDIA_MAX_AGE)
+    return response
+
+
 # Share post view:  Mastodon and Bluesky
 def share_post(request, pk):
+    """
+    Queue sharing a post; an HTMX GET returns the share form instead.
+
+    Post pages load the form separately, so the CSRF token it carries never
+    ends up in a cached page.
+    """
     post = get_object_or_404(Post, pk=pk)
     # post = get_object_or_404(Post, slug=slug, status="published")
     post_url = request.build_absolute_uri(post.get_absolute_url())
+    share_jobs = []
+
+    if request.method == "GET" and request.htmx:
+        return render(request, "blog/partials/share_form.html", {"post": post})
 
     if request.method == "POST":
-        if "mastodon" in request.POST:
-            result = share_to_mastodon(post.title, post_url)
-            messages.success(request, result)
-        elif "bluesky" in request.POST:
-            result = share_to_bluesky(post.title, post_url)
-            messages.success(request, result)
+        if "everywhere" in request.POST:
+            platforms = [platform.key for platform in configured_platforms()]
         else:
+            platforms = [key for key in PLATFORMS if key in request.POST][:1]
+        if not platforms:
             # Handle the unlikely case that the form was submitted without a known button.
             messages.error(request, "Could not determine the sharing platform.")
             # Fallback to a full redirect even for HTMX requests on error.
             return redirect("blog:post_detail", slug=post.slug)
 
+        # Posting happens in the share worker, to all platforms at once;
+        # the jobs report back when done
+        share_jobs = [enqueue_share(post, platform, post_url) for platform in platforms]
+        if not request.htmx:
+            for job in share_jobs:
+                messages.info(request, f"Sharing to {job.get_platform_display()} has been queued.")
+
     # Check if the request is from HTMX
     if request.htmx:
-        # If yes, return just the messages partial
-        return render(request, "blog/partials/messages.html")
+        # If yes, return just the messages partial, which polls the jobs' status
+        return render(request, "blog/partials/messages.html", {"share_jobs": share_jobs})
 
     # For non-HTMX requests, fall back to the old behavior
     return redirect("blog:post_detail", slug=post.slug)
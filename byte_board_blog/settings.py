@@ -61,6 +61,7 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "django_htmx.middleware.HtmxMiddleware",
+    "blog.middleware.AnonymousPageCacheMiddleware",
 ]
 
 ROOT_URLCONF = "byte_board_blog.urls"
@@ -118,6 +119,93 @@ else:
     }
 
 
+# Cache shared by every process serving the site
+# The page cache, sidebar data and conditional GET state keep version numbers
+# in the default cache, and a change bumps them in the process that saved it.
+# A per-process cache such as LocMemCache would let the other workers keep
+# serving purged pages, so the page cache refuses it (check blog.E001). Set
+# REDIS_URL to use Redis (needs the ``redis`` package); otherwise the database
+# cache is used, whose table ``manage.py createcachetable`` creates.
+if os.environ.get("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["REDIS_URL"],
+        },
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+            "LOCATION": "blog_cache",
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        },
+    }
+
+
+# Search backend (blog.search.backends)
+# None follows the database: PostgreSQL full-text search in production,
+# SQLite FTS5 in development. Set a dotted path to force a backend, e.g.
+# "blog.search.backends.inverted.InvertedIndexBackend".
+BLOG_SEARCH_BACKEND = None
+
+
+# Keyset pagination for post listings and /api/posts/
+# When enabled, pages are addressed by opaque ?cursor= values ordered on
+# (published_date, id) instead of ?page= numbers, so no COUNT(*) or OFFSET.
+BLOG_KEYSET_PAGINATION = False
+
+
+# Full-page cache for anonymous visitors (blog.middleware.AnonymousPageCacheMiddleware)
+# Cached pages are invalidated by model signals as soon as a post, category, tag
+# or archive month they show changes; TIMEOUT only bounds how long they are kept.
+# Needs the shared CACHES above: it is refused with a per-process cache unless
+# DEBUG is on.
+BLOG_PAGE_CACHE = {
+    "ENABLED": True,
+    "TIMEOUT": 60 * 60,  # One hour
+}
+
+
+# Static mirror of the blog (blog.static_export, manage.py export_static)
+# With ROOT set, saving, publishing or retagging posts marks the mirror out of
+# date, and ``manage.py export_static --watch``, run next to the web server,
+# re-renders the affected pages. Other pages keep a stale sidebar until the
+# next plain ``export_static`` run.
+BLOG_STATIC_EXPORT = {
+    "ROOT": None,
+    "BASE_URL": "http://localhost:8000",
+}
+
+
+# Markdown render cache (blog.rendering.renderer)
+# Rendered HTML is cached by a hash of the source and extension config in a
+# per-process LRU capped at MAX_BYTES, backed by the CACHE_ALIAS cache.
+MARKDOWN_RENDER_CACHE = {
+    "CACHE_ALIAS": "default",
+    "MAX_BYTES": 8 * 1024 * 1024,
+    "TIMEOUT": 60 * 60 * 24 * 7,  # One week
+}
+
+
+# Open Graph cards (blog.og_cards, manage.py generate_og_cards)
+# Posts without an image are shared with a generated 1200x630 PNG of their
+# title, author and tags. FONT is the path of a TrueType font for the text;
+# None uses the font bundled with Pillow.
+BLOG_OG_CARDS = {
+    "FONT": None,
+}
+
+
+# Media images resized on request (blog.media_resize, /resized/<name>?w=)
+# Copies are kept in a sharded tree under CACHE_DIR; once it outgrows
+# MAX_BYTES, the least recently served copies are deleted.
+BLOG_MEDIA_RESIZE = {
+    "CACHE_DIR": BASE_DIR / "media_cache",
+    "MAX_BYTES": 512 * 1024 * 1024,
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -158,6 +246,17 @@ STATICFILES_DIRS = [
     BASE_DIR / "static",
 ]
 
+# collectstatic also builds the CSS bundles of blog.assets, with hashed names
+# and .gz/.br siblings, and the assets.json manifest the templates read.
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "blog.assets.BundlingStaticFilesStorage",
+    },
+}
+
 # Media files (User uploaded files)
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
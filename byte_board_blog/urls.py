@@ -24,12 +24,19 @@ from django.contrib.sitemaps.views import sitemap
 from django.urls import include, path
 
 from blog.admin import blog_admin_site
+from blog.conditional import conditional
+from blog.views import published_posts
 from blog.sitemap import CategorySitemap, PostSitemap, StaticSitemap, TagSitemap
 
 # from blog.views import markdown_preview
 from django.views.generic.base import TemplateView
 
 
+# Sitemaps answer conditional GETs from crawlers with a 304
+conditional_sitemap = conditional(
+    lambda request, **kwargs: ("sitemap", published_posts()), html=False
+)(sitemap)
+
 # Define the sitemaps dictionary
 sitemaps = {
     "posts": PostSitemap,
@@ -43,18 +50,19 @@ urlpatterns = [
     # path("admin/blog/post/preview/", markdown_preview, name="markdown_preview"),
     path("", include("blog.urls")),  # Include the blog app URLs
     path("api/", include("blog.api_urls")),  # Include the blog app API URLs
+    path("share/", include("social_sharing.urls")),  # Share job status
     # path("reactpy/", include("reactpy_django.http.urls")),
     path("my-blog-admin/", blog_admin_site.urls, name="my-blog-admin"),
     # Sitemap URLs
     path(
         "sitemap.xml",
-        sitemap,
+        conditional_sitemap,
         {"sitemaps": sitemaps},
         name="django.contrib.sitemaps.views.sitemap",
     ),
     path(
         "sitemap-<section>.xml",
-        sitemap,
+        conditional_sitemap,
         {"sitemaps": sitemaps},
         name="django.contrib.sitemaps.views.sitemap",
     ),
@@ -1,3 +1,11 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import ShareJob
+
+
+@admin.register(ShareJob)
+class ShareJobAdmin(admin.ModelAdmin):
+    list_display = ("post", "platform", "status", "attempts", "next_attempt_at", "updated_at")
+    list_filter = ("status", "platform")
+    raw_id_fields = ("post",)
+    readonly_fields = ("attempts", "locked_at", "result", "created_at", "updated_at")
@@ -0,0 +1,106 @@
+"""
+Long-lived, authenticated API clients for the sharing platforms.
+
+Building a ``Mastodon`` or ``atproto.Client`` for every share costs a new
+TLS connection and, for Bluesky, a ``createSession`` login, which the
+server rate limits per account. The pool keeps one client per account for
+the life of the process, so connections are reused. atproto refreshes a
+Bluesky session only when its access token is about to expire. The session
+is also kept in the Django cache, so a new worker process resumes it
+instead of logging in again.
+"""
+
+import threading
+
+import requests
+from atproto import Client
+from atproto_client.request import Request
+from django.core.cache import cache
+from mastodon import Mastodon
+
+BLUESKY_SESSION_KEY = "social_sharing:bluesky:session:{base_url}:{handle}"
+# Seconds per HTTP request. Kept below ``Platform.timeout`` so a slow request
+# fails in the client, where the share is known not to be complete, before
+# the share itself is abandoned with its outcome unknown.
+REQUEST_TIMEOUT = 15
+
+
+class ClientPool:
+    """Authenticated clients keyed by platform, server and account."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients = {}
+        # Held while logging in to one account, so others are not kept waiting
+        self._login_locks = {}
+        self._http = requests.Session()
+
+    def mastodon(self, api_base_url, access_token, client_id=None, client_secret=None):
+        """The Mastodon client for an account, sharing one HTTP connection pool."""
+        key = ("mastodon", api_base_url, access_token)
+        with self._lock:
+            if key not in self._clients:
+                self._clients[key] = Mastodon(
+                    client_id=client_id,
+                    client_secret=client_secret,
+                    access_token=access_token,
+                    api_base_url=api_base_url,
+                    session=self._http,
+                    request_timeout=REQUEST_TIMEOUT,
+                    # Let the share job retry later instead of sleeping in the worker
+                    ratelimit_method="throw",
+                )
+            return self._clients[key]
+
+    def bluesky(self, handle, password, base_url=None):
+        """The logged-in Bluesky client for an account, resuming a stored session."""
+        key = ("bluesky", base_url, handle)
+        with self._lock:
+            client = self._clients.get(key)
+            login_lock = self._login_locks.setdefault(key, threading.Lock())
+        if client is not None:
+            return client
+
+        # Logging in is a network call: only shares to this account wait for it
+        with login_lock:
+            with self._lock:
+                client = self._clients.get(key)
+            if client is None:
+                client = self._login_bluesky(handle, password, base_url)
+                with self._lock:
+                    self._clients[key] = client
+        return client
+
+    def _login_bluesky(self, handle, password, base_url):
+        session_key = BLUESKY_SESSION_KEY.format(base_url=base_url or "", handle=handle)
+        client = Client(base_url, request=Request(timeout=REQUEST_TIMEOUT))
+
+        session_string = cache.get(session_key)
+        if session_string:
+            client.login(session_string=session_string, fetch_bsky_profile=False)
+        else:
+            client.login(handle, password, fetch_bsky_profile=False)
+            cache.set(session_key, client.export_session_string(), None)
+
+        # Keep the stored session current when atproto refreshes the tokens
+        client.on_session_change(
+            lambda event, session: cache.set(session_key, session.export(), None)
+        )
+        return client
+
+    def discard(self, platform, *account):
+        """
+        Forget a client whose credentials were rejected.
+
+        ``account`` is the server and account the client was created for:
+        ``(api_base_url, access_token)`` for Mastodon and ``(base_url, handle)``
+        for Bluesky. The next share creates a new client and logs in again.
+        """
+        with self._lock:
+            self._clients.pop((platform, *account), None)
+        if platform == "bluesky":
+            base_url, handle = account
+            cache.delete(BLUESKY_SESSION_KEY.format(base_url=base_url or "", handle=handle))
+
+
+pool = ClientPool()
@@ -0,0 +1,124 @@
+"""
+Database-backed queue of social sharing jobs.
+
+Views enqueue a ``ShareJob`` and return at once; ``manage.py share_worker``
+claims due jobs and posts them concurrently. Failed attempts are retried
+with exponential backoff until ``MAX_ATTEMPTS`` is reached. An attempt that
+timed out after its request was sent may have posted, so it is failed at
+once rather than retried; sharing the post again re-queues it.
+"""
+
+import asyncio
+import logging
+from datetime import timedelta
+
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ShareJob
+from .sharing import PLATFORMS, share_on
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 5
+# Jobs claimed and posted concurrently per round
+BATCH_SIZE = 10
+BACKOFF_BASE = timedelta(seconds=30)
+BACKOFF_MAX = timedelta(hours=1)
+# A job still running after this long belongs to a worker that died.
+STALE_AFTER = timedelta(minutes=10)
+
+
+def enqueue_share(post, platform, post_url):
+    """
+    Queue sharing ``post`` to ``platform`` and return its job.
+
+    Idempotent per (post, platform): a pending, running or succeeded job is
+    returned unchanged. A failed job is queued again.
+    """
+    job, created = ShareJob.objects.get_or_create(
+        post=post, platform=platform, defaults={"post_url": post_url}
+    )
+    if not created and job.status == ShareJob.Status.FAILED:
+        job.status = ShareJob.Status.PENDING
+        job.post_url = post_url
+        job.attempts = 0
+        job.next_attempt_at = timezone.now()
+        job.result = ""
+        job.save()
+    return job
+
+
+def backoff(attempts):
+    """Delay before the next try after ``attempts`` failed attempts."""
+    return min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+
+
+def requeue_stale_jobs():
+    """Put jobs abandoned by a crashed worker back in the queue."""
+    return ShareJob.objects.filter(
+        status=ShareJob.Status.RUNNING, locked_at__lt=timezone.now() - STALE_AFTER
+    ).update(status=ShareJob.Status.PENDING, locked_at=None)
+
+
+def claim_due_jobs(limit=BATCH_SIZE):
+    """
+    Claim up to ``limit`` due jobs for this worker.
+
+    Each claim is a conditional UPDATE, so concurrent workers never run the
+    same job, on any database.
+    """
+    now = timezone.now()
+    due = ShareJob.objects.filter(status=ShareJob.Status.PENDING, next_attempt_at__lte=now)
+    claimed = []
+    for job_id in due.order_by("next_attempt_at").values_list("pk", flat=True)[:limit]:
+        if ShareJob.objects.filter(pk=job_id, status=ShareJob.Status.PENDING).update(
+            status=ShareJob.Status.RUNNING, locked_at=now, attempts=F("attempts") + 1
+        ):
+            claimed.append(job_id)
+    return list(ShareJob.objects.select_related("post").filter(pk__in=claimed))
+
+
+async def share_jobs(jobs):
+    """Post claimed jobs to their platforms concurrently; returns their ShareResults."""
+    return await asyncio.gather(
+        *(share_on(PLATFORMS[job.platform], job.post.title, job.post_url) for job in jobs)
+    )
+
+
+def record_result(job, result):
+    """Store the outcome of a job's attempt, scheduling a retry after a failure."""
+    if result.ok:
+        job.status = ShareJob.Status.SUCCEEDED
+    else:
+        logger.warning("Sharing post %s to %s failed: %s", job.post_id, job.platform, result.error)
+        if job.attempts >= MAX_ATTEMPTS or result.unknown:
+            job.status = ShareJob.Status.FAILED
+        else:
+            job.status = ShareJob.Status.PENDING
+            job.next_attempt_at = timezone.now() + backoff(job.attempts)
+
+    job.result = result.message
+    job.locked_at = None
+    job.save(update_fields=["status", "result", "next_attempt_at", "locked_at", "updated_at"])
+    return job
+
+
+def process_jobs(limit=None):
+    """
+    Run due jobs until none are left (or ``limit`` ran); returns how many ran.
+
+    Jobs are claimed in batches and each batch is posted concurrently, so
+    sharing to every platform takes about as long as the slowest one.
+    """
+    requeue_stale_jobs()
+    count = 0
+    while limit is None or count < limit:
+        batch_size = BATCH_SIZE if limit is None else min(BATCH_SIZE, limit - count)
+        jobs = claim_due_jobs(batch_size)
+        if not jobs:
+            break
+        for job, result in zip(jobs, asyncio.run(share_jobs(jobs))):
+            record_result(job, result)
+        count += len(jobs)
+    return count
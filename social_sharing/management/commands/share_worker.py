@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from social_sharing.jobs import process_jobs
+
+
+class Command(BaseCommand):
+    help = "Process queued social sharing jobs, retrying failures with backoff."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Process the jobs that are due and exit instead of polling.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=2.0,
+            help="Seconds to wait between polls when the queue is empty.",
+        )
+
+    def handle(self, *args, **options):
+        if options["once"]:
+            count = process_jobs()
+            self.stdout.write(self.style.SUCCESS(f"Processed {count} share jobs."))
+            return
+
+        self.stdout.write("Waiting for share jobs. Press Ctrl+C to stop.")
+        try:
+            while True:
+                close_old_connections()
+                if process_jobs():
+                    continue
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            self.stdout.write("Stopped.")
@@ -1,3 +1,72 @@
+from typing import ClassVar
+
+from django.core import signing
 from django.db import models
+from django.utils import timezone
+
+from .sharing import PLATFORMS
+
+
+# Salt of the signed job ids in status URLs
+STATUS_TOKEN_SALT = "social_sharing.share_job_status"
+
+
+class ShareJob(models.Model):
+    """
+    A queued share of a blog post to one platform.
+
+    Jobs are processed by ``manage.py share_worker`` (see
+    ``social_sharing.jobs``). There is at most one job per post and platform,
+    so sharing the same post twice never posts it twice.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        RUNNING = "running", "Running"
+        SUCCEEDED = "succeeded", "Succeeded"
+        FAILED = "failed", "Failed"
+
+    PLATFORM_CHOICES: ClassVar = [(key, platform.name) for key, platform in PLATFORMS.items()]
+
+    post = models.ForeignKey("blog.Post", on_delete=models.CASCADE, related_name="share_jobs")
+    platform = models.CharField(max_length=20, choices=PLATFORM_CHOICES)
+    post_url = models.URLField(max_length=500)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    result = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering: ClassVar = ["-created_at"]
+        constraints: ClassVar = [
+            models.UniqueConstraint(
+                fields=["post", "platform"],
+                name="social_sharing_sharejob_unique_post_platform",
+            ),
+        ]
+        indexes: ClassVar = [
+            models.Index(
+                fields=["status", "next_attempt_at"],
+                name="social_shar_status_next_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_platform_display()} share of post {self.post_id} ({self.status})"
+
+    @property
+    def status_token(self):
+        """Signed id in the status URL, so only whoever queued the job can poll it."""
+        return signing.dumps(self.pk, salt=STATUS_TOKEN_SALT)
+
+    @classmethod
+    def from_status_token(cls, token):
+        """The id signed in ``token``; raises ``signing.BadSignature``."""
+        return signing.loads(token, salt=STATUS_TOKEN_SALT)
 
-# Create your models here.
+    @property
+    def is_finished(self):
+        return self.status in (self.Status.SUCCEEDED, self.Status.FAILED)
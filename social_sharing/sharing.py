@@ -1,25 +1,217 @@
 # social_sharing/sharing.py
 
+import asyncio
 import os
-from mastodon import Mastodon
-from atproto import Client
+import time
+from concurrent.futures import ThreadPoolExecutor
 
+import httpx
+import requests
+from atproto_client.exceptions import BadRequestError, LoginRequiredError, UnauthorizedError
+from mastodon.errors import MastodonUnauthorizedError
 
-def share_to_mastodon(post_title, post_url):
+from .clients import pool
+
+
+def share_message(post_title, post_url):
+    """The text shared for a blog post on every platform."""
+    # Craft your toot/skeet. You can customize this message.
+    return f"New blog post: {post_title}\n\nRead more here: {post_url}"
+
+
+def post_to_mastodon(post_title, post_url):
+    """
+    Posts a blog post to Mastodon. Raises on failure.
+    """
+    api_base_url = os.environ.get("MASTODON_API_BASE_URL")
+    access_token = os.environ.get("MASTODON_ACCESS_TOKEN")
+    mastodon = pool.mastodon(
+        api_base_url,
+        access_token,
+        client_id=os.environ.get("MASTODON_CLIENT_ID"),
+        client_secret=os.environ.get("MASTODON_CLIENT_SECRET"),
+    )
+    try:
+        mastodon.status_post(share_message(post_title, post_url))
+    except MastodonUnauthorizedError:
+        pool.discard("mastodon", api_base_url, access_token)
+        raise
+
+
+def post_to_bluesky(post_title, post_url):
     """
-    Shares a blog post to Mastodon.
+    Posts a blog post to BlueSky. Raises on failure.
     """
+    base_url = os.environ.get("BLUESKY_BASE_URL")  # None for bsky.social
+    handle = os.environ.get("BLUESKY_HANDLE")
+    client = pool.bluesky(handle, os.environ.get("BLUESKY_APP_PASSWORD"), base_url)
     try:
-        mastodon = Mastodon(
-            client_id=os.environ.get("MASTODON_CLIENT_ID"),
-            client_secret=os.environ.get("MASTODON_CLIENT_SECRET"),
-            access_token=os.environ.get("MASTODON_ACCESS_TOKEN"),
-            api_base_url=os.environ.get("MASTODON_API_BASE_URL"),
+        # Name the repo explicitly: the pooled client skips fetching the profile
+        client.send_post(text=share_message(post_title, post_url), profile_identify=handle)
+    except (BadRequestError, LoginRequiredError, UnauthorizedError):
+        # Most likely an expired or revoked session: log in afresh next time
+        pool.discard("bluesky", base_url, handle)
+        raise
+
+
+class Platform:
+    """
+    A network blog posts can be shared to.
+
+    ``post`` is a blocking ``post(post_title, post_url)`` that raises on
+    failure. The platform is configured when all of its ``env_vars`` are set.
+    ``timeout`` bounds the whole share and must exceed the clients'
+    ``REQUEST_TIMEOUT``.
+    """
+
+    def __init__(self, key, name, post, env_vars=(), timeout=20):
+        self.key = key
+        self.name = name
+        self.post = post
+        self.env_vars = tuple(env_vars)
+        self.timeout = timeout
+
+    def __repr__(self):
+        return f"<Platform {self.key}>"
+
+    @property
+    def is_configured(self):
+        return all(os.environ.get(name) for name in self.env_vars)
+
+
+# Registry of sharing platforms by key. Register new ones with register_platform().
+PLATFORMS = {}
+
+
+def register_platform(platform):
+    PLATFORMS[platform.key] = platform
+    return platform
+
+
+register_platform(
+    Platform(
+        "mastodon",
+        "Mastodon",
+        post_to_mastodon,
+        env_vars=("MASTODON_API_BASE_URL", "MASTODON_ACCESS_TOKEN"),
+    )
+)
+register_platform(
+    Platform(
+        "bluesky",
+        "BlueSky",
+        post_to_bluesky,
+        env_vars=("BLUESKY_HANDLE", "BLUESKY_APP_PASSWORD"),
+    )
+)
+
+
+def configured_platforms():
+    return [platform for platform in PLATFORMS.values() if platform.is_configured]
+
+
+# Timeouts after the request may have reached the server, and those before
+SENT_TIMEOUTS = (TimeoutError, requests.ReadTimeout, httpx.ReadTimeout, httpx.WriteTimeout)
+UNSENT_TIMEOUTS = (requests.ConnectTimeout, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+def outcome_unknown(error):
+    """
+    Whether a share that failed with ``error`` may have been posted anyway.
+
+    Client libraries wrap transport errors, so the chain of causes is
+    searched from the outside in.
+    """
+    while error is not None:
+        if isinstance(error, UNSENT_TIMEOUTS):
+            return False
+        if isinstance(error, SENT_TIMEOUTS):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+class ShareResult:
+    """The outcome of sharing a post to one platform."""
+
+    def __init__(self, platform, error=None, elapsed=0.0):
+        self.platform = platform
+        self.error = error
+        self.elapsed = elapsed
+
+    def __repr__(self):
+        return f"<ShareResult {self.platform.key}: {'ok' if self.ok else self.error!r}>"
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    @property
+    def unknown(self):
+        """Whether the share failed in a way that may still have posted it."""
+        return not self.ok and outcome_unknown(self.error)
+
+    @property
+    def message(self):
+        if self.ok:
+            return f"Successfully shared to {self.platform.name}!"
+        if self.unknown:
+            return (
+                f"No answer from {self.platform.name} ({self.error}); "
+                "the post may have been shared, check before sharing again."
+            )
+        return f"Error sharing to {self.platform.name}: {self.error}"
+
+
+# Outlives every event loop: asyncio.run() joins the loop's default executor
+# on exit, which would wait out a share that already timed out.
+_executor = ThreadPoolExecutor(thread_name_prefix="share")
+
+
+async def share_on(platform, post_title, post_url):
+    """
+    Share a post to one platform within its timeout; never raises.
+
+    The blocking client call runs in a worker thread. On timeout the result
+    is returned at once, though the thread may still finish in the background.
+    """
+    started = time.monotonic()
+    loop = asyncio.get_running_loop()
+    try:
+        await asyncio.wait_for(
+            loop.run_in_executor(_executor, platform.post, post_title, post_url),
+            platform.timeout,
         )
+    except TimeoutError:
+        error = TimeoutError(f"no response within {platform.timeout} seconds")
+    except Exception as e:
+        error = e
+    else:
+        error = None
+    return ShareResult(platform, error, time.monotonic() - started)
+
+
+async def share_everywhere(post_title, post_url, platforms=None):
+    """
+    Share a post to every configured platform (or ``platforms``) concurrently.
+
+    Takes about as long as the slowest platform. Returns a ShareResult per
+    platform key.
+    """
+    if platforms is None:
+        platforms = configured_platforms()
+    results = await asyncio.gather(
+        *(share_on(platform, post_title, post_url) for platform in platforms)
+    )
+    return {result.platform.key: result for result in results}
 
-        # Craft your toot. You can customize this message.
-        toot = f"New blog post: {post_title}\n\nRead more here: {post_url}"
-        mastodon.status_post(toot)
+
+def share_to_mastodon(post_title, post_url):
+    """
+    Shares a blog post to Mastodon, returning a message for the user.
+    """
+    try:
+        post_to_mastodon(post_title, post_url)
         return "Successfully shared to Mastodon!"
     except Exception as e:
         return f"Error sharing to Mastodon: {e}"
@@ -27,17 +219,10 @@ def share_to_mastodon(post_title, post_url):
 
 def share_to_bluesky(post_title, post_url):
     """
-    Shares a blog post to BlueSky.
+    Shares a blog post to BlueSky, returning a message for the user.
     """
     try:
-        client = Client()
-        client.login(
-            os.environ.get("BLUESKY_HANDLE"), os.environ.get("BLUESKY_APP_PASSWORD")
-        )
-
-        # Craft your skeet. You can customize this message.
-        post = f"New blog post: {post_title}\n\nRead more here: {post_url}"
-        client.send_post(text=post)
+        post_to_bluesky(post_title, post_url)
         return "Successfully shared to BlueSky!"
     except Exception as e:
         return f"Error sharing to BlueSky: {e}"
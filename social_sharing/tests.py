@@ -1,3 +1,195 @@
-from django.test import TestCase
+import base64
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from .clients import ClientPool
+from .sharing import post_to_bluesky, post_to_mastodon
+
+
+def fake_jwt(lifetime):
+    """An unsigned JWT expiring in ``lifetime`` seconds; atproto only reads ``exp``."""
+
+    def encode(data):
+        return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+    now = int(time.time())
+    payload = {"scope": "com.atproto.access", "sub": "did:plc:fake", "iat": now, "exp": now + lifetime}
+    header = {"alg": "none", "typ": "JWT"}
+    return ".".join(
+        [encode(json.dumps(header).encode()), encode(json.dumps(payload).encode()), encode(b"fake")]
+    )
+
+
+class FakeSocialHandler(BaseHTTPRequestHandler):
+    """Answers the Mastodon and atproto endpoints used for sharing."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+        path = self.path.split("?")[0]
+        server.calls[path] += 1
+        server.connections.add(self.client_address)
+        time.sleep(server.delays.get(path, 0))
+
+        if path == "/api/v1/statuses":
+            body = {"id": str(server.calls[path]), "content": "", "visibility": "public"}
+        elif path in (
+            "/xrpc/com.atproto.server.createSession",
+            "/xrpc/com.atproto.server.refreshSession",
+        ):
+            body = {
+                "accessJwt": fake_jwt(server.access_lifetime),
+                "refreshJwt": fake_jwt(60 * 60 * 24),
+                "handle": "blog.test",
+                "did": "did:plc:fake",
+            }
+        elif path == "/xrpc/com.atproto.repo.createRecord":
+            body = {
+                "uri": "at://did:plc:fake/app.bsky.feed.post/1",
+                "cid": "bafyreie5737gdxlw5i64vzichcalba3z2v5n6icifvx5xytvske7mr3hpm",
+            }
+        else:
+            self.send_error(404)
+            return
+
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class FakeSocialServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakeSocialHandler)
+        self.calls = Counter()
+        self.connections = set()
+        self.access_lifetime = 60 * 60 * 2
+        # Seconds to wait before answering, by path
+        self.delays = {}
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class FakeSocialServerMixin:
+    """Point the sharing platforms at a fresh fake server and client pool."""
+
+    def use_fake_server(self):
+        # A cache these database-less tests can use, standing in for the shared one
+        self.enterContext(
+            override_settings(
+                CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+            )
+        )
+        cache.clear()
+        self.server = FakeSocialServer()
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        self.pool = ClientPool()
+        patcher = mock.patch("social_sharing.sharing.pool", self.pool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        environ = mock.patch.dict(
+            "os.environ",
+            {
+                "MASTODON_API_BASE_URL": self.server.url,
+                "MASTODON_ACCESS_TOKEN": "token",
+                "BLUESKY_BASE_URL": f"{self.server.url}/xrpc",
+                "BLUESKY_HANDLE": "blog.test",
+                "BLUESKY_APP_PASSWORD": "password",
+            },
+        )
+        environ.start()
+        self.addCleanup(environ.stop)
+
+
+class ClientPoolTests(FakeSocialServerMixin, SimpleTestCase):
+    """Shares go through a local fake server standing in for both APIs."""
+
+    def setUp(self):
+        self.use_fake_server()
+
+    def test_mastodon_client_and_connection_are_reused(self):
+        for _ in range(3):
+            post_to_mastodon("Title", "https://blog.test/post/title/")
+
+        self.assertEqual(self.server.calls["/api/v1/statuses"], 3)
+        self.assertEqual(len(self.server.connections), 1)
+
+    def test_bluesky_logs_in_once(self):
+        for _ in range(3):
+            post_to_bluesky("Title", "https://blog.test/post/title/")
+
+        self.assertEqual(self.server.calls["/xrpc/com.atproto.server.createSession"], 1)
+        self.assertEqual(self.server.calls["/xrpc/com.atproto.repo.createRecord"], 3)
+        self.assertEqual(self.server.calls["/xrpc/com.atproto.server.refreshSession"], 0)
+
+    def test_new_process_resumes_stored_bluesky_session(self):
+        post_to_bluesky("Title", "https://blog.test/post/title/")
+
+        # A fresh pool stands in for a new worker process sharing the cache
+        with mock.patch("social_sharing.sharing.pool", ClientPool()):
+            post_to_bluesky("Title", "https://blog.test/post/title/")
+
+        self.assertEqual(self.server.calls["/xrpc/com.atproto.server.createSession"], 1)
+        self.assertEqual(self.server.calls["/xrpc/com.atproto.repo.createRecord"], 2)
+
+    def test_bluesky_session_is_refreshed_only_when_expiring(self):
+        # Access tokens that expire within atproto's 15 minute refresh margin
+        self.server.access_lifetime = 60
+        post_to_bluesky("Title", "https://blog.test/post/title/")
+        post_to_bluesky("Title", "https://blog.test/post/title/")
+
+        self.assertEqual(self.server.calls["/xrpc/com.atproto.server.createSession"], 1)
+        self.assertEqual(self.server.calls["/xrpc/com.atproto.server.refreshSession"], 2)
+
+    def test_bluesky_login_does_not_hold_up_other_accounts(self):
+        started, release = threading.Event(), threading.Event()
+        login = self.pool._login_bluesky
+
+        def slow_login(*args):
+            started.set()
+            release.wait(5)
+            return login(*args)
+
+        with mock.patch.object(self.pool, "_login_bluesky", side_effect=slow_login) as mocked:
+            logins = [
+                threading.Thread(target=post_to_bluesky, args=("Title", "https://blog.test/"))
+                for _ in range(2)
+            ]
+            for thread in logins:
+                thread.start()
+            self.assertTrue(started.wait(5))
+
+            started_mastodon = time.monotonic()
+            post_to_mastodon("Title", "https://blog.test/post/title/")
+            self.assertLess(time.monotonic() - started_mastodon, 2)
+
+            release.set()
+            for thread in logins:
+                thread.join(5)
+
+        self.assertEqual(mocked.call_count, 1)
+        self.assertEqual(self.server.calls["/xrpc/com.atproto.repo.createRecord"], 2)
@@ -0,0 +1,10 @@
+from django.urls import path
+
+from . import views
+
+app_name = "social_sharing"
+
+urlpatterns = [
+    # Share job status, polled by HTMX
+    path("jobs/<str:token>/", views.share_job_status, name="share_job_status"),
+]
@@ -1,3 +1,20 @@
-from django.shortcuts import render
+from django.core import signing
+from django.http import Http404
+from django.shortcuts import get_object_or_404, render
 
-# Create your views here.
+from .models import ShareJob
+
+
+def share_job_status(request, token):
+    """
+    Status of a share job, polled by the HTMX messages partial until it is finished.
+
+    Sharing is open to every visitor, so the job is found by the signed id
+    its share response handed out rather than by its bare id.
+    """
+    try:
+        pk = ShareJob.from_status_token(token)
+    except signing.BadSignature:
+        raise Http404("No such share job.") from None
+    job = get_object_or_404(ShareJob, pk=pk)
+    return render(request, "social_sharing/partials/share_job.html", {"job": job})
@@ -1,115 +1,335 @@
-#!/usr/bin/env python3
 """
-Test script to verify social sharing functionality works correctly.
+Tests for social sharing: the share views, the job queue and the concurrent
+fan-out to every platform.
+
+Run with ``python manage.py test test_social_sharing``. Platforms talk to a
+local fake server (see ``social_sharing.tests``) or are replaced by mocks;
+nothing is posted to real networks.
 """
-import os
-import sys
-import django
-from django.test import TestCase, Client
+
+import asyncio
+import time
+from datetime import timedelta
+from unittest import mock
+
+import requests
 from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
 from django.urls import reverse
+from django.utils import timezone
+from mastodon.errors import MastodonNetworkError
+
+from blog.models import Post
+from social_sharing import jobs, sharing
+from social_sharing.clients import REQUEST_TIMEOUT
+from social_sharing.jobs import enqueue_share, process_jobs
+from social_sharing.models import ShareJob
+from social_sharing.sharing import Platform, share_everywhere
+from social_sharing.tests import FakeSocialServerMixin
+
+DELAY = 0.4
+
+
+def sleeping_platform(key, delay, error=None, timeout=5):
+    """A platform whose blocking post takes ``delay`` seconds, then maybe fails."""
+
+    def post(post_title, post_url):
+        time.sleep(delay)
+        if error:
+            raise error
+
+    return Platform(key, key.title(), post, timeout=timeout)
+
+
+class SharePostViewTests(TestCase):
+    """The share form on the post page queues jobs instead of posting."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user("author", is_staff=True)
+        cls.post = Post.objects.create(
+            title="Test Post for Social Sharing",
+            author=cls.staff,
+            content="This is a test post for social sharing functionality.",
+            status="published",
+        )
+        cls.share_url = reverse("blog:share_post", kwargs={"pk": cls.post.pk})
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+
+    def test_share_form_is_loaded_apart_from_the_post_page(self):
+        self.client.logout()
+        post_url = reverse("blog:post_detail", kwargs={"slug": self.post.slug})
+        self.assertEqual(self.post.get_absolute_url(), post_url)
+        page = self.client.get(post_url)
+        # The page stays cacheable: no CSRF token and no cookie
+        self.assertContains(page, f'hx-get="{self.share_url}"')
+        self.assertNotContains(page, "csrfmiddlewaretoken")
+        self.assertFalse(page.cookies)
+
+        form = self.client.get(self.share_url, headers={"HX-Request": "true"})
+        self.assertContains(form, "Share everywhere")
+        self.assertContains(form, "csrfmiddlewaretoken")
+
+    def test_anonymous_visitors_can_share(self):
+        self.client.logout()
+        response = self.client.post(self.share_url, {"mastodon": "true"})
+        self.assertRedirects(response, self.post.get_absolute_url())
+        self.assertEqual(ShareJob.objects.get().platform, "mastodon")
+
+    def test_share_queues_a_job_and_redirects_to_the_post(self):
+        response = self.client.post(self.share_url, {"mastodon": "true"})
+
+        self.assertRedirects(response, self.post.get_absolute_url())
+        job = ShareJob.objects.get()
+        self.assertEqual((job.platform, job.status), ("mastodon", ShareJob.Status.PENDING))
+        self.assertEqual(job.post_url, f"http://testserver{self.post.get_absolute_url()}")
+
+    def test_htmx_share_returns_a_polling_status(self):
+        response = self.client.post(self.share_url, {"bluesky": "true"}, headers={"HX-Request": "true"})
 
-# Setup Django environment
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'byte_board_blog.settings')
-django.setup()
-
-from blog.models import Post, Category, Tag
-
-
-def test_social_sharing():
-    """Test social sharing functionality."""
-    print("Testing social sharing functionality...")
-    
-    # Create test user
-    user, created = User.objects.get_or_create(
-        username='testuser',
-        defaults={'email': 'test@example.com'}
-    )
-    
-    # Create test post
-    post, created = Post.objects.get_or_create(
-        title='Test Post for Social Sharing',
-        defaults={
-            'slug': 'test-post-social-sharing',
-            'author': user,
-            'content': 'This is a test post for social sharing functionality.',
-            'status': 'published'
+        job = ShareJob.objects.get()
+        status_url = reverse("social_sharing:share_job_status", args=[job.status_token])
+        self.assertContains(response, status_url)
+        self.assertContains(response, 'hx-trigger="every 2s"')
+
+    def test_anonymous_visitors_can_poll_their_job(self):
+        self.client.logout()
+        self.client.post(self.share_url, {"bluesky": "true"}, headers={"HX-Request": "true"})
+        job = ShareJob.objects.get()
+        status_url = reverse("social_sharing:share_job_status", args=[job.status_token])
+
+        pending = self.client.get(status_url, headers={"HX-Request": "true"})
+        self.assertContains(pending, "Sharing to BlueSky")
+        ShareJob.objects.update(status=ShareJob.Status.SUCCEEDED, result="Shared.")
+        self.assertContains(self.client.get(status_url), "Shared.")
+
+        # The bare id is not enough
+        guessed = f"/share/jobs/{job.pk}/"
+        self.assertEqual(self.client.get(guessed).status_code, 404)
+
+    def test_sharing_twice_reuses_the_job(self):
+        self.client.post(self.share_url, {"mastodon": "true"})
+        self.client.post(self.share_url, {"mastodon": "true"})
+        self.assertEqual(ShareJob.objects.count(), 1)
+
+    def test_share_everywhere_queues_every_configured_platform(self):
+        environ = {
+            "MASTODON_API_BASE_URL": "https://mastodon.test",
+            "MASTODON_ACCESS_TOKEN": "token",
+            "BLUESKY_HANDLE": "",
         }
-    )
-    
-    client = Client()
-    
-    # Test 1: Check if post detail page loads correctly
-    print(f"1. Testing post detail page access...")
-    post_url = reverse('blog:post_detail', kwargs={'slug': post.slug})
-    response = client.get(post_url)
-    print(f"   Post detail URL: {post_url}")
-    print(f"   Response status: {response.status_code}")
-    
-    if response.status_code == 200:
-        print("   ✓ Post detail page loads successfully")
-    else:
-        print("   ✗ Post detail page failed to load")
-        return False
-    
-    # Test 2: Check get_absolute_url method
-    print(f"2. Testing get_absolute_url method...")
-    absolute_url = post.get_absolute_url()
-    print(f"   get_absolute_url returns: {absolute_url}")
-    
-    if absolute_url == post_url:
-        print("   ✓ get_absolute_url returns correct URL")
-    else:
-        print("   ✗ get_absolute_url returns incorrect URL")
-        print(f"   Expected: {post_url}")
-        print(f"   Got: {absolute_url}")
-        return False
-    
-    # Test 3: Check if share_post URL is accessible
-    print(f"3. Testing share_post URL accessibility...")
-    share_url = reverse('blog:share_post', kwargs={'pk': post.pk})
-    print(f"   Share URL: {share_url}")
-    
-    # Test POST request to share_post view (simulating button click)
-    response = client.post(share_url, {'mastodon': 'true'})
-    print(f"   Share POST response status: {response.status_code}")
-    
-    if response.status_code == 302:  # Should redirect back to post
-        print("   ✓ Share functionality accessible (redirect as expected)")
-        redirect_url = response.url
-        print(f"   Redirects to: {redirect_url}")
-        
-        if redirect_url == absolute_url:
-            print("   ✓ Redirects to correct post URL")
-        else:
-            print("   ✗ Redirects to incorrect URL")
-            return False
-    else:
-        print("   ✗ Share functionality failed")
-        return False
-    
-    # Test 4: Check if social sharing buttons appear on page
-    print(f"4. Testing social sharing buttons in template...")
-    if 'Share on Mastodon' in response.content.decode() or 'blog:share_post' in str(response.content):
-        print("   ✓ Social sharing elements found in template")
-    else:
-        # Get the actual post detail page content
-        detail_response = client.get(post_url)
-        if 'Share on Mastodon' in detail_response.content.decode():
-            print("   ✓ Social sharing buttons found in post detail page")
-        else:
-            print("   ✗ Social sharing buttons not found")
-            return False
-    
-    print("\n✓ All social sharing tests passed successfully!")
-    return True
-
-
-if __name__ == '__main__':
-    success = test_social_sharing()
-    if success:
-        print("Social sharing functionality is working correctly.")
-        sys.exit(0)
-    else:
-        print("Social sharing functionality has issues.")
-        sys.exit(1)
\ No newline at end of file
+        with mock.patch.dict("os.environ", environ):
+            self.client.post(self.share_url, {"everywhere": "true"})
+
+        self.assertEqual(list(ShareJob.objects.values_list("platform", flat=True)), ["mastodon"])
+
+
+class ShareEverywhereTests(SimpleTestCase):
+    """The fan-out shares concurrently: it takes as long as the slowest platform."""
+
+    def test_total_time_is_close_to_the_slowest_platform(self):
+        platforms = [
+            sleeping_platform("fast", DELAY / 4),
+            sleeping_platform("medium", DELAY / 2),
+            sleeping_platform("slow", DELAY),
+        ]
+
+        started = time.monotonic()
+        results = asyncio.run(share_everywhere("Title", "https://blog.test/", platforms))
+        elapsed = time.monotonic() - started
+
+        self.assertEqual(set(results), {"fast", "medium", "slow"})
+        self.assertTrue(all(result.ok for result in results.values()))
+        self.assertGreaterEqual(elapsed, DELAY)
+        self.assertLess(elapsed, DELAY * 1.5)
+
+    def test_failures_and_timeouts_are_reported_per_platform(self):
+        platforms = [
+            sleeping_platform("ok", 0),
+            sleeping_platform("broken", 0, error=RuntimeError("server said no")),
+            sleeping_platform("hung", DELAY * 5, timeout=DELAY),
+        ]
+
+        started = time.monotonic()
+        results = asyncio.run(share_everywhere("Title", "https://blog.test/", platforms))
+
+        self.assertLess(time.monotonic() - started, DELAY * 2)
+        self.assertTrue(results["ok"].ok)
+        self.assertEqual(results["broken"].message, "Error sharing to Broken: server said no")
+        self.assertIsInstance(results["hung"].error, TimeoutError)
+
+    def test_registered_platforms_plug_in(self):
+        platform = sleeping_platform("example", 0)
+        with mock.patch.dict(sharing.PLATFORMS, clear=True):
+            sharing.register_platform(platform)
+            platform.env_vars = ("EXAMPLE_TOKEN",)
+            with mock.patch.dict("os.environ", {"EXAMPLE_TOKEN": "secret"}):
+                results = asyncio.run(share_everywhere("Title", "https://blog.test/"))
+
+        self.assertEqual(list(results), ["example"])
+
+
+class FakeServerFanOutTests(FakeSocialServerMixin, SimpleTestCase):
+    """The real Mastodon and Bluesky clients, with a slow fake server as transport."""
+
+    def setUp(self):
+        self.use_fake_server()
+        self.server.delays = {
+            "/api/v1/statuses": DELAY / 2,
+            "/xrpc/com.atproto.repo.createRecord": DELAY,
+        }
+
+    def test_both_networks_are_shared_concurrently(self):
+        # Log in first so the timing only covers posting
+        sharing.post_to_bluesky("Warm up", "https://blog.test/")
+
+        started = time.monotonic()
+        results = asyncio.run(share_everywhere("Title", "https://blog.test/post/title/"))
+        elapsed = time.monotonic() - started
+
+        self.assertEqual(set(results), {"mastodon", "bluesky"})
+        self.assertTrue(all(result.ok for result in results.values()), results)
+        self.assertLess(elapsed, DELAY * 1.4)
+        self.assertEqual(self.server.calls["/api/v1/statuses"], 1)
+        self.assertEqual(self.server.calls["/xrpc/com.atproto.repo.createRecord"], 2)
+
+
+class ShareWorkerTests(TestCase):
+    """The worker posts a batch of queued jobs concurrently and records each result."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user("author")
+        cls.post = Post.objects.create(title="Queued", author=author, content="x", status="published")
+
+    def test_queued_jobs_run_concurrently(self):
+        platforms = {
+            "mastodon": sleeping_platform("mastodon", DELAY),
+            "bluesky": sleeping_platform("bluesky", DELAY, error=RuntimeError("down")),
+        }
+        for key in platforms:
+            ShareJob.objects.create(post=self.post, platform=key, post_url="https://blog.test/")
+
+        with mock.patch.dict("social_sharing.jobs.PLATFORMS", platforms):
+            started = time.monotonic()
+            self.assertEqual(process_jobs(), 2)
+            elapsed = time.monotonic() - started
+
+        self.assertLess(elapsed, DELAY * 1.5)
+        statuses = dict(ShareJob.objects.values_list("platform", "status"))
+        self.assertEqual(statuses["mastodon"], ShareJob.Status.SUCCEEDED)
+        # The failed job is rescheduled with backoff rather than retried at once
+        self.assertEqual(statuses["bluesky"], ShareJob.Status.PENDING)
+        self.assertEqual(ShareJob.objects.get(platform="bluesky").attempts, 1)
+
+    def test_timed_out_job_is_not_retried(self):
+        platforms = {"mastodon": sleeping_platform("mastodon", DELAY * 5, timeout=DELAY)}
+        ShareJob.objects.create(post=self.post, platform="mastodon", post_url="https://blog.test/")
+
+        with mock.patch.dict("social_sharing.jobs.PLATFORMS", platforms):
+            self.assertEqual(process_jobs(), 1)
+
+        job = ShareJob.objects.get()
+        # The post may have gone out: retrying could share it twice
+        self.assertEqual((job.status, job.attempts), (ShareJob.Status.FAILED, 1))
+        self.assertIn("may have been shared", job.result)
+
+
+class ShareQueueTests(TestCase):
+    """Jobs are queued once per platform, claimed once and retried with backoff."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user("author")
+        cls.post = Post.objects.create(title="Queued", author=author, content="x", status="published")
+
+    def make_due(self):
+        ShareJob.objects.update(next_attempt_at=timezone.now())
+
+    def test_enqueue_is_idempotent_until_a_job_fails(self):
+        job = enqueue_share(self.post, "mastodon", "https://blog.test/")
+        self.assertEqual(enqueue_share(self.post, "mastodon", "https://blog.test/"), job)
+
+        ShareJob.objects.update(status=ShareJob.Status.SUCCEEDED, attempts=1)
+        self.assertEqual(
+            enqueue_share(self.post, "mastodon", "https://blog.test/").status,
+            ShareJob.Status.SUCCEEDED,
+        )
+
+        ShareJob.objects.update(status=ShareJob.Status.FAILED, attempts=jobs.MAX_ATTEMPTS)
+        requeued = enqueue_share(self.post, "mastodon", "https://blog.test/new/")
+        self.assertEqual((requeued.status, requeued.attempts), (ShareJob.Status.PENDING, 0))
+        self.assertEqual(requeued.post_url, "https://blog.test/new/")
+        self.assertEqual(ShareJob.objects.count(), 1)
+
+    def test_failures_back_off_until_the_last_attempt(self):
+        platforms = {"mastodon": sleeping_platform("mastodon", 0, error=RuntimeError("down"))}
+        enqueue_share(self.post, "mastodon", "https://blog.test/")
+
+        with mock.patch.dict("social_sharing.jobs.PLATFORMS", platforms):
+            for attempt in range(1, jobs.MAX_ATTEMPTS):
+                before = timezone.now()
+                self.assertEqual(process_jobs(), 1)
+                job = ShareJob.objects.get()
+                self.assertEqual((job.status, job.attempts), (ShareJob.Status.PENDING, attempt))
+                self.assertGreaterEqual(job.next_attempt_at, before + jobs.backoff(attempt))
+                # Not due yet
+                self.assertEqual(process_jobs(), 0)
+                self.make_due()
+
+            self.assertEqual(process_jobs(), 1)
+
+        job = ShareJob.objects.get()
+        self.assertEqual((job.status, job.attempts), (ShareJob.Status.FAILED, jobs.MAX_ATTEMPTS))
+
+    def test_backoff_doubles_up_to_its_cap(self):
+        self.assertEqual(jobs.backoff(1), jobs.BACKOFF_BASE)
+        self.assertEqual(jobs.backoff(3), jobs.BACKOFF_BASE * 4)
+        self.assertEqual(jobs.backoff(30), jobs.BACKOFF_MAX)
+
+    def test_jobs_are_claimed_once(self):
+        enqueue_share(self.post, "mastodon", "https://blog.test/")
+        self.assertEqual(len(jobs.claim_due_jobs()), 1)
+        self.assertEqual(jobs.claim_due_jobs(), [])
+
+    def test_jobs_of_a_dead_worker_are_requeued(self):
+        enqueue_share(self.post, "mastodon", "https://blog.test/")
+        enqueue_share(self.post, "bluesky", "https://blog.test/")
+        jobs.claim_due_jobs()
+        ShareJob.objects.filter(platform="mastodon").update(
+            locked_at=timezone.now() - jobs.STALE_AFTER - timedelta(seconds=1)
+        )
+
+        self.assertEqual(jobs.requeue_stale_jobs(), 1)
+        statuses = dict(ShareJob.objects.values_list("platform", "status"))
+        self.assertEqual(
+            statuses, {"mastodon": ShareJob.Status.PENDING, "bluesky": ShareJob.Status.RUNNING}
+        )
+
+
+class ShareOutcomeTests(SimpleTestCase):
+    """Only timeouts after a request was sent leave a share's outcome unknown."""
+
+    def wrapped(self, error):
+        # How Mastodon.py reports transport errors
+        try:
+            try:
+                raise error
+            except Exception as e:
+                raise MastodonNetworkError(f"Could not complete request: {e}")
+        except MastodonNetworkError as e:
+            return e
+
+    def test_read_timeouts_are_unknown(self):
+        self.assertTrue(sharing.outcome_unknown(TimeoutError()))
+        self.assertTrue(sharing.outcome_unknown(self.wrapped(requests.ReadTimeout())))
+
+    def test_failures_before_sending_are_known(self):
+        self.assertFalse(sharing.outcome_unknown(self.wrapped(requests.ConnectTimeout())))
+        self.assertFalse(sharing.outcome_unknown(RuntimeError("server said no")))
+
+    def test_platforms_outlast_their_client_requests(self):
+        for platform in sharing.PLATFORMS.values():
+            self.assertLess(REQUEST_TIMEOUT, platform.timeout, platform)